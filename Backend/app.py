@@ -1,20 +1,24 @@
 """
 Main application entry point for Flask backend
 """
-from app import create_app
+from app import create_app, start_background_workers
 from config import Config
 import sys
 
-try:
-    app, socketio = create_app()
-except Exception as e:
-    error_text = str(e)
-    print(f"[ERROR] Backend startup failed: {error_text}")
-    if 'resolution lifetime expired' in error_text.lower() or 'dns' in error_text.lower():
-        print("[HINT] MongoDB SRV DNS lookup failed. Please check your internet/DNS and MONGODB_URI in Backend/.env.")
-    sys.exit(1)
 
-if __name__ == '__main__':
+def main():
+    # Only build the app when run as a script: multiprocessing 'spawn' children
+    # (password hashing workers) re-import this module as __mp_main__
+    try:
+        app, socketio = create_app()
+    except Exception as e:
+        error_text = str(e)
+        print(f"[ERROR] Backend startup failed: {error_text}")
+        if 'resolution lifetime expired' in error_text.lower() or 'dns' in error_text.lower():
+            print("[HINT] MongoDB SRV DNS lookup failed. Please check your internet/DNS and MONGODB_URI in Backend/.env.")
+        sys.exit(1)
+
+    start_background_workers(app)
     socketio.run(
         app,
         host=Config.HOST,
@@ -24,3 +28,6 @@ if __name__ == '__main__':
         allow_unsafe_werkzeug=True
     )
 
+
+if __name__ == '__main__':
+    main()
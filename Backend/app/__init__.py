@@ -26,6 +26,13 @@ def create_app(config_class=Config):
     # So we want it to be Backend/static/
     app = Flask(__name__, static_folder='../static', static_url_path='/static')
     app.config.from_object(config_class)
+
+    # request.remote_addr is the real client only behind the configured number of proxies;
+    # X-Forwarded-For entries added before them are client-controlled and ignored
+    proxy_hops = app.config.get('TRUSTED_PROXY_HOPS', 0)
+    if proxy_hops > 0:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
     
     # Ensure static directories exist
     static_root = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
@@ -142,24 +149,14 @@ def create_app(config_class=Config):
         Look up the user on every protected request to ensure they are still valid/active.
         This provides real-time security enforcement for RS256 tokens.
         """
-        from app.services.blacklist_service import BlacklistService
+        from app.utils.principal_status import is_principal_allowed
         user_id = jwt_data["sub"]
         user_type = jwt_data.get("user_type", "user")
         
-        # Check if user is blacklisted
-        if user_type in ['seller', 'outlet_man'] and BlacklistService.is_blacklisted(user_id, user_type):
-            # Returning None here will trigger the @jwt.user_lookup_error_loader if defined,
-            # but flask-jwt-extended will handle it as unauthorized if we don't return a record.
-            # However, typically we want to return a user object or None.
-            # For strictness, if blacklisted, we should reject.
+        # Blacklisted sellers/outlet men (in-memory set) and inactive users (cached
+        # briefly so hot principals skip the database) are rejected
+        if not is_principal_allowed(user_type, user_id):
             return None
-            
-        # You could also check if regular 'user' is active here if you have an is_active flag in DB
-        if user_type == 'user':
-            from app.services.user_service import UserService
-            user = UserService.get_user_by_id(user_id)
-            if not user or not getattr(user, 'is_active', True):
-                return None
         
         return {"id": user_id, "type": user_type}
 
@@ -170,10 +167,16 @@ def create_app(config_class=Config):
         }), 401
     
     # Initialize Socket.IO
+    # With SOCKETIO_MESSAGE_QUEUE set, emits from any worker process reach clients on all workers
+    from app.sockets.message_queue import socketio_queue_options
     socketio.init_app(
         app,
         cors_allowed_origins="*", # Force wildcard to handle multiple local IPs (VirtualBox, etc.)
-        async_mode=app.config.get('SOCKETIO_ASYNC_MODE', 'threading')
+        async_mode=app.config.get('SOCKETIO_ASYNC_MODE', 'threading'),
+        **socketio_queue_options(
+            app.config.get('SOCKETIO_MESSAGE_QUEUE'),
+            app.config.get('SOCKETIO_CHANNEL', 'bbhc-socketio')
+        )
     )
     
     # Suppress 500 errors from engineio websocket disconnections during upgrade
@@ -186,6 +189,19 @@ def create_app(config_class=Config):
     # Create indexes on startup
     with app.app_context():
         create_indexes()
+        try:
+            from app.utils.active_counters import configure_counter_backend
+            configure_counter_backend(app.config.get('ACTIVE_COUNTER_BACKEND', 'memory'))
+        except Exception as e:
+            print(f"[Initialization] Error configuring active counters: {str(e)}")
+        try:
+            # Pricing jobs left running by a stopped worker
+            from app.services.pricing_job_service import PricingJobService
+            stale_jobs = PricingJobService.fail_stale_jobs()
+            if stale_jobs:
+                print(f"[Initialization] Marked {stale_jobs} stale pricing job(s) as failed")
+        except Exception as e:
+            print(f"[Initialization] Error checking pricing jobs: {str(e)}")
     
     # Register blueprints
     from app.routes.api import api_bp
@@ -228,10 +244,25 @@ def create_app(config_class=Config):
     # Register Socket.IO events (keeping configuration but minimal)
     from app.sockets import register_socket_events
     register_socket_events(socketio)
-    
+
     return app, socketio
 
 
+def start_background_workers(app):
+    """
+    Start the long-running background threads of a server process.
+    Called by the server entry points (app.py, wsgi.py) only, so maintenance
+    scripts that call create_app never deliver notifications or poll in the background.
+    """
+    # Deliver queued notifications from this process
+    from app.services.notification_outbox_service import NotificationOutboxService
+    NotificationOutboxService.start_workers(app, app.config.get('NOTIFICATION_WORKERS', 4))
+
+    # Keep the in-memory blacklist in step with writes from other processes
+    from app.services.blacklist_service import BlacklistService
+    BlacklistService.start_refresher(app)
+
+
 def create_indexes():
     """Create database indexes for better performance"""
     try:
@@ -261,16 +292,21 @@ def create_indexes():
         mongo.db.sellers.create_index([('email', ASCENDING)], unique=True)
         mongo.db.sellers.create_index([('trade_id', ASCENDING)], unique=True)
         mongo.db.sellers.create_index([('created_at', ASCENDING)])
+        # Contact lookups for notifications (see app/utils/contact_directory.py)
+        mongo.db.sellers.create_index([('phone_number', ASCENDING)])
+        mongo.db.sellers.create_index([('seller_phone', ASCENDING)])
         
         # Create indexes for outlet_men collection
         mongo.db.outlet_men.create_index([('email', ASCENDING)], unique=True)
         mongo.db.outlet_men.create_index([('outlet_access_code', ASCENDING)], unique=True)
         mongo.db.outlet_men.create_index([('created_at', ASCENDING)])
+        mongo.db.outlet_men.create_index([('phone_number', ASCENDING)])
         
         # Create indexes for master collection
         mongo.db.master.create_index([('email', ASCENDING)], unique=True)
         mongo.db.master.create_index([('username', ASCENDING)], unique=True)
         mongo.db.master.create_index([('created_at', ASCENDING)])
+        mongo.db.master.create_index([('phone_number', ASCENDING)])
         
         # IP Security indexes
         mongo.db.ip_security.create_index([('ip_address', ASCENDING)], unique=True)
@@ -284,10 +320,19 @@ def create_indexes():
         # Create indexes for products collection
         mongo.db.products.create_index([('product_name', ASCENDING)])
         mongo.db.products.create_index([('created_at', -1)])
+        mongo.db.products.create_index([('created_at', -1), ('_id', -1)])  # Keyset pagination
         mongo.db.products.create_index([('seller_trade_id', ASCENDING), ('created_at', -1)])
         mongo.db.products.create_index([('created_by_user_id', ASCENDING), ('created_at', -1)])
         mongo.db.products.create_index([('seller_id', ASCENDING)])
         mongo.db.products.create_index([('approval_status', ASCENDING), ('created_at', -1)])
+
+        # Create indexes for services collection
+        mongo.db.services.create_index([('created_at', -1), ('_id', -1)])
+        mongo.db.services.create_index([('approval_status', ASCENDING), ('created_at', -1)])
+
+        # Weighted text indexes backing GET /api/search
+        from app.services.search_service import SearchService
+        SearchService.create_indexes()
         
         # Categories: product vs service (separate lists, same collection)
         mongo.db.categories.update_many(
@@ -319,6 +364,25 @@ def create_indexes():
         mongo.db.orders.create_index([('created_at', -1)])
         mongo.db.orders.create_index([('secure_token_user', ASCENDING)])
         mongo.db.orders.create_index([('secure_token_seller', ASCENDING)])
+        # Keyset pagination over (created_at, _id) for the merged order listing
+        mongo.db.orders.create_index([('created_at', -1), ('_id', -1)])
+        mongo.db.orders.create_index([('status', ASCENDING), ('created_at', -1), ('_id', -1)])
+        mongo.db.service_orders.create_index([('created_at', -1), ('_id', -1)])
+        mongo.db.service_orders.create_index([('user_id', ASCENDING), ('created_at', -1), ('_id', -1)])
+        mongo.db.service_orders.create_index([('seller_id', ASCENDING), ('created_at', -1), ('_id', -1)])
+        mongo.db.service_orders.create_index([('status', ASCENDING), ('created_at', -1), ('_id', -1)])
+        # Normalized token prefix search (see app/utils/order_search.py)
+        mongo.db.orders.create_index([('search_keys', ASCENDING)])
+        mongo.db.service_orders.create_index([('search_keys', ASCENDING)])
+        mongo.db.orders.create_index([('seller_search_keys', ASCENDING)])
+
+        # Notification outbox (see NotificationOutboxService)
+        from app.services.notification_outbox_service import NotificationOutboxService
+        NotificationOutboxService.create_indexes()
+
+        # Daily analytics rollups (see AnalyticsRollupService)
+        from app.services.analytics_rollup_service import AnalyticsRollupService
+        AnalyticsRollupService.create_indexes()
         
         # Create indexes for bag collection
         mongo.db.bag.create_index([('user_id', ASCENDING)])
@@ -340,7 +404,6 @@ def create_indexes():
                 pass
             mongo.db.users.create_index([('email', ASCENDING)], unique=True)
             mongo.db.users.create_index([('phone_number', ASCENDING)]) # Non-unique
-            mongo.db.users.create_index([('socket_id', ASCENDING)])
             mongo.db.users.create_index([('created_at', ASCENDING)])
         except Exception:
             pass  # Collection might not exist yet
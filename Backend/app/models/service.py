@@ -37,6 +37,8 @@ class Service:
         registration_user_agent=None,
         is_spotlight=False,
         delivery_charge=None,
+        effective_commission_rate=None,
+        effective_delivery_charge=None,
         _id=None
     ):
         self._id = _id or ObjectId()
@@ -65,6 +67,9 @@ class Service:
         self.registration_user_agent = registration_user_agent
         self.is_spotlight = bool(is_spotlight)
         self.delivery_charge = delivery_charge
+        # Materialized at write time by PricingEngineService
+        self.effective_commission_rate = effective_commission_rate
+        self.effective_delivery_charge = effective_delivery_charge
         self.created_at = created_at or datetime.now(timezone.utc)
         self.updated_at = updated_at or datetime.now(timezone.utc)
 
@@ -96,6 +101,8 @@ class Service:
             'registration_user_agent': self.registration_user_agent,
             'is_spotlight': self.is_spotlight,
             'delivery_charge': self.delivery_charge,
+            'effective_commission_rate': self.effective_commission_rate,
+            'effective_delivery_charge': self.effective_delivery_charge,
             'created_at': self.created_at.isoformat() if isinstance(self.created_at, datetime) else self.created_at,
             'updated_at': self.updated_at.isoformat() if isinstance(self.updated_at, datetime) else self.updated_at
         }
@@ -128,6 +135,8 @@ class Service:
             'registration_user_agent': self.registration_user_agent,
             'is_spotlight': self.is_spotlight,
             'delivery_charge': self.delivery_charge,
+            'effective_commission_rate': self.effective_commission_rate,
+            'effective_delivery_charge': self.effective_delivery_charge,
             'created_at': self.created_at,
             'updated_at': self.updated_at
         }
@@ -164,6 +173,8 @@ class Service:
             registration_user_agent=bson_doc.get('registration_user_agent'),
             is_spotlight=bson_doc.get('is_spotlight', False),
             delivery_charge=bson_doc.get('delivery_charge'),
+            effective_commission_rate=bson_doc.get('effective_commission_rate'),
+            effective_delivery_charge=bson_doc.get('effective_delivery_charge'),
             created_at=bson_doc.get('created_at'),
             updated_at=bson_doc.get('updated_at')
         )
@@ -3,7 +3,7 @@ User model for MongoDB
 """
 from datetime import datetime, timezone
 from bson import ObjectId
-import bcrypt
+from app.utils.password_hashing import hash_password, verify_password
 
 
 class User:
@@ -35,17 +35,11 @@ class User:
     @staticmethod
     def set_password(password):
         """Hash and set password"""
-        return bcrypt.hashpw(
-            password.encode('utf-8'),
-            bcrypt.gensalt()
-        ).decode('utf-8')
+        return hash_password(password)
     
     def check_password(self, password):
         """Check if password matches"""
-        return bcrypt.checkpw(
-            password.encode('utf-8'),
-            self.password_hash.encode('utf-8')
-        )
+        return verify_password(password, self.password_hash)
     
     def to_dict(self, include_password=False):
         """Convert user to dictionary"""
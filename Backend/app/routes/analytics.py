@@ -4,7 +4,7 @@ Analytics routes for dashboard data
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt
 from app.services.analytics_service import AnalyticsService
-from app import mongo
+from app.utils.active_counters import get_all_counts
 
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
 
@@ -203,19 +203,10 @@ def get_active_counts():
         if user_type != 'master':
             return jsonify({'error': 'Unauthorized. Master access required.'}), 403
         
-        # Count active users (users with active socket connection)
-        # Active users = users with socket_id (connected via socket)
-        active_users = mongo.db.users.count_documents({
-            'socket_id': {'$ne': None}
-        })
-        
-        # Count active sellers (sellers with is_active=True or socket_id)
-        active_sellers = mongo.db.sellers.count_documents({
-            '$or': [
-                {'is_active': True},
-                {'socket_id': {'$ne': None}}
-            ]
-        })
+        # Live sockets across all worker processes (shared active counter backend)
+        counts = get_all_counts()
+        active_users = counts['users']
+        active_sellers = counts['sellers']
         
         return jsonify({
             'activeUsers': active_users,
@@ -17,10 +17,15 @@ from app.services.user_service import UserService
 from app.services.blacklist_service import BlacklistService
 from app.services.category_service import CategoryService
 from app.services.product_service import ProductService
+from app.services.pricing_rules_service import PricingRulesService
+from app.services.pricing_engine_service import PricingEngineService
+from app.services.pricing_job_service import PricingJobService
 from app.services.wishlist_service import WishlistService
+from app.services.search_service import SearchService
 from app import mongo
 from app.sockets.emitter import emit_product_event
 from app.utils.validators import validate_email
+from app.utils.pagination import decode_cursor, next_cursor_for
 from datetime import datetime, timezone
 
 api_bp = Blueprint('api', __name__)
@@ -1082,9 +1087,11 @@ def get_products():
     try:
         skip = request.args.get('skip', 0, type=int)
         limit = request.args.get('limit', 100, type=int)
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
         can_view_seller_private = _is_master_request()
 
-        products = ProductService.get_all_products(skip=skip, limit=limit)
+        products = ProductService.get_all_products(skip=skip, limit=limit, after=after)
         product_payload = []
         for product in products:
             product_dict = product.to_dict()
@@ -1094,12 +1101,61 @@ def get_products():
 
         return jsonify({
             'products': product_payload,
-            'count': len(products)
+            'count': len(products),
+            'next_cursor': next_cursor_for(products, limit)
         }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to get products: {str(e)}'}), 500
 
 
+@api_bp.route('/search', methods=['GET'])
+def search_catalog():
+    """Ranked text search over approved products and services (public endpoint)"""
+    try:
+        from app.services.service_service import ServiceService
+
+        result = SearchService.search(
+            request.args.get('q', ''),
+            item_type=request.args.get('type', 'all'),
+            category=request.args.get('category') or None,
+            page=request.args.get('page', 1, type=int),
+            limit=request.args.get('limit', 20, type=int)
+        )
+        can_view_seller_private = _is_master_request()
+        rules = PricingRulesService.get_rules()
+
+        items = []
+        for item_type, item, score in result['items']:
+            if item_type == 'product':
+                item_dict = ProductService.apply_pricing_rules(item, rules).to_dict()
+                if not can_view_seller_private:
+                    _sanitize_product_seller_fields(item_dict)
+                item_dict['type'] = 'Product'
+            else:
+                ServiceService.populate_delivery_charge(item, rules)
+                item_dict = item.to_dict()
+                item_dict['type'] = 'Service'
+            item_dict['score'] = round(score, 4)
+            items.append(item_dict)
+
+        total = result['total']
+        limit = result['limit']
+        return jsonify({
+            'items': items,
+            'total': total,
+            'page': result['page'],
+            'limit': limit,
+            'totalPages': (total + limit - 1) // limit,
+            'facets': result['facets']
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Search failed: {str(e)}'}), 500
+
+
 @api_bp.route('/products/<product_id>', methods=['GET'])
 def get_product(product_id):
     """Get single product details"""
@@ -1139,19 +1195,25 @@ def get_seller_my_products():
         
         skip = request.args.get('skip', 0, type=int)
         limit = request.args.get('limit', 100, type=int)
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
         
         products = ProductService.get_products_by_seller(
             user_id=user_id, 
             trade_id=trade_id, 
             skip=skip, 
             limit=limit,
-            include_pending=True # Sellers should see their own pending products
+            include_pending=True, # Sellers should see their own pending products
+            after=after
         )
 
         return jsonify({
             'products': [product.to_dict() for product in products],
-            'count': len(products)
+            'count': len(products),
+            'next_cursor': next_cursor_for(products, limit)
         }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to get seller products: {str(e)}'}), 500
 
@@ -1308,6 +1370,7 @@ def seller_update_product(product_id):
         if existing_pending:
             data['updated_at'] = datetime.now(timezone.utc)
             mongo.db.products.update_one({'_id': existing_pending['_id']}, {'$set': data})
+            PricingEngineService.refresh_product(existing_pending['_id'])
             edit_request = ProductService.get_product_by_id(str(existing_pending['_id']))
         else:
             edit_request = ProductService.create_product(data)
@@ -1472,7 +1535,8 @@ def toggle_service_spotlight(service_id):
         if service_doc:
             from app.models.service import Service
             service = Service.from_bson(service_doc)
-            emit_product_event('service_updated', service.to_dict())
+            from app.sockets.emitter import emit_service_event
+            emit_service_event('service_updated', service.to_dict())
 
         return jsonify({'message': 'Spotlight status updated', 'is_spotlight': is_spotlight}), 200
     except Exception as e:
@@ -1564,6 +1628,14 @@ def apply_commission_to_all():
         if commission_rate is None or commission_rate < 0:
             return jsonify({'error': 'Valid commission_rate (percentage) is required'}), 400
 
+        if data.get('background'):
+            job = PricingJobService.start_job(
+                'product_commission_all',
+                {'commission_rate': float(commission_rate)},
+                started_by=get_jwt_identity()
+            )
+            return jsonify({'message': 'Commission propagation started', 'job': job}), 202
+
         updated_count = ProductService.apply_commission_to_all(float(commission_rate))
         
         return jsonify({
@@ -1592,6 +1664,14 @@ def apply_commission_by_category():
         if commission_rate is None or commission_rate < 0:
             return jsonify({'error': 'Valid commission_rate (percentage) is required'}), 400
 
+        if data.get('background'):
+            job = PricingJobService.start_job(
+                'product_commission_category',
+                {'category': category, 'commission_rate': float(commission_rate)},
+                started_by=get_jwt_identity()
+            )
+            return jsonify({'message': 'Commission propagation started', 'job': job}), 202
+
         updated_count = ProductService.apply_commission_by_category(category, float(commission_rate))
         
         return jsonify({
@@ -1670,6 +1750,14 @@ def apply_service_commission_to_all():
         if commission_rate is None or commission_rate < 0:
             return jsonify({'error': 'Valid commission_rate (percentage) is required'}), 400
 
+        if data.get('background'):
+            job = PricingJobService.start_job(
+                'service_commission_all',
+                {'commission_rate': float(commission_rate)},
+                started_by=get_jwt_identity()
+            )
+            return jsonify({'message': 'Service commission propagation started', 'job': job}), 202
+
         updated_count = ServiceService.apply_commission_to_all(float(commission_rate))
 
         return jsonify({
@@ -1700,6 +1788,14 @@ def apply_service_commission_by_category():
         if commission_rate is None or commission_rate < 0:
             return jsonify({'error': 'Valid commission_rate (percentage) is required'}), 400
 
+        if data.get('background'):
+            job = PricingJobService.start_job(
+                'service_commission_category',
+                {'category': category, 'commission_rate': float(commission_rate)},
+                started_by=get_jwt_identity()
+            )
+            return jsonify({'message': 'Service commission propagation started', 'job': job}), 202
+
         updated_count = ServiceService.apply_commission_by_category(category, float(commission_rate))
 
         return jsonify({
@@ -1764,6 +1860,23 @@ def get_service_category_commission_rates():
         return jsonify({'error': f'Failed to get service category commissions: {str(e)}'}), 500
 
 
+@api_bp.route('/commission/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_commission_job(job_id):
+    """Get progress of a background commission propagation job (masters only)"""
+    try:
+        claims = get_jwt()
+        if claims.get('user_type') != 'master':
+            return jsonify({'error': 'Only masters can view commission jobs'}), 403
+
+        job = PricingJobService.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify({'job': job}), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to get commission job: {str(e)}'}), 500
+
+
 @api_bp.route('/commission/service-accept-credit', methods=['GET'])
 @jwt_required()
 def get_service_accept_credit():
@@ -2046,6 +2159,7 @@ def apply_delivery_to_all():
             {'$set': {'key': f'global_{rate_type}_rate', 'rate': rate, 'updated_at': datetime.now(timezone.utc)}},
             upsert=True
         )
+        PricingRulesService.invalidate()
 
         # Also apply to all products/services that do not have category-specific or item-specific delivery charges
         if rate_type == 'product':
@@ -2056,7 +2170,7 @@ def apply_delivery_to_all():
             }
             result = mongo.db.products.update_many(
                 query,
-                {'$set': {'delivery_charge': rate, 'updated_at': datetime.now(timezone.utc)}}
+                {'$set': {'delivery_charge': rate, 'effective_delivery_charge': rate, 'updated_at': datetime.now(timezone.utc)}}
             )
             updated_count = result.modified_count
         else:
@@ -2067,7 +2181,7 @@ def apply_delivery_to_all():
             }
             result = mongo.db.services.update_many(
                 query,
-                {'$set': {'delivery_charge': rate, 'updated_at': datetime.now(timezone.utc)}}
+                {'$set': {'delivery_charge': rate, 'effective_delivery_charge': rate, 'updated_at': datetime.now(timezone.utc)}}
             )
             updated_count = result.modified_count
 
@@ -2102,17 +2216,18 @@ def apply_delivery_by_category():
             {'$set': {'category': category, 'rate': rate, 'updated_at': datetime.now(timezone.utc)}},
             upsert=True
         )
+        PricingRulesService.invalidate()
 
         # Apply to all items in this category that don't have item-specific rate
         if rate_type == 'product':
             result = mongo.db.products.update_many(
                 {'categories': category, 'delivery_charge': None},
-                {'$set': {'delivery_charge': rate, 'updated_at': datetime.now(timezone.utc)}}
+                {'$set': {'delivery_charge': rate, 'effective_delivery_charge': rate, 'updated_at': datetime.now(timezone.utc)}}
             )
         else:
             result = mongo.db.services.update_many(
                 {'categories': category, 'delivery_charge': None},
-                {'$set': {'delivery_charge': rate, 'updated_at': datetime.now(timezone.utc)}}
+                {'$set': {'delivery_charge': rate, 'effective_delivery_charge': rate, 'updated_at': datetime.now(timezone.utc)}}
             )
 
         return jsonify({
@@ -2154,6 +2269,7 @@ def apply_delivery_to_item():
 
         if result.matched_count == 0:
             return jsonify({'error': f'{rate_type.capitalize()} not found'}), 404
+        PricingEngineService.refresh_item(item_id, rate_type)
 
         return jsonify({
             'message': f'Delivery charge of {rate} applied to {rate_type}'
@@ -13,6 +13,7 @@ from app.services.blacklist_service import BlacklistService
 from app.utils.otp import OTPManager
 from app.utils.sms import SMSService
 from app.utils.device import DeviceTokenManager
+from app.utils.password_hashing import rehash_if_needed
 from app.utils.token_manager import create_opaque_refresh_token, verify_opaque_refresh_token, revoke_opaque_refresh_token
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -114,6 +115,7 @@ def master_login():
         
         if not master.check_password(password):
             return jsonify({'error': 'Invalid username or password'}), 401
+        rehash_if_needed('master', master._id, password, master.password_hash)
         
         # Note: Status will be automatically updated to 'active' when socket connects
         # We don't block login based on status - status is managed by socket connection
@@ -368,6 +370,7 @@ def seller_login():
         
         if not password_correct:
             return jsonify({'error': 'Invalid Trade ID or password'}), 401
+        rehash_if_needed('sellers', seller._id, password, seller.password_hash)
         
         print(f"[LOGIN DEBUG] Login validated for {trade_id}. Checking device tokens...")
         
@@ -641,6 +644,7 @@ def outlet_man_login():
         outlet_man = outlet_man_temp
         if not outlet_man.check_password(password):
             return jsonify({'error': 'Invalid outlet access code or password'}), 401
+        rehash_if_needed('outlet_men', outlet_man._id, password, outlet_man.password_hash)
         
         user_id = str(outlet_man._id)
         user_data = outlet_man.to_dict(include_password=False)
@@ -1466,6 +1470,7 @@ def student_login():
         
     if not user.is_active:
         return jsonify({'error': 'Account is disabled'}), 403
+    rehash_if_needed('users', user._id, password, user.password_hash)
         
     SecurityService.record_successful_login(ip_address, 'users', 'username', username)
         
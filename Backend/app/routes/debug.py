@@ -1,8 +1,9 @@
 """
-Debug routes for active counter system
+Debug routes for active counter system and password hashing pool
 """
 from flask import Blueprint, jsonify
 from app.utils.active_counters import get_all_counts, reset_all_counters
+from app.utils.password_hashing import hashing_stats
 from flask_jwt_extended import jwt_required
 
 debug_bp = Blueprint('debug', __name__)
@@ -29,3 +30,12 @@ def reset_counters_debug():
         'message': 'All counters reset'
     })
 
+
+@debug_bp.route('/password-hashing', methods=['GET'])
+@jwt_required()
+def password_hashing_debug():
+    """Debug endpoint for the password hashing pool queue depth (requires auth)"""
+    return jsonify({
+        'success': True,
+        'stats': hashing_stats()
+    })
@@ -15,6 +15,8 @@ from app import mongo
 from app.models.service import Service
 from bson import ObjectId
 from app.utils.image_handler import normalize_image_reference
+from app.utils.order_search import order_search_filter
+from app.utils.pagination import decode_cursor, next_cursor_for
 
 orders_bp = Blueprint('orders', __name__)
 
@@ -297,13 +299,11 @@ def create_order():
                 qty = quantity
                 order_no = order_dict.get('orderNumber') or order_dict.get('order_number') or order_dict.get('id')
                 # Use the calculated values from order creation
-                unit_price_val = float(unit_price or 0)
                 total_amount_val = float(total_amount or 0)
-                message_body = (
-                    f"New order #{order_no}: {product_name} (Qty: {qty}, ₹{total_amount_val:.2f}). "
-                    "Visit BBHCBazaar seller dashboard to accept/reject."
+                SMSService.notify(
+                    'order_placed', seller_phone, email=seller_email, thumbnail=product_dict.get('thumbnail'),
+                    order_number=order_no, product_name=product_name, quantity=qty, total=f"{total_amount_val:.2f}"
                 )
-                SMSService.send_message(seller_phone, message_body, product_thumbnail=product_dict.get('thumbnail'), email=seller_email)
         except Exception as e:
             # Don't block order creation on SMS failure
             print(f"Failed to send SMS notification to seller: {str(e)}")
@@ -379,29 +379,38 @@ def list_orders():
         except Exception as e:
             print(f"Error parsing date filter: {e}")
 
-    # Search filter (order number, product name, seller name, user name)
+    # Search filter (order number, product name, seller name, user name) - token prefix match on search_keys
     search_param = request.args.get('search')
     if search_param:
-        search_regex = {'$regex': search_param, '$options': 'i'}
-        filter_query['$or'] = [
-            {'order_number': search_regex},
-            {'product_snapshot.name': search_regex},
-            {'seller_snapshot.name': search_regex},
-            {'user_snapshot.name': search_regex},
-            {'seller_snapshot.first_name': search_regex},
-            {'seller_snapshot.last_name': search_regex},
-            {'user_snapshot.first_name': search_regex},
-            {'user_snapshot.last_name': search_regex}
-        ]
-
-    orders, total = OrderService.get_orders(filter_query=filter_query, page=page, limit=limit)
+        search_filter = order_search_filter(search_param)
+        if search_filter:
+            filter_query.update(search_filter)
+
+    # Optional keyset continuation and total-count strategy ('exact', 'cached', 'estimated',
+    # or 'none' to skip counting when paging by cursor)
+    count_mode = request.args.get('count', 'exact')
+    if count_mode not in ('exact', 'cached', 'estimated', 'none'):
+        return jsonify({'error': "count must be 'exact', 'cached', 'estimated' or 'none'"}), 400
+    cursor = request.args.get('cursor')
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        orders, total = OrderService.get_orders(
+            filter_query=filter_query, page=page, limit=limit, after=after, count_mode=count_mode
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     return jsonify({
         'orders': _serialize_orders(orders),
         'total': total,
         'page': page,
         'limit': limit,
-        'totalPages': (total + limit - 1) // limit if limit > 0 else 0
+        'totalPages': None if total is None else ((total + limit - 1) // limit if limit > 0 else 0),
+        'next_cursor': next_cursor_for(orders, limit)
     }), 200
 
 
@@ -501,12 +510,14 @@ def seller_accept_order(order_id):
             order_number = updated_order.order_number or order_id
             quantity = updated_order.quantity or 1
             is_service = updated_order.type == 'service' or bool(updated_order.booking)
+            delivery_note = ''
             if not is_service:
                 arrival_date = calculate_arrival_date(updated_order.created_at, updated_order.delivery_span)
-                message = f"Order #{order_number} accepted! {product_name} (Qty: {quantity}). Expected delivery on or before {arrival_date}. Visit BBHCBazaar site for details."
-            else:
-                message = f"Order #{order_number} accepted! {product_name} (Qty: {quantity}). Visit BBHCBazaar site for details."
-            SMSService.send_message(user.phone_number, message, product_thumbnail=product_snapshot.get('thumbnail'), email=user.email)
+                delivery_note = f" Expected delivery on or before {arrival_date}."
+            SMSService.notify(
+                'order_accepted', user.phone_number, email=user.email, thumbnail=product_snapshot.get('thumbnail'),
+                order_number=order_number, product_name=product_name, quantity=quantity, delivery_note=delivery_note
+            )
     except Exception as e:
         # Don't fail the request if SMS fails
         print(f"Failed to send SMS notification to user: {str(e)}")
@@ -557,8 +568,11 @@ def seller_reject_order(order_id):
             order_number = updated_order.order_number or order_id
             quantity = updated_order.quantity or 1
             rejection_reason = updated_order.rejection_reason or reason
-            message = f"Order #{order_number} rejected: {product_name} (Qty: {quantity}). Reason: {rejection_reason}. Visit BBHCBazaar site for details."
-            SMSService.send_message(user.phone_number, message, product_thumbnail=product_snapshot.get('thumbnail'), email=user.email)
+            SMSService.notify(
+                'order_rejected', user.phone_number, email=user.email, thumbnail=product_snapshot.get('thumbnail'),
+                order_number=order_number, product_name=product_name, quantity=quantity,
+                reason=rejection_reason, by='', footer=' Visit BBHCBazaar site for details.'
+            )
     except Exception as e:
         # Don't fail the request if SMS fails
         print(f"Failed to send SMS notification to user: {str(e)}")
@@ -620,15 +634,19 @@ def scan_order_token():
             user = UserService.get_user_by_id(str(updated_order.user_id))
             if user and user.phone_number:
                 pickup_location = updated_order.pickup_location or 'BBHCBazaar Experience Outlet'
-                message = f"Order #{order_number}: {product_name} (Qty: {quantity}) ready for pickup at {pickup_location}. Visit BBHCBazaar outlet with your QR code to collect."
-                SMSService.send_message(user.phone_number, message, product_thumbnail=product_snapshot.get('thumbnail'), email=user.email)
+                SMSService.notify(
+                    'order_ready_for_pickup', user.phone_number, email=user.email, thumbnail=product_snapshot.get('thumbnail'),
+                    order_number=order_number, product_name=product_name, quantity=quantity, pickup_location=pickup_location
+                )
 
         elif order_status == 'completed':
             # User collected product - notify seller
             seller = SellerService.get_seller_by_id(str(updated_order.seller_id))
             if seller and seller.phone_number:
-                message = f"Order #{order_number} completed! {product_name} (Qty: {quantity}) collected. Total: ₹{total_amount:.2f}. Thanks!"
-                SMSService.send_message(seller.phone_number, message, product_thumbnail=product_snapshot.get('thumbnail'), email=seller.email)
+                SMSService.notify(
+                    'order_completed', seller.phone_number, email=seller.email, thumbnail=product_snapshot.get('thumbnail'),
+                    order_number=order_number, product_name=product_name, quantity=quantity, total=f"{total_amount:.2f}"
+                )
     except Exception as e:
         # Don't fail the request if SMS fails
         print(f"Failed to send SMS notification: {str(e)}")
@@ -679,15 +697,21 @@ def master_cancel_order(order_id):
         # Notify user
         user = UserService.get_user_by_id(str(updated_order.user_id))
         if user and user.phone_number:
-            message = f"Order #{order_number} cancelled: {product_name} (Qty: {quantity}). Reason: {rejection_reason}. Visit BBHCBazaar site for details."
-            SMSService.send_message(user.phone_number, message, email=user.email)
+            SMSService.notify(
+                'order_cancelled', user.phone_number, email=user.email,
+                order_number=order_number, product_name=product_name, quantity=quantity,
+                reason=rejection_reason, by='', footer=' Visit BBHCBazaar site for details.'
+            )
 
         # Notify seller
         if updated_order.seller_id:
             seller = SellerService.get_seller_by_id(str(updated_order.seller_id))
             if seller and seller.phone_number:
-                message = f"Order #{order_number} cancelled by admin: {product_name} (Qty: {quantity}). Reason: {rejection_reason}."
-                SMSService.send_message(seller.phone_number, message, email=seller.email)
+                SMSService.notify(
+                    'order_cancelled', seller.phone_number, email=seller.email,
+                    order_number=order_number, product_name=product_name, quantity=quantity,
+                    reason=rejection_reason, by=' by admin', footer=''
+                )
     except Exception as e:
         # Don't fail the request if SMS fails
         print(f"Failed to send SMS notification: {str(e)}")
@@ -727,8 +751,11 @@ def cancel_order(order_id):
             order_number = updated_order.order_number or order_id
             quantity = updated_order.quantity or 1
             rejection_reason = updated_order.rejection_reason or reason
-            message = f"Order #{order_number} cancelled by user: {product_name} (Qty: {quantity}). Reason: {rejection_reason}. Contact user for details."
-            SMSService.send_message(seller.phone_number, message, email=seller.email)
+            SMSService.notify(
+                'order_cancelled', seller.phone_number, email=seller.email,
+                order_number=order_number, product_name=product_name, quantity=quantity,
+                reason=rejection_reason, by=' by user', footer=' Contact user for details.'
+            )
     except Exception as e:
         # Don't fail the request if SMS fails
         print(f"Failed to send SMS notification to seller: {str(e)}")
@@ -775,15 +802,21 @@ def update_order_status(order_id):
         if status in ['rejected', 'seller_rejected'] and user_type == 'master':
             user = UserService.get_user_by_id(str(updated_order.user_id))
             if user and user.phone_number:
-                message = f"Order #{order_number} rejected by admin: {product_name} (Qty: {quantity}). Reason: {note_text}."
-                SMSService.send_message(user.phone_number, message, email=user.email)
+                SMSService.notify(
+                    'order_rejected', user.phone_number, email=user.email,
+                    order_number=order_number, product_name=product_name, quantity=quantity,
+                    reason=note_text, by=' by admin', footer=''
+                )
 
         # Notify seller when order is rejected or cancelled
         if status in ['rejected', 'seller_rejected', 'cancelled'] and user_type == 'master':
             seller = SellerService.get_seller_by_id(str(updated_order.seller_id))
             if seller and seller.phone_number:
-                message = f"Order #{order_number} rejected/cancelled by admin: {product_name} (Qty: {quantity}). Reason: {note_text}."
-                SMSService.send_message(seller.phone_number, message, email=seller.email)
+                SMSService.notify(
+                    'order_rejected', seller.phone_number, email=seller.email,
+                    order_number=order_number, product_name=product_name, quantity=quantity,
+                    reason=note_text, by='/cancelled by admin', footer=''
+                )
 
     except Exception as e:
         # Don't fail the request if SMS fails
@@ -11,6 +11,7 @@ from app.schemas.product_service_schemas import ServiceCreationSchema
 from app.services.seller_service import SellerService
 from app.services.service_service import ServiceService
 from app.sockets.emitter import emit_service_event
+from app.utils.pagination import decode_cursor, next_cursor_for
 
 service_bp = Blueprint('service', __name__)
 
@@ -97,11 +98,16 @@ def get_services():
     try:
         skip = request.args.get('skip', 0, type=int)
         limit = request.args.get('limit', 100, type=int)
-        services = ServiceService.get_all_services(skip=skip, limit=limit)
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        services = ServiceService.get_all_services(skip=skip, limit=limit, after=after)
         return jsonify({
             'services': [_service_response(s) for s in services],
-            'count': len(services)
+            'count': len(services),
+            'next_cursor': next_cursor_for(services, limit)
         }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to get services: {str(e)}'}), 500
 
@@ -257,12 +263,11 @@ def accept_service(service_id):
         if service and service.seller_phone:
             try:
                 from app.utils.sms import SMSService
-                message = f"Your service '{service.service_name}' has been approved and is now active on the store."
-                SMSService.send_message(
+                SMSService.notify(
+                    'service_approved',
                     service.seller_phone,
-                    message,
-                    product_thumbnail=service.thumbnail,
-                    title="Service Approved"
+                    thumbnail=service.thumbnail,
+                    service_name=service.service_name
                 )
             except Exception as ns_err:
                 print(f"[Notification] Failed to send service approval push: {str(ns_err)}")
@@ -298,12 +303,12 @@ def reject_service(service_id):
         if service.seller_phone:
             try:
                 from app.utils.sms import SMSService
-                message = f"Your service '{service.service_name}' has been rejected. Reason: {reason}."
-                SMSService.send_message(
+                SMSService.notify(
+                    'service_rejected',
                     service.seller_phone,
-                    message,
-                    product_thumbnail=service.thumbnail,
-                    title="Service Rejected"
+                    thumbnail=service.thumbnail,
+                    service_name=service.service_name,
+                    reason=reason
                 )
             except Exception as ns_err:
                 print(f"[Notification] Failed to send service rejection push: {str(ns_err)}")
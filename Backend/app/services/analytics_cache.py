@@ -0,0 +1,83 @@
+"""
+Analytics cache - in-process TTL cache for master dashboard results
+"""
+import functools
+import inspect
+import threading
+import time
+from threading import RLock
+
+# Seconds a computed result is served from memory. Order/statistics writes in
+# this process invalidate immediately; the TTL bounds staleness across processes.
+ANALYTICS_CACHE_TTL_SECONDS = 60
+ANALYTICS_CACHE_MAX_ENTRIES = 256
+
+_cache = {}
+_cache_lock = RLock()
+_generation = 0
+# Per-thread flag set by mark_analytics_failure() while a cached method runs
+_call_state = threading.local()
+
+
+def invalidate_analytics_cache():
+    """Drop every cached analytics result."""
+    global _generation
+    with _cache_lock:
+        _cache.clear()
+        _generation += 1
+
+
+def mark_analytics_failure():
+    """Call from a cached method's error path: its fallback result is returned but not cached."""
+    _call_state.failed = True
+
+
+def cached_analytics(endpoint):
+    """
+    Cache a staticmethod's result per (endpoint, period, start_date, end_date, other args).
+    Apply beneath @staticmethod.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            key = (
+                endpoint,
+                arguments.pop('period', None),
+                arguments.pop('start_date', None),
+                arguments.pop('end_date', None),
+                tuple(sorted(arguments.items())),
+            )
+
+            now = time.monotonic()
+            with _cache_lock:
+                entry = _cache.get(key)
+                if entry and entry[0] > now:
+                    return entry[1]
+                generation = _generation
+
+            outer_failed = getattr(_call_state, 'failed', False)
+            _call_state.failed = False
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                failed = _call_state.failed
+                # A failure inside a nested cached call also taints the caller's result
+                _call_state.failed = outer_failed or failed
+            if failed:
+                return result
+
+            with _cache_lock:
+                # Skip storing if an invalidation happened while computing
+                if generation == _generation:
+                    if len(_cache) >= ANALYTICS_CACHE_MAX_ENTRIES:
+                        _cache.clear()
+                    _cache[key] = (now + ANALYTICS_CACHE_TTL_SECONDS, result)
+            return result
+
+        return wrapper
+    return decorator
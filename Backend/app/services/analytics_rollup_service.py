@@ -0,0 +1,395 @@
+"""
+Analytics rollup service - incremental daily buckets for the master dashboard
+"""
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from app import mongo
+from app.services.analytics_cache import invalidate_analytics_cache
+
+# Rollup documents live in analytics_daily, one per (day, dimension, key):
+#   status   - orders created that day, by current status
+#   category - completed orders/revenue by first product category
+#   seller   - completed orders/revenue by seller_id
+#   sales    - completed orders/revenue for the day (key 'all')
+#   customer - customers placing their first order ('new') or ordering again on a later day ('returning')
+# Days are IST calendar days (the boundary the order and analytics date filters use);
+# `day` holds that date as a midnight datetime.
+ROLLUP_COLLECTION = 'analytics_daily'
+ROLLUP_BATCH_SIZE = 500
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# While rebuild() runs, incremental updates are journaled instead of applied and are
+# replayed onto the rebuilt collections; the marker lives in cache_versions
+ROLLUP_JOURNAL_COLLECTION = 'analytics_rollup_journal'
+REBUILD_MARKER_ID = 'analytics_rollup_rebuild'
+# Writers that saw the marker just before it was cleared get this long to journal
+REBUILD_GRACE_SECONDS = 5
+
+# Order fields the rollups are computed from
+ORDER_FIELDS = (
+    'created_at', 'status', 'type', 'user_id', 'seller_id', 'product_id',
+    'total_amount', 'order_total', 'quantity', 'unit_price',
+)
+
+
+def _day_start(value):
+    """The IST calendar day a timestamp falls on (naive timestamps are UTC)."""
+    if not isinstance(value, datetime):
+        value = datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    day = value.astimezone(IST).date()
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _day_filter(date_filter):
+    """Translate a created_at range from AnalyticsService._get_date_filter into whole-day bounds."""
+    day_filter = {}
+    if date_filter.get('$gte'):
+        day_filter['$gte'] = _day_start(date_filter['$gte'])
+    if date_filter.get('$lte'):
+        day_filter['$lte'] = _day_start(date_filter['$lte'])
+    return day_filter
+
+
+def _order_value(order, field, default=None):
+    if isinstance(order, dict):
+        return order.get(field, default)
+    return getattr(order, field, default)
+
+
+def _order_revenue(order):
+    """Order amount, falling back to quantity * unit_price for legacy documents."""
+    total = _order_value(order, 'total_amount') or _order_value(order, 'order_total') or 0
+    if not total:
+        quantity = _order_value(order, 'quantity') or 0
+        unit_price = _order_value(order, 'unit_price') or 0
+        if quantity > 0 and unit_price > 0:
+            total = quantity * unit_price
+    return float(total or 0)
+
+
+def _order_category(order):
+    """First category from the product snapshot, then from the product itself."""
+    snapshot = _order_value(order, 'product_snapshot') or {}
+    categories = snapshot.get('categories') or []
+    if not categories:
+        product_id = _order_value(order, 'product_id')
+        if product_id:
+            try:
+                product = mongo.db.products.find_one({'_id': ObjectId(product_id)}, {'categories': 1})
+                categories = (product or {}).get('categories') or []
+            except Exception:
+                categories = []
+    if not categories:
+        return 'Uncategorized'
+    first = categories[0]
+    return first if isinstance(first, str) else (first or {}).get('name', 'Uncategorized')
+
+
+def _tracked(order):
+    """Dashboard analytics cover product orders only (service orders are reported separately)."""
+    return order is not None and _order_value(order, 'type') != 'service'
+
+
+def _inc_op(day, dimension, key, orders=0, revenue=0.0):
+    key = str(key)
+    return UpdateOne(
+        {'_id': f"{day.strftime('%Y-%m-%d')}|{dimension}|{key}"},
+        {
+            '$inc': {'orders': orders, 'revenue': round(revenue, 2)},
+            '$setOnInsert': {'day': day, 'dimension': dimension, 'key': key},
+        },
+        upsert=True
+    )
+
+
+def _order_fields(order):
+    """The parts of an order the rollups need, as a plain document (for the rebuild journal)."""
+    fields = {field: _order_value(order, field) for field in ORDER_FIELDS}
+    snapshot = _order_value(order, 'product_snapshot') or {}
+    fields['product_snapshot'] = {'categories': snapshot.get('categories') or []}
+    return fields
+
+
+def _rebuild_in_progress():
+    return mongo.db.cache_versions.find_one({'_id': REBUILD_MARKER_ID, 'active': True}, {'_id': 1}) is not None
+
+
+def _journal(kind, order, old_status=None, new_status=None):
+    mongo.db[ROLLUP_JOURNAL_COLLECTION].insert_one({
+        'kind': kind,
+        'order_id': _order_value(order, '_id'),
+        'order': _order_fields(order),
+        'old_status': old_status,
+        'new_status': new_status,
+        'at': datetime.now(timezone.utc),
+    })
+
+
+def _completed_ops(order, day, sign):
+    revenue = _order_revenue(order) * sign
+    ops = [
+        _inc_op(day, 'sales', 'all', sign, revenue),
+        _inc_op(day, 'category', _order_category(order), sign, revenue),
+    ]
+    seller_id = _order_value(order, 'seller_id')
+    if seller_id:
+        ops.append(_inc_op(day, 'seller', seller_id, sign, revenue))
+    return ops
+
+
+class AnalyticsRollupService:
+    """Maintains and reads the analytics_daily rollup buckets"""
+
+    @staticmethod
+    def create_indexes(rollups=ROLLUP_COLLECTION, customers='analytics_customers'):
+        mongo.db[rollups].create_index([('dimension', 1), ('day', 1)])
+        mongo.db[rollups].create_index([('dimension', 1), ('key', 1), ('day', 1)])
+        mongo.db[customers].create_index([('first_order_day', 1)])
+
+    @staticmethod
+    def _write(operations):
+        if operations:
+            mongo.db[ROLLUP_COLLECTION].bulk_write(operations, ordered=False)
+            # Cached dashboard results are derived from the rollups
+            invalidate_analytics_cache()
+
+    @staticmethod
+    def record_new_order(order):
+        """Count a newly created order in the status and customer buckets."""
+        if not _tracked(order):
+            return
+        try:
+            if _rebuild_in_progress():
+                _journal('new', order, new_status=_order_value(order, 'status') or 'pending_seller')
+                return
+            AnalyticsRollupService._write(AnalyticsRollupService._new_order_ops(order))
+        except Exception as e:
+            print(f"[AnalyticsRollup] Failed to record new order: {e}")
+
+    @staticmethod
+    def _new_order_ops(order):
+        """Bucket increments for a new order (updates the order's customer record)."""
+        day = _day_start(_order_value(order, 'created_at'))
+        operations = [_inc_op(day, 'status', _order_value(order, 'status') or 'pending_seller', 1)]
+
+        user_id = _order_value(order, 'user_id')
+        if user_id:
+            previous = mongo.db.analytics_customers.find_one_and_update(
+                {'_id': user_id},
+                {
+                    '$inc': {'order_count': 1},
+                    '$set': {'last_order_day': day},
+                    '$setOnInsert': {'first_order_day': day},
+                },
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+            if previous is None:
+                operations.append(_inc_op(day, 'customer', 'new', 1))
+            else:
+                last_order_day = previous.get('last_order_day')
+                if not last_order_day or _day_start(last_order_day) != day:
+                    operations.append(_inc_op(day, 'customer', 'returning', 1))
+
+        if _order_value(order, 'status') == 'completed':
+            operations.extend(_completed_ops(order, day, 1))
+        return operations
+
+    @staticmethod
+    def record_status_change(order, old_status, new_status):
+        """Move an order between status buckets and (un)count completed revenue."""
+        if not _tracked(order) or not new_status or old_status == new_status:
+            return
+        try:
+            if _rebuild_in_progress():
+                _journal('status', order, old_status, new_status)
+                return
+            AnalyticsRollupService._write(AnalyticsRollupService._status_change_ops(order, old_status, new_status))
+        except Exception as e:
+            print(f"[AnalyticsRollup] Failed to record status change: {e}")
+
+    @staticmethod
+    def _status_change_ops(order, old_status, new_status):
+        day = _day_start(_order_value(order, 'created_at'))
+        operations = [_inc_op(day, 'status', new_status, 1)]
+        if old_status:
+            operations.append(_inc_op(day, 'status', old_status, -1))
+        if new_status == 'completed':
+            operations.extend(_completed_ops(order, day, 1))
+        elif old_status == 'completed':
+            operations.extend(_completed_ops(order, day, -1))
+        return operations
+
+    @staticmethod
+    def day_filter(date_filter):
+        """Whole-day bounds on the rollup `day` field for a created_at range."""
+        return _day_filter(date_filter)
+
+    @staticmethod
+    def get_buckets(dimension, date_filter):
+        """Rollup documents for a dimension within a created_at-style date filter."""
+        query = {'dimension': dimension}
+        day_filter = _day_filter(date_filter)
+        if day_filter:
+            query['day'] = day_filter
+        return list(mongo.db[ROLLUP_COLLECTION].find(query, {'_id': 0}).sort('day', 1))
+
+    @staticmethod
+    def totals_by_key(dimension, date_filter):
+        """Sum orders/revenue per key over the window, server-side."""
+        match = {'dimension': dimension}
+        day_filter = _day_filter(date_filter)
+        if day_filter:
+            match['day'] = day_filter
+        pipeline = [
+            {'$match': match},
+            {'$group': {'_id': '$key', 'orders': {'$sum': '$orders'}, 'revenue': {'$sum': '$revenue'}}},
+        ]
+        return {
+            row['_id']: {'orders': row['orders'], 'revenue': round(row['revenue'], 2)}
+            for row in mongo.db[ROLLUP_COLLECTION].aggregate(pipeline)
+        }
+
+    @staticmethod
+    def replay_journal(scanned_statuses):
+        """
+        Apply journaled updates onto the live rollups. `scanned_statuses` maps order ids to the
+        status rebuild() counted them with; transitions the scan already reflected are skipped.
+        Returns the number of journal entries consumed.
+        """
+        journal = mongo.db[ROLLUP_JOURNAL_COLLECTION]
+        entries = list(journal.find({}).sort('_id', 1))
+        if not entries:
+            return 0
+        operations = []
+        for entry in entries:
+            order = entry['order']
+            order_id = entry.get('order_id')
+            status = scanned_statuses.get(order_id)
+            if entry['kind'] == 'new':
+                # Orders the scan saw are already counted, customer record included
+                if status is None:
+                    operations.extend(AnalyticsRollupService._new_order_ops(order))
+                    scanned_statuses[order_id] = entry['new_status']
+                continue
+            # Status changes chain old -> new; the scan read the order somewhere along the chain
+            if status is not None and entry['old_status'] != status:
+                continue
+            operations.extend(AnalyticsRollupService._status_change_ops(order, entry['old_status'], entry['new_status']))
+            scanned_statuses[order_id] = entry['new_status']
+        AnalyticsRollupService._write(operations)
+        journal.delete_many({'_id': {'$in': [entry['_id'] for entry in entries]}})
+        return len(entries)
+
+    @staticmethod
+    def rebuild():
+        """
+        Recompute every rollup from order history. Returns the number of orders scanned.
+
+        The new rollups are built in side collections and renamed over the live ones.
+        Updates made meanwhile are journaled (see record_new_order/record_status_change)
+        and replayed afterwards, so no increment is lost to the swap.
+        """
+        markers = mongo.db.cache_versions
+        journal = mongo.db[ROLLUP_JOURNAL_COLLECTION]
+        # Entries left by an interrupted rebuild are already reflected in the orders we scan
+        journal.delete_many({})
+        markers.update_one(
+            {'_id': REBUILD_MARKER_ID},
+            {'$set': {'active': True, 'started_at': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        statuses = {}
+        try:
+            scanned = AnalyticsRollupService._rebuild_collections(statuses)
+        except Exception:
+            # Keep the old rollups and apply what was journaled while we ran
+            markers.update_one({'_id': REBUILD_MARKER_ID}, {'$set': {'active': False}})
+            time.sleep(REBUILD_GRACE_SECONDS)
+            AnalyticsRollupService.replay_journal({})
+            raise
+
+        AnalyticsRollupService.replay_journal(statuses)
+        markers.update_one({'_id': REBUILD_MARKER_ID}, {'$set': {'active': False}})
+        time.sleep(REBUILD_GRACE_SECONDS)
+        AnalyticsRollupService.replay_journal(statuses)
+        invalidate_analytics_cache()
+        return scanned
+
+    @staticmethod
+    def _rebuild_collections(statuses):
+        """Scan orders into fresh rollup/customer collections and swap them in. Fills `statuses`."""
+        buckets = defaultdict(lambda: [0, 0.0])
+        customers = {}
+        scanned = 0
+
+        def _add(day, dimension, key, orders, revenue=0.0):
+            bucket = buckets[(day, dimension, str(key))]
+            bucket[0] += orders
+            bucket[1] += revenue
+
+        projection = {field: 1 for field in ORDER_FIELDS}
+        projection['product_snapshot.categories'] = 1
+        for order_doc in mongo.db.orders.find({}, projection).sort([('created_at', 1), ('_id', 1)]):
+            if not _tracked(order_doc):
+                continue
+            scanned += 1
+            day = _day_start(order_doc.get('created_at'))
+            status = order_doc.get('status') or 'pending_seller'
+            statuses[order_doc['_id']] = status
+            _add(day, 'status', status, 1)
+
+            user_id = order_doc.get('user_id')
+            if user_id:
+                customer = customers.get(user_id)
+                if customer is None:
+                    customers[user_id] = {'first_order_day': day, 'last_order_day': day, 'order_count': 1}
+                    _add(day, 'customer', 'new', 1)
+                else:
+                    if customer['last_order_day'] != day:
+                        _add(day, 'customer', 'returning', 1)
+                    customer['last_order_day'] = day
+                    customer['order_count'] += 1
+
+            if status == 'completed':
+                revenue = _order_revenue(order_doc)
+                _add(day, 'sales', 'all', 1, revenue)
+                _add(day, 'category', _order_category(order_doc), 1, revenue)
+                if order_doc.get('seller_id'):
+                    _add(day, 'seller', order_doc['seller_id'], 1, revenue)
+
+        rollups_name = f"{ROLLUP_COLLECTION}_rebuild"
+        customers_name = 'analytics_customers_rebuild'
+        mongo.db[rollups_name].drop()
+        mongo.db[customers_name].drop()
+        # Creates both collections even when there is nothing to insert
+        AnalyticsRollupService.create_indexes(rollups_name, customers_name)
+
+        documents = [
+            {
+                '_id': f"{day.strftime('%Y-%m-%d')}|{dimension}|{key}",
+                'day': day,
+                'dimension': dimension,
+                'key': key,
+                'orders': orders,
+                'revenue': round(revenue, 2),
+            }
+            for (day, dimension, key), (orders, revenue) in buckets.items()
+        ]
+        for start in range(0, len(documents), ROLLUP_BATCH_SIZE):
+            mongo.db[rollups_name].insert_many(documents[start:start + ROLLUP_BATCH_SIZE], ordered=False)
+
+        customer_docs = [{'_id': user_id, **fields} for user_id, fields in customers.items()]
+        for start in range(0, len(customer_docs), ROLLUP_BATCH_SIZE):
+            mongo.db[customers_name].insert_many(customer_docs[start:start + ROLLUP_BATCH_SIZE], ordered=False)
+
+        mongo.db[rollups_name].rename(ROLLUP_COLLECTION, dropTarget=True)
+        mongo.db[customers_name].rename('analytics_customers', dropTarget=True)
+        return scanned
@@ -5,6 +5,9 @@ from app import mongo
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 from collections import defaultdict
+from app.services.analytics_cache import cached_analytics, mark_analytics_failure
+from app.utils.active_counters import get_all_counts
+from app.services.analytics_rollup_service import AnalyticsRollupService, IST, ROLLUP_COLLECTION
 
 
 class AnalyticsService:
@@ -131,33 +134,23 @@ class AnalyticsService:
         }
     
     @staticmethod
+    @cached_analytics('stats')
     def get_stats():
         """Get overall statistics"""
         try:
             total_users = mongo.db.users.count_documents({})
             total_sellers = mongo.db.sellers.count_documents({})
             
-            # Count active users (users with active socket connection)
-            # Active users = users with socket_id (connected via socket)
-            # This counts regular users with active socket connections, not sellers/masters
-            active_users = mongo.db.users.count_documents({
-                'socket_id': {'$ne': None}
-            })
-            
-            # Count active sellers (sellers with is_active=True or socket_id)
-            active_sellers = mongo.db.sellers.count_documents({
-                '$or': [
-                    {'is_active': True},
-                    {'socket_id': {'$ne': None}}
-                ]
-            })
+            # Active users/sellers = live sockets across all worker processes
+            counts = get_all_counts()
+            active_users = counts['users']
+            active_sellers = counts['sellers']
             
             total_orders = mongo.db.orders.count_documents({})
             total_products = mongo.db.products.count_documents({})
             
-            # Calculate total revenue from completed orders
-            completed_orders = mongo.db.orders.find({'status': 'completed'})
-            total_revenue = sum(order.get('order_total', 0) for order in completed_orders)
+            # Total revenue from completed orders (all-time sum of the daily sales rollup)
+            total_revenue = AnalyticsRollupService.totals_by_key('sales', {}).get('all', {}).get('revenue', 0)
             
             return {
                 'totalUsers': total_users,
@@ -169,6 +162,7 @@ class AnalyticsService:
                 'totalRevenue': total_revenue
             }
         except Exception as e:
+            mark_analytics_failure()
             print(f"Error computing stats: {e}")
             return {
                 'totalUsers': 0,
@@ -181,81 +175,33 @@ class AnalyticsService:
             }
     
     @staticmethod
+    @cached_analytics('sales-by-category')
     def get_sales_by_category(period='monthly', start_date=None, end_date=None):
-        """Get sales by category - calculate total revenue by category"""
+        """Get sales by category - total revenue by category, read from the daily rollups"""
         try:
             date_filter = AnalyticsService._get_date_filter(period, start_date, end_date)
             
             # Get all categories from categories collection
-            categories = list(mongo.db.categories.find({}))
-            category_names = [cat.get('name') for cat in categories]
-            
-            # Get all completed orders in the period
-            completed_orders = list(mongo.db.orders.find({
-                'status': 'completed',
-                'created_at': date_filter
-            }))
+            category_names = [cat.get('name') for cat in mongo.db.categories.find({}, {'name': 1})]
             
-            # Calculate revenue by category (not just count)
-            category_sales = defaultdict(float)
-            category_counts = defaultdict(int)  # Also track order count for reference
-            
-            for order in completed_orders:
-                # Get order total amount
-                order_total = order.get('total_amount') or order.get('totalAmount') or order.get('order_total') or 0
-                
-                # If total_amount is 0, try to calculate from quantity and unit_price
-                if order_total == 0:
-                    quantity = order.get('quantity', 0)
-                    unit_price = order.get('unit_price') or order.get('unitPrice', 0)
-                    if quantity > 0 and unit_price > 0:
-                        order_total = quantity * unit_price
-                
-                # Get category from product_snapshot or product
-                product_snapshot = order.get('product_snapshot', {})
-                categories_list = product_snapshot.get('categories', [])
-                
-                # If categories is a list, use first category
-                if categories_list and len(categories_list) > 0:
-                    category_name = categories_list[0] if isinstance(categories_list[0], str) else categories_list[0].get('name', 'Uncategorized')
-                else:
-                    # Try to get from product_id
-                    product_id = order.get('product_id')
-                    if product_id:
-                        try:
-                            product = mongo.db.products.find_one({'_id': ObjectId(product_id)})
-                            if product:
-                                product_categories = product.get('categories', [])
-                                if product_categories and len(product_categories) > 0:
-                                    category_name = product_categories[0] if isinstance(product_categories[0], str) else product_categories[0].get('name', 'Uncategorized')
-                                else:
-                                    category_name = 'Uncategorized'
-                            else:
-                                category_name = 'Uncategorized'
-                        except:
-                            category_name = 'Uncategorized'
-                    else:
-                        category_name = 'Uncategorized'
-                
-                # Add revenue to category
-                category_sales[category_name] += order_total
-                category_counts[category_name] += 1
+            category_totals = AnalyticsRollupService.totals_by_key('category', date_filter)
             
             # Create result with all categories that have sales
             result = []
             
             # Combine categories from collection and categories from orders
-            all_cat_names = set(category_names) | set(category_sales.keys())
+            all_cat_names = set(category_names) | set(category_totals.keys())
             
             for cat_name in all_cat_names:
-                total_val = round(category_sales.get(cat_name, 0), 2)
+                totals = category_totals.get(cat_name, {})
+                total_val = round(totals.get('revenue', 0), 2)
                 if total_val > 0 or cat_name in category_names:
                     result.append({
                         'category': cat_name,
                         'name': cat_name,
                         'value': total_val,  # Revenue amount
                         'sales': total_val,  # Also include as 'sales' for compatibility
-                        'orders': category_counts.get(cat_name, 0)  # Order count for reference
+                        'orders': totals.get('orders', 0)  # Order count for reference
                     })
             
             # Sort by revenue descending
@@ -263,76 +209,52 @@ class AnalyticsService:
             
             return result
         except Exception as e:
+            mark_analytics_failure()
             print(f"Error computing sales by category: {e}")
             import traceback
             traceback.print_exc()
             return []
     
     @staticmethod
+    def _period_key(day, period):
+        """Bucket label for a day: YYYY-MM-DD (daily), week start (weekly) or YYYY-MM (monthly)"""
+        if period == 'daily':
+            return day.strftime('%Y-%m-%d')
+        if period == 'weekly':
+            # Get week start (Monday)
+            return (day - timedelta(days=day.weekday())).strftime('%Y-%m-%d')
+        return day.strftime('%Y-%m')
+    
+    @staticmethod
+    @cached_analytics('sales-trend')
     def get_sales_trend(period='monthly', start_date=None, end_date=None):
-        """Get sales trend over time"""
+        """Get sales trend over time from the daily sales rollup"""
         try:
             date_filter = AnalyticsService._get_date_filter(period, start_date, end_date)
             
-            orders = list(mongo.db.orders.find({
-                'status': 'completed',
-                'created_at': date_filter
-            }))
-            
-            # Group by date
-            daily_sales = defaultdict(float)
-            
-            for order in orders:
-                order_date = order.get('created_at')
-                if order_date:
-                    if isinstance(order_date, str):
-                        order_date = datetime.fromisoformat(order_date.replace('Z', '+00:00'))
-                    elif not isinstance(order_date, datetime):
-                        continue
-                    
-                    # Format date based on period
-                    if period == 'daily':
-                        date_key = order_date.strftime('%Y-%m-%d')
-                    elif period == 'weekly':
-                        # Get week start (Monday)
-                        week_start = order_date - timedelta(days=order_date.weekday())
-                        date_key = week_start.strftime('%Y-%m-%d')
-                    else:  # monthly
-                        date_key = order_date.strftime('%Y-%m')
-                    
-                    daily_sales[date_key] += order.get('order_total', 0)
+            # Group daily buckets by period
+            period_sales = defaultdict(float)
+            for bucket in AnalyticsRollupService.get_buckets('sales', date_filter):
+                period_sales[AnalyticsService._period_key(bucket['day'], period)] += bucket.get('revenue', 0)
             
             # Convert to sorted list
-            result = [
+            return [
                 {'date': date, 'sales': round(revenue, 2)}
-                for date, revenue in sorted(daily_sales.items())
+                for date, revenue in sorted(period_sales.items())
             ]
-            
-            return result
         except Exception as e:
+            mark_analytics_failure()
             print(f"Error computing sales trend: {e}")
             return []
     
     @staticmethod
+    @cached_analytics('orders-by-status')
     def get_orders_by_status(period='monthly', start_date=None, end_date=None):
         """Get orders grouped by status"""
         try:
             date_filter = AnalyticsService._get_date_filter(period, start_date, end_date)
             
-            pipeline = [
-                {'$match': {'created_at': date_filter}},
-                {'$group': {
-                    '_id': '$status',
-                    'count': {'$sum': 1}
-                }},
-                {'$project': {
-                    '_id': 0,
-                    'status': '$_id',
-                    'count': 1
-                }}
-            ]
-            
-            results = list(mongo.db.orders.aggregate(pipeline))
+            status_totals = AnalyticsRollupService.totals_by_key('status', date_filter)
             
             # System active statuses whitelist (in logical sequence)
             active_statuses = [
@@ -340,7 +262,7 @@ class AnalyticsService:
                 'completed', 'seller_rejected', 'cancelled', 'cancelled_master'
             ]
             
-            status_map = {r.get('status', 'unknown'): r.get('count', 0) for r in results}
+            status_map = {status: totals['orders'] for status, totals in status_totals.items() if totals['orders'] > 0}
             
             return [
                 {'status': status, 'count': status_map.get(status, 0)}
@@ -348,113 +270,137 @@ class AnalyticsService:
                 if status in status_map or status_map.get(status, 0) > 0 # Only show if in map or has count
             ]
         except Exception as e:
+            mark_analytics_failure()
             print(f"Error computing orders by status: {e}")
             return []
     
     @staticmethod
+    @cached_analytics('revenue-vs-commissions')
     def get_revenue_vs_commissions(period='monthly', start_date=None, end_date=None):
         """Get revenue vs commissions earned from statistics collection"""
         try:
             from app.services.statistics_service import StatisticsService
             return StatisticsService.get_revenue_vs_commissions(period, start_date, end_date)
         except Exception as e:
+            mark_analytics_failure()
             print(f"Error computing revenue vs commissions: {e}")
             return []
     
     @staticmethod
+    @cached_analytics('customer-growth')
     def get_customer_growth(period='monthly', start_date=None, end_date=None):
-        """Get customer growth over time"""
+        """Get customer growth over time, grouped server-side"""
         try:
             date_filter = AnalyticsService._get_date_filter(period, start_date, end_date)
             
-            # Get users in the period
-            users = list(mongo.db.users.find({'created_at': date_filter}))
-            
-            # Group by date
-            daily_growth = defaultdict(int)
-            
-            for user in users:
-                created_at = user.get('created_at')
-                if created_at:
-                    if isinstance(created_at, str):
-                        created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    elif not isinstance(created_at, datetime):
-                        continue
-                    
-                    # Format date based on period
-                    if period == 'daily':
-                        date_key = created_at.strftime('%Y-%m-%d')
-                    elif period == 'weekly':
-                        week_start = created_at - timedelta(days=created_at.weekday())
-                        date_key = week_start.strftime('%Y-%m-%d')
-                    else:  # monthly
-                        date_key = created_at.strftime('%Y-%m')
-                    
-                    daily_growth[date_key] += 1
+            if period == 'daily':
+                date_key = {'$dateToString': {'format': '%Y-%m-%d', 'date': '$created_at'}}
+            elif period == 'weekly':
+                # Week start (Monday): step back ($dayOfWeek + 5) % 7 days
+                days_since_monday = {'$mod': [{'$add': [{'$dayOfWeek': '$created_at'}, 5]}, 7]}
+                date_key = {'$dateToString': {
+                    'format': '%Y-%m-%d',
+                    'date': {'$subtract': ['$created_at', {'$multiply': [days_since_monday, 86400000]}]}
+                }}
+            else:  # monthly
+                date_key = {'$dateToString': {'format': '%Y-%m', 'date': '$created_at'}}
             
-            # Convert to sorted list
-            result = [
-                {'date': date, 'count': count}
-                for date, count in sorted(daily_growth.items())
+            pipeline = [
+                {'$match': {'created_at': date_filter}},
+                {'$group': {'_id': date_key, 'count': {'$sum': 1}}},
+                {'$sort': {'_id': 1}}
+            ]
+            return [
+                {'date': row['_id'], 'count': row['count']}
+                for row in mongo.db.users.aggregate(pipeline)
+                if row['_id']
             ]
-            
-            return result
         except Exception as e:
+            mark_analytics_failure()
             print(f"Error computing customer growth: {e}")
             return []
     
     @staticmethod
+    @cached_analytics('returning-vs-new')
     def get_returning_vs_new(period='monthly', start_date=None, end_date=None):
-        """Get returning vs new customers"""
+        """
+        Get returning vs new customers from the customer rollup.
+        new: customers whose first order falls in the period;
+        returning: days in the period on which an existing customer ordered again.
+        """
         try:
             date_filter = AnalyticsService._get_date_filter(period, start_date, end_date)
-            
-            # Get all users who made orders in the period
-            orders = list(mongo.db.orders.find({
-                'created_at': date_filter
-            }))
-            
-            user_order_count = defaultdict(int)
-            for order in orders:
-                user_id = order.get('user_id')
-                if user_id:
-                    user_order_count[str(user_id)] += 1
-            
-            new_customers = 0
-            returning_customers = 0
-            
-            for user_id, order_count in user_order_count.items():
-                if order_count == 1:
-                    new_customers += 1
-                else:
-                    returning_customers += 1
-            
-            total = new_customers + returning_customers
-            if total == 0:
-                return {'new': 0, 'returning': 0}
-            
+            customer_totals = AnalyticsRollupService.totals_by_key('customer', date_filter)
             return {
-                'new': new_customers,
-                'returning': returning_customers
+                'new': customer_totals.get('new', {}).get('orders', 0),
+                'returning': customer_totals.get('returning', {}).get('orders', 0)
             }
         except Exception as e:
+            mark_analytics_failure()
             print(f"Error computing returning vs new: {e}")
             return {'new': 0, 'returning': 0}
     
     
     @staticmethod
+    def _seller_display_name(seller_doc):
+        """'First Last (TRADE_ID)', falling back to the trade id or 'Unknown'"""
+        if not seller_doc:
+            return 'Unknown'
+        first_name = seller_doc.get('first_name', '')
+        last_name = seller_doc.get('last_name', '')
+        trade_id = seller_doc.get('trade_id', '')
+        seller_name = f"{first_name} {last_name}".strip() if (first_name or last_name) else (trade_id or 'Unknown')
+        if trade_id and seller_name != trade_id and seller_name != 'Unknown':
+            return f"{seller_name} ({trade_id})"
+        return trade_id or seller_name
+    
+    @staticmethod
+    def _seller_lookup_stages(seller_id_field=None):
+        """
+        $lookup stages resolving the seller of a joined `product`, in _get_seller_info priority:
+        explicit seller id, product seller_trade_id, then product created_by_user_id.
+        """
+        def _to_object_id(field):
+            return {'$convert': {'input': field, 'to': 'objectId', 'onError': None, 'onNull': None}}
+        
+        return [
+            {'$addFields': {
+                '_seller_explicit_id': _to_object_id(seller_id_field) if seller_id_field else None,
+                '_seller_creator_id': _to_object_id('$product.created_by_user_id'),
+            }},
+            {'$addFields': {'_seller_ref_ids': ['$_seller_explicit_id', '$_seller_creator_id']}},
+            {'$lookup': {
+                'from': 'sellers', 'localField': '_seller_ref_ids', 'foreignField': '_id', 'as': '_sellers_by_id'
+            }},
+            {'$lookup': {
+                'from': 'sellers', 'localField': 'product.seller_trade_id', 'foreignField': 'trade_id',
+                'as': '_sellers_by_trade_id'
+            }},
+        ]
+    
+    @staticmethod
+    def _resolve_joined_seller(doc):
+        """Pick the seller matched by _seller_lookup_stages, honouring the lookup priority"""
+        sellers_by_id = {seller['_id']: seller for seller in doc.get('_sellers_by_id', [])}
+        candidates = [sellers_by_id.get(doc.get('_seller_explicit_id'))]
+        candidates += doc.get('_sellers_by_trade_id', [])[:1]
+        candidates.append(sellers_by_id.get(doc.get('_seller_creator_id')))
+        return next((seller for seller in candidates if seller), None)
+    
+    @staticmethod
+    @cached_analytics('top-products')
     def get_top_products(period='monthly', sort_by='rating', limit=5, start_date=None, end_date=None):
-        """Get top products by rating or sales"""
+        """Get top products by rating or sales (one aggregation round trip each)"""
         try:
             if sort_by == 'rating':
-                # Get top-rated products
-                # Aggregate ratings to get average rating per product
+                # Average rating per product, joined to the product and its seller server-side
                 pipeline = [
                     {
                         '$group': {
                             '_id': '$product_id',
                             'avg_rating': {'$avg': '$rating'},
-                            'rating_count': {'$sum': 1}
+                            'rating_count': {'$sum': 1},
+                            'seller_id': {'$first': '$seller_id'}
                         }
                     },
                     {
@@ -463,193 +409,150 @@ class AnalyticsService:
                     },
                     {
                         '$limit': limit
-                    }
-                ]
-                
-                rating_results = list(mongo.db.ratings.aggregate(pipeline))
+                    },
+                    {'$lookup': {'from': 'products', 'localField': '_id', 'foreignField': '_id', 'as': 'product'}},
+                    {'$unwind': '$product'},
+                ] + AnalyticsService._seller_lookup_stages('$seller_id')
                 
-                # Get product details for each rated product
                 result = []
-                for rating_data in rating_results:
-                    product_id = rating_data['_id']
-                    product = mongo.db.products.find_one({'_id': ObjectId(product_id)})
-                    
-                    if product:
-                        # Get seller info - check rating document for seller_id first (most reliable)
-                        # Get the first rating for this product to get seller_id
-                        rating_doc = mongo.db.ratings.find_one({'product_id': ObjectId(product_id)})
-                        seller_id_from_rating = rating_doc.get('seller_id') if rating_doc else None
-                        
-                        seller_info = AnalyticsService._get_seller_info(
-                            seller_id=seller_id_from_rating,
-                            seller_trade_id=product.get('seller_trade_id'),
-                            created_by_user_id=product.get('created_by_user_id'),
-                            product_doc=product,
-                            rating_doc=rating_doc
-                        )
-                        seller_name = seller_info['display_name']
-                        
-                        result.append({
-                            'product_id': str(product_id),
-                            'name': product.get('product_name', 'Unknown'),
-                            'rating': round(rating_data['avg_rating'], 2),
-                            'rating_count': rating_data['rating_count'],
-                            'thumbnail': product.get('thumbnail', ''),
-                            'selling_price': product.get('selling_price', 0),
-                            'specification': product.get('specification', ''),
-                            'seller_name': seller_name,
-                            'quantity': product.get('quantity') or product.get('stock_quantity', 0)
-                        })
+                for row in mongo.db.ratings.aggregate(pipeline):
+                    product = row['product']
+                    result.append({
+                        'product_id': str(row['_id']),
+                        'name': product.get('product_name', 'Unknown'),
+                        'rating': round(row['avg_rating'], 2),
+                        'rating_count': row['rating_count'],
+                        'thumbnail': product.get('thumbnail', ''),
+                        'selling_price': product.get('selling_price', 0),
+                        'specification': product.get('specification', ''),
+                        'seller_name': AnalyticsService._seller_display_name(
+                            AnalyticsService._resolve_joined_seller(row)
+                        ),
+                        'quantity': product.get('quantity') or product.get('stock_quantity', 0)
+                    })
                 
                 return result
             else:
-                # Get top selling products (by revenue)
+                # Top selling products by revenue from completed orders in the period
                 date_filter = AnalyticsService._get_date_filter(period, start_date, end_date)
                 
-                orders = list(mongo.db.orders.find({
-                    'status': 'completed',
-                    'created_at': date_filter
-                }))
-                
-                product_sales = defaultdict(lambda: {'quantity': 0, 'revenue': 0, 'product_id': None})
-                
-                for order in orders:
-                    items = order.get('items', [])
-                    for item in items:
-                        product_id = item.get('product_id')
-                        if product_id:
-                            product = mongo.db.products.find_one({'_id': ObjectId(product_id)})
-                            if product:
-                                product_name = product.get('product_name', 'Unknown')
-                                quantity = item.get('quantity', 0)
-                                revenue = item.get('price', 0) * quantity
-                                
-                                if product_sales[product_name]['product_id'] is None:
-                                    product_sales[product_name]['product_id'] = str(product_id)
-                                
-                                product_sales[product_name]['quantity'] += quantity
-                                product_sales[product_name]['revenue'] += revenue
+                pipeline = [
+                    {'$match': {'status': 'completed', 'created_at': date_filter}},
+                    # Multi-item orders carry `items`; single-product orders use top-level fields
+                    {'$project': {'items': {'$ifNull': ['$items', [{
+                        'product_id': '$product_id',
+                        'quantity': '$quantity',
+                        'price': '$unit_price'
+                    }]]}}},
+                    {'$unwind': '$items'},
+                    {'$match': {'items.product_id': {'$ne': None}}},
+                    {'$group': {
+                        '_id': '$items.product_id',
+                        'quantity': {'$sum': {'$ifNull': ['$items.quantity', 0]}},
+                        'revenue': {'$sum': {'$multiply': [
+                            {'$ifNull': ['$items.price', 0]},
+                            {'$ifNull': ['$items.quantity', 0]}
+                        ]}}
+                    }},
+                    {'$sort': {'revenue': -1, '_id': 1}},
+                    {'$lookup': {'from': 'products', 'localField': '_id', 'foreignField': '_id', 'as': 'product'}},
+                    {'$unwind': '$product'},
+                    {'$limit': limit},
+                    {'$lookup': {
+                        'from': 'ratings',
+                        'let': {'product_id': '$_id'},
+                        'pipeline': [
+                            {'$match': {'$expr': {'$eq': ['$product_id', '$$product_id']}}},
+                            {'$group': {'_id': None, 'avg_rating': {'$avg': '$rating'}, 'rating_count': {'$sum': 1}}}
+                        ],
+                        'as': 'rating_stats'
+                    }},
+                ] + AnalyticsService._seller_lookup_stages()
                 
-                # Convert to list and sort by revenue
                 result = []
-                for name, data in sorted(product_sales.items(), key=lambda x: x[1]['revenue'], reverse=True)[:limit]:
-                    product = mongo.db.products.find_one({'_id': ObjectId(data['product_id'])})
-                    if product:
-                        # Get seller info using comprehensive helper
-                        seller_info = AnalyticsService._get_seller_info(
-                            seller_trade_id=product.get('seller_trade_id'),
-                            created_by_user_id=product.get('created_by_user_id'),
-                            product_doc=product
-                        )
-                        seller_name = seller_info['display_name']
-                        
-                        # Get rating stats
-                        rating_pipeline = [
-                            {'$match': {'product_id': ObjectId(data['product_id'])}},
-                            {
-                                '$group': {
-                                    '_id': None,
-                                    'avg_rating': {'$avg': '$rating'},
-                                    'rating_count': {'$sum': 1}
-                                }
-                            }
-                        ]
-                        rating_stats = list(mongo.db.ratings.aggregate(rating_pipeline))
-                        avg_rating = rating_stats[0]['avg_rating'] if rating_stats else 0
-                        rating_count = rating_stats[0]['rating_count'] if rating_stats else 0
-                        
-                        result.append({
-                            'product_id': data['product_id'],
-                            'name': name,
-                            'quantity': data['quantity'],
-                            'revenue': round(data['revenue'], 2),
-                            'thumbnail': product.get('thumbnail', ''),
-                            'selling_price': product.get('selling_price', 0),
-                            'specification': product.get('specification', ''),
-                            'seller_name': seller_name,
-                            'rating': round(avg_rating, 2) if avg_rating else 0,
-                            'rating_count': rating_count
-                        })
+                for row in mongo.db.orders.aggregate(pipeline):
+                    product = row['product']
+                    rating_stats = row['rating_stats'][0] if row.get('rating_stats') else {}
+                    avg_rating = rating_stats.get('avg_rating') or 0
+                    result.append({
+                        'product_id': str(row['_id']),
+                        'name': product.get('product_name', 'Unknown'),
+                        'quantity': row['quantity'],
+                        'revenue': round(row['revenue'], 2),
+                        'thumbnail': product.get('thumbnail', ''),
+                        'selling_price': product.get('selling_price', 0),
+                        'specification': product.get('specification', ''),
+                        'seller_name': AnalyticsService._seller_display_name(
+                            AnalyticsService._resolve_joined_seller(row)
+                        ),
+                        'rating': round(avg_rating, 2) if avg_rating else 0,
+                        'rating_count': rating_stats.get('rating_count', 0)
+                    })
                 
                 return result
         except Exception as e:
+            mark_analytics_failure()
             print(f"Error computing top products: {e}")
             import traceback
             traceback.print_exc()
             return []
     
     @staticmethod
+    @cached_analytics('sales-by-seller')
     def get_sales_by_seller(period='monthly', limit=5, start_date=None, end_date=None):
         """Get sales by seller - revenue earned by each seller (after commission deduction)"""
         try:
-            # Get date filter for period
             date_filter = AnalyticsService._get_date_filter(period, start_date, end_date)
+            commission_rate = 0.10  # 10% commission
             
-            # Get all sellers from sellers collection
-            sellers = list(mongo.db.sellers.find({}))
+            # Join every seller to its completed-sales rollup buckets in one aggregate
+            bucket_match = [
+                {'$eq': ['$dimension', 'seller']},
+                {'$eq': ['$key', {'$toString': '$$seller_id'}]},
+            ]
+            day_filter = AnalyticsRollupService.day_filter(date_filter)
+            if '$gte' in day_filter:
+                bucket_match.append({'$gte': ['$day', day_filter['$gte']]})
+            if '$lte' in day_filter:
+                bucket_match.append({'$lte': ['$day', day_filter['$lte']]})
             
-            result = []
-            commission_rate = 0.10  # 10% commission
+            pipeline = [
+                {'$project': {'first_name': 1, 'last_name': 1, 'trade_id': 1}},
+                {'$lookup': {
+                    'from': ROLLUP_COLLECTION,
+                    'let': {'seller_id': '$_id'},
+                    'pipeline': [
+                        {'$match': {'$expr': {'$and': bucket_match}}},
+                        {'$group': {'_id': None, 'orders': {'$sum': '$orders'}, 'revenue': {'$sum': '$revenue'}}}
+                    ],
+                    'as': 'sales'
+                }},
+                {'$addFields': {
+                    'orders': {'$ifNull': [{'$arrayElemAt': ['$sales.orders', 0]}, 0]},
+                    'total_sales': {'$ifNull': [{'$arrayElemAt': ['$sales.revenue', 0]}, 0]}
+                }},
+                # Include all sellers (even if revenue is 0), highest revenue first
+                {'$sort': {'total_sales': -1, '_id': 1}},
+                {'$limit': limit}
+            ]
             
-            for seller in sellers:
-                seller_id = seller.get('_id')
-                first_name = seller.get('first_name', '')
-                last_name = seller.get('last_name', '')
-                trade_id = seller.get('trade_id', '')
-                
-                if first_name or last_name:
-                    seller_name = f"{first_name} {last_name}".strip()
-                else:
-                    seller_name = trade_id or 'Unknown'
-                
-                # Include trade_id in the name
-                if trade_id and seller_name != trade_id and seller_name != 'Unknown':
-                    seller_name = f"{seller_name} ({trade_id})"
-                elif trade_id:
-                    seller_name = trade_id
-                
-                # Find all completed orders for this seller within the period
-                orders_query = {
-                    'status': 'completed',
-                    'created_at': date_filter
-                }
-                
-                try:
-                    orders_query['seller_id'] = ObjectId(seller_id) if isinstance(seller_id, str) else seller_id
-                except:
-                    orders_query['seller_id'] = seller_id
-                
-                orders = list(mongo.db.orders.find(orders_query))
-                
-                total_revenue = 0
-                for order in orders:
-                    order_total = order.get('total_amount') or order.get('totalAmount') or order.get('order_total') or 0
-                    if order_total == 0:
-                        quantity = order.get('quantity', 0)
-                        unit_price = order.get('unit_price', 0)
-                        if quantity > 0 and unit_price > 0:
-                            order_total = quantity * unit_price
-                    total_revenue += order_total
-                
+            result = []
+            for seller in mongo.db.sellers.aggregate(pipeline):
+                total_revenue = seller.get('total_sales', 0)
                 seller_revenue = total_revenue * (1 - commission_rate)
-                
-                # Include all sellers (even if revenue is 0)
                 result.append({
-                    'seller': seller_name,
-                    'seller_id': str(seller_id),
-                    'trade_id': trade_id,
+                    'seller': AnalyticsService._seller_display_name(seller),
+                    'seller_id': str(seller['_id']),
+                    'trade_id': seller.get('trade_id', ''),
                     'sales': round(seller_revenue, 2),
                     'revenue': round(seller_revenue, 2),
-                    'orders': len(orders),
+                    'orders': seller.get('orders', 0),
                     'total_sales': round(total_revenue, 2)
                 })
             
-            # Sort by revenue descending
-            result.sort(key=lambda x: x['revenue'], reverse=True)
-            
-            # Return limited results
-            return result[:limit]
+            return result
         except Exception as e:
+            mark_analytics_failure()
             print(f"Error computing sales by seller: {e}")
             import traceback
             traceback.print_exc()
@@ -657,20 +560,23 @@ class AnalyticsService:
     
     @staticmethod
     def _get_date_filter(period='monthly', start_date=None, end_date=None):
-        """Get date filter based on period or custom range"""
+        """Get date filter based on period or custom range (dates without an offset are IST days)"""
         now = datetime.now(timezone.utc)
         
+        def _with_zone(value):
+            return value if value.tzinfo else value.replace(tzinfo=IST)
+        
         # Priority 1: Use custom range if provided
         if start_date and end_date:
             try:
                 if isinstance(start_date, str):
-                    start = datetime.fromisoformat(start_date.replace('Z', '+00:00')).replace(tzinfo=timezone.utc)
+                    start = _with_zone(datetime.fromisoformat(start_date.replace('Z', '+00:00')))
                 else:
                     start = start_date
                     
                 if isinstance(end_date, str):
                     # End of day for end_date
-                    end = datetime.fromisoformat(end_date.replace('Z', '+00:00')).replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
+                    end = _with_zone(datetime.fromisoformat(end_date.replace('Z', '+00:00'))).replace(hour=23, minute=59, second=59)
                 else:
                     end = end_date
                 
@@ -679,9 +585,9 @@ class AnalyticsService:
                 # Try simple date format YYYY-MM-DD
                 try:
                     if isinstance(start_date, str):
-                        start = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                        start = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=IST)
                     if isinstance(end_date, str):
-                        end = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
+                        end = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59, tzinfo=IST)
                     return {'$gte': start, '$lte': end}
                 except:
                     print(f"Error parsing custom dates: {e}")
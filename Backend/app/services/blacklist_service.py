@@ -1,30 +1,113 @@
 """
 Blacklist service - Business logic for blacklist operations with MongoDB
+
+Membership is answered from an in-process set of (user_type, id) pairs. Every
+write bumps a version document; a background refresher reloads the set when
+another process changed it, and local writes update the set immediately.
 """
+import threading
+import time
 from bson import ObjectId
 from datetime import datetime, timezone
+from pymongo import ReturnDocument
 from app import mongo
 from app.models.blacklist import Blacklist
 
+BLACKLIST_VERSION_ID = 'blacklist'
+# How often the refresher checks the version document for writes from other processes
+BLACKLIST_REFRESH_SECONDS = 2
+
+_blacklisted = set()  # {(user_type, user_id_str)}
+_loaded_version = None
+_state_lock = threading.RLock()
+_refresher = None
+
+
+def _entry_key(doc):
+    """(user_type, id) for a blacklist document, including legacy seller_id entries."""
+    if doc.get('user_id') is not None:
+        return doc.get('user_type') or 'seller', str(doc['user_id'])
+    if doc.get('seller_id') is not None:
+        return 'seller', str(doc['seller_id'])
+    return None
+
+
+def _read_version():
+    doc = mongo.db.cache_versions.find_one({'_id': BLACKLIST_VERSION_ID}, {'version': 1})
+    return doc.get('version', 0) if doc else 0
+
+
+def _bump_version(expected_local):
+    """Record a write for other processes; keep our version current if nobody else wrote meanwhile."""
+    global _loaded_version
+    doc = mongo.db.cache_versions.find_one_and_update(
+        {'_id': BLACKLIST_VERSION_ID},
+        {'$inc': {'version': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    with _state_lock:
+        if _loaded_version is not None and expected_local is not None and doc['version'] == expected_local + 1:
+            _loaded_version = doc['version']
+
 
 class BlacklistService:
     """Service class for blacklist-related business logic"""
-    
+
+    @staticmethod
+    def reload():
+        """Load every blacklist entry into memory."""
+        global _loaded_version
+        version = _read_version()
+        docs = mongo.db.blacklist.find({}, {'user_id': 1, 'seller_id': 1, 'user_type': 1})
+        entries = {key for key in (_entry_key(doc) for doc in docs) if key}
+        with _state_lock:
+            _blacklisted.clear()
+            _blacklisted.update(entries)
+            _loaded_version = version
+
+    @staticmethod
+    def refresh():
+        """Reload if another process changed the blacklist since the last load."""
+        if _loaded_version is None or _read_version() != _loaded_version:
+            BlacklistService.reload()
+
+    @staticmethod
+    def _ensure_loaded():
+        if _loaded_version is None:
+            with _state_lock:
+                if _loaded_version is None:
+                    BlacklistService.reload()
+
+    @staticmethod
+    def start_refresher(app):
+        """Keep this process's blacklist in step with other processes."""
+        global _refresher
+
+        def _loop():
+            with app.app_context():
+                while True:
+                    try:
+                        BlacklistService.refresh()
+                    except Exception as e:
+                        print(f"[BlacklistService] Refresh failed: {e}")
+                    time.sleep(BLACKLIST_REFRESH_SECONDS)
+
+        with _state_lock:
+            if _refresher is not None:
+                return
+            _refresher = threading.Thread(target=_loop, daemon=True, name="blacklist_refresher")
+        _refresher.start()
+
     @staticmethod
     def is_blacklisted(user_id, user_type='seller'):
         """Check if a user (seller or outlet_man) is blacklisted"""
         try:
-            # Support both new format (user_id + user_type) and legacy format (seller_id)
-            query = {'user_id': ObjectId(user_id), 'user_type': user_type}
-            if user_type == 'seller':
-                # Also check legacy format for backward compatibility
-                legacy_query = {'seller_id': ObjectId(user_id)}
-                blacklist_doc = mongo.db.blacklist.find_one({'$or': [query, legacy_query]})
-            else:
-                blacklist_doc = mongo.db.blacklist.find_one(query)
-            return blacklist_doc is not None
-        except Exception:
+            BlacklistService._ensure_loaded()
+        except Exception as e:
+            print(f"[BlacklistService] Load failed: {e}")
             return False
+        return (user_type, str(user_id)) in _blacklisted
     
     @staticmethod
     def get_blacklist_by_user_id(user_id, user_type='seller'):
@@ -60,6 +143,7 @@ class BlacklistService:
             # Insert into MongoDB
             result = mongo.db.blacklist.insert_one(blacklist.to_bson())
             blacklist._id = result.inserted_id
+            BlacklistService._record_write(user_type, user_id, blacklisted=True)
             
             return blacklist
         except ValueError as e:
@@ -67,6 +151,21 @@ class BlacklistService:
         except Exception as e:
             raise Exception(f"Error blacklisting {user_type}: {str(e)}")
     
+    @staticmethod
+    def _record_write(user_type, user_id, blacklisted):
+        """Apply a local write to the in-memory set and announce it to other processes."""
+        key = (user_type, str(user_id))
+        with _state_lock:
+            expected = _loaded_version
+            if blacklisted:
+                _blacklisted.add(key)
+            else:
+                _blacklisted.discard(key)
+        try:
+            _bump_version(expected)
+        except Exception as e:
+            print(f"[BlacklistService] Failed to bump blacklist version: {e}")
+
     @staticmethod
     def blacklist_seller(seller_id, blacklisted_by, reason=None):
         """Blacklist a seller (backward compatibility)"""
@@ -83,6 +182,7 @@ class BlacklistService:
                 result = mongo.db.blacklist.delete_one({'$or': [query, legacy_query]})
             else:
                 result = mongo.db.blacklist.delete_one(query)
+            BlacklistService._record_write(user_type, user_id, blacklisted=False)
             return result.deleted_count > 0
         except Exception as e:
             raise Exception(f"Error unblacklisting {user_type}: {str(e)}")
@@ -96,26 +196,11 @@ class BlacklistService:
     def get_all_blacklisted_ids(user_type=None):
         """Get all blacklisted user IDs, optionally filtered by user_type"""
         try:
-            if user_type:
-                query = {'user_type': user_type}
-            else:
-                # Include legacy entries (seller_id without user_type) when no filter
-                query = {'$or': [
-                    {'user_type': {'$exists': True}},
-                    {'seller_id': {'$exists': True}, 'user_type': {'$exists': False}}
-                ]}
-            
-            blacklist_docs = mongo.db.blacklist.find(query, {'user_id': 1, 'seller_id': 1, 'user_type': 1})
-            ids = []
-            for doc in blacklist_docs:
-                # Support both new and legacy format
-                if 'user_id' in doc:
-                    ids.append(str(doc['user_id']))
-                elif 'seller_id' in doc:
-                    ids.append(str(doc['seller_id']))
-            return ids
+            BlacklistService._ensure_loaded()
         except Exception:
             return []
+        with _state_lock:
+            return [user_id for entry_type, user_id in _blacklisted if user_type is None or entry_type == user_type]
     
     @staticmethod
     def get_all_blacklisted_seller_ids():
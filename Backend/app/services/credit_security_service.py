@@ -3,12 +3,12 @@ Master credit grant: passkey (bcrypt), RS256 authorization token, OTP to acting
 """
 from datetime import datetime, timedelta, timezone
 
-import bcrypt
 import jwt
 from flask import current_app
 
 from app import mongo
 from app.utils.otp import OTPManager
+from app.utils.password_hashing import verify_password
 from app.utils.sms import SMSService
 
 CREDIT_PASSKEY_DOC_ID = 'master_credit_passkey'
@@ -37,10 +37,7 @@ class CreditSecurityService:
             raise ValueError(
                 'Master credit passkey is not configured. Contact system administrator.'
             )
-        stored = doc['passkey_hash']
-        if isinstance(stored, str):
-            stored = stored.encode('utf-8')
-        return bcrypt.checkpw(str(passkey).strip().encode('utf-8'), stored)
+        return verify_password(str(passkey).strip(), doc['passkey_hash'])
 
     @staticmethod
     def create_credit_grant_token(master_id, seller_id, amount):
@@ -172,15 +169,15 @@ class CreditSecurityService:
         if not SMSService.is_configured():
             return 0
 
-        message = (
-            f'BBHC Bazar: {master_username} added {amount} credits to seller {seller_trade_id}.'
-        )
         sent = 0
         for doc in mongo.db.master.find({'status': {'$ne': 'inactive'}}):
             phone = (doc.get('phone_number') or '').strip()
             if not phone:
                 continue
-            ok, _ = SMSService.send_message(phone, message)
+            ok, _ = SMSService.notify(
+                'credit_alert', phone,
+                master_username=master_username, amount=amount, seller_trade_id=seller_trade_id
+            )
             if ok:
                 sent += 1
         return sent
@@ -4,6 +4,7 @@ Master service - Business logic for master operations with MongoDB
 from bson import ObjectId
 from datetime import datetime
 from app import mongo
+from app.utils.contact_directory import invalidate_contact
 from app.models.master import Master
 
 
@@ -94,6 +95,7 @@ class MasterService:
             # Insert into MongoDB
             result = mongo.db.master.insert_one(master_bson)
             master._id = result.inserted_id
+            invalidate_contact(master_bson.get('phone_number'), master_bson.get('email'))
             
             return master
         except ValueError as e:
@@ -124,6 +126,7 @@ class MasterService:
             
             if result.matched_count == 0:
                 return None
+            invalidate_contact(update_data.get('phone_number'), update_data.get('email'))
             
             # Return updated master
             return MasterService.get_master_by_id(master_id)
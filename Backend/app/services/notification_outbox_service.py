@@ -0,0 +1,276 @@
+"""
+Notification outbox - durable queue for email / push / in-app notifications
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, ReturnDocument
+
+from app import mongo
+
+OUTBOX_COLLECTION = 'notification_outbox'
+
+# Worker threads per process; claims are atomic, so several processes can share the outbox
+NOTIFICATION_WORKERS = 4
+NOTIFICATION_MAX_ATTEMPTS = 5
+# Jobs a worker claims per round; their push messages are sent together in one FCM batch
+OUTBOX_CLAIM_BATCH = 20
+# Retry delays grow 10s, 20s, 40s, ... capped at 10 minutes
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 600
+# A claimed job whose worker died becomes claimable again after the lease
+CLAIM_LEASE_SECONDS = 120
+# Idle workers re-check the outbox this often (enqueue wakes them immediately)
+IDLE_POLL_SECONDS = 5
+# Finished jobs are kept this long for inspection
+FINISHED_RETENTION_SECONDS = 7 * 24 * 3600
+
+_wakeup = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def retry_delay_seconds(attempts):
+    """Backoff before retry number `attempts` (1-based)."""
+    return min(RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)), RETRY_MAX_SECONDS)
+
+
+class NotificationOutboxService:
+    """Persists notifications and delivers them from a bounded worker pool"""
+
+    @staticmethod
+    def create_indexes():
+        outbox = mongo.db[OUTBOX_COLLECTION]
+        outbox.create_index([('status', ASCENDING), ('next_attempt_at', ASCENDING)])
+        outbox.create_index([('finished_at', ASCENDING)], expireAfterSeconds=FINISHED_RETENTION_SECONDS)
+
+    @staticmethod
+    def enqueue(notification, phone_number=None, email=None, thumbnail=None):
+        """Store a rendered notification (see render_notification) for delivery. Returns the job id."""
+        now = datetime.now(timezone.utc)
+        job = {
+            'kind': notification.get('notification_type') or 'message',
+            'payload': {
+                **notification,
+                'phone_number': phone_number,
+                'email': email,
+                'thumbnail': thumbnail,
+            },
+            'status': 'pending',
+            'attempts': 0,
+            'max_attempts': NOTIFICATION_MAX_ATTEMPTS,
+            'next_attempt_at': now,
+            'locked_until': None,
+            'last_error': None,
+            'result': None,
+            # Per-channel outcome ('sent', 'skipped' or an error); sent channels are not repeated on retry
+            'channels': {},
+            'created_at': now,
+            'updated_at': now,
+            'finished_at': None,
+        }
+        job_id = mongo.db[OUTBOX_COLLECTION].insert_one(job).inserted_id
+        _wakeup.set()
+        return job_id
+
+    @staticmethod
+    def claim_next():
+        """Atomically take the next due job (or one whose worker lease expired)."""
+        now = datetime.now(timezone.utc)
+        return mongo.db[OUTBOX_COLLECTION].find_one_and_update(
+            {
+                '$or': [
+                    {'status': 'pending', 'next_attempt_at': {'$lte': now}},
+                    {'status': 'processing', 'locked_until': {'$lte': now}},
+                ]
+            },
+            {
+                '$set': {
+                    'status': 'processing',
+                    'locked_until': now + timedelta(seconds=CLAIM_LEASE_SECONDS),
+                    'worker': f"{os.getpid()}:{threading.current_thread().name}",
+                    'updated_at': now,
+                },
+                '$inc': {'attempts': 1},
+            },
+            sort=[('next_attempt_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def _finish(job, status, result=None, error=None, channels=None):
+        now = datetime.now(timezone.utc)
+        mongo.db[OUTBOX_COLLECTION].update_one(
+            {'_id': job['_id']},
+            {'$set': {
+                'status': status,
+                'result': result,
+                'last_error': error,
+                'channels': channels if channels is not None else job.get('channels') or {},
+                'locked_until': None,
+                'updated_at': now,
+                'finished_at': now,
+            }}
+        )
+
+    @staticmethod
+    def _retry_later(job, error, channels=None):
+        attempts = job.get('attempts', 1)
+        if attempts >= job.get('max_attempts', NOTIFICATION_MAX_ATTEMPTS):
+            NotificationOutboxService._finish(job, 'failed', error=error, channels=channels)
+            return
+        now = datetime.now(timezone.utc)
+        mongo.db[OUTBOX_COLLECTION].update_one(
+            {'_id': job['_id']},
+            {'$set': {
+                'status': 'pending',
+                'last_error': error,
+                'channels': channels if channels is not None else job.get('channels') or {},
+                'locked_until': None,
+                'next_attempt_at': now + timedelta(seconds=retry_delay_seconds(attempts)),
+                'updated_at': now,
+            }}
+        )
+
+    @staticmethod
+    def _deliver(job, push_batch):
+        """Deliver one claimed job on the channels not yet sent; pushes go into `push_batch`.
+
+        Returns the job's channel results, or None if the job was already finished or rescheduled.
+        """
+        from app.utils.sms import CHANNEL_SENT, SMSService
+
+        payload = job.get('payload') or {}
+        if 'message' not in payload:
+            # Queued before notifications were typed
+            payload = {**payload, 'message': payload.get('message_body'), 'thumbnail': payload.get('product_thumbnail')}
+        channels = dict(job.get('channels') or {})
+        sent = tuple(channel for channel, result in channels.items() if result == CHANNEL_SENT)
+        queued = len(push_batch)
+        try:
+            results, error = SMSService.deliver_channels(
+                payload,
+                payload.get('phone_number'),
+                email=payload.get('email'),
+                thumbnail=payload.get('thumbnail'),
+                skip=sent,
+                push_batch=push_batch
+            )
+        except Exception as e:
+            del push_batch[queued:]
+            NotificationOutboxService._retry_later(job, str(e))
+            return None
+
+        if error:
+            NotificationOutboxService._finish(job, 'skipped', error=error)
+            return None
+        for channel, result in results.items():
+            if channel not in sent:
+                channels[channel] = result
+        return channels
+
+    @staticmethod
+    def _record(job, channels):
+        from app.utils.sms import CHANNEL_DONE, CHANNEL_SENT
+
+        failed = {channel: result for channel, result in channels.items() if result not in CHANNEL_DONE}
+        if failed:
+            error = '; '.join(f"{channel}: {result}" for channel, result in failed.items())
+            NotificationOutboxService._retry_later(job, error, channels)
+        elif CHANNEL_SENT in channels.values():
+            delivered = ', '.join(channel for channel, result in channels.items() if result == CHANNEL_SENT)
+            NotificationOutboxService._finish(job, 'sent', result=f"Sent via {delivered}", channels=channels)
+        else:
+            NotificationOutboxService._finish(job, 'skipped', error="Recipient unknown and email not sent", channels=channels)
+
+    @staticmethod
+    def process_batch(jobs):
+        """Deliver claimed jobs, send their pushes in one FCM batch and record each job's outcome."""
+        from app.utils.push import PushService
+        from app.utils.sms import CHANNEL_SENT
+
+        delivered = []
+        push_batch = []
+        push_owners = []  # channel results of the job each push_batch entry belongs to
+        for job in jobs:
+            queued = len(push_batch)
+            try:
+                channels = NotificationOutboxService._deliver(job, push_batch)
+            except Exception as e:
+                del push_batch[queued:]
+                print(f"[NotificationOutbox] Job {job.get('_id')} failed: {e}")
+                continue
+            if channels is None:
+                continue
+            push_owners.extend([channels] * (len(push_batch) - queued))
+            delivered.append((job, channels))
+
+        if push_batch:
+            try:
+                push_errors = PushService.send_batch(push_batch)
+            except Exception as e:
+                push_errors = [str(e)] * len(push_batch)
+            for channels, push_error in zip(push_owners, push_errors):
+                channels['push'] = push_error or CHANNEL_SENT
+
+        for job, channels in delivered:
+            try:
+                NotificationOutboxService._record(job, channels)
+            except Exception as e:
+                print(f"[NotificationOutbox] Job {job.get('_id')} failed: {e}")
+
+    @staticmethod
+    def process(job):
+        """Deliver one claimed job and record the outcome."""
+        NotificationOutboxService.process_batch([job])
+
+    @staticmethod
+    def claim_batch(limit=OUTBOX_CLAIM_BATCH):
+        """Claim up to `limit` due jobs for one delivery round."""
+        jobs = []
+        while len(jobs) < limit:
+            job = NotificationOutboxService.claim_next()
+            if job is None:
+                break
+            jobs.append(job)
+        return jobs
+
+    @staticmethod
+    def _worker_loop(app):
+        with app.app_context():
+            while True:
+                try:
+                    jobs = NotificationOutboxService.claim_batch()
+                except Exception as e:
+                    print(f"[NotificationOutbox] Claim failed: {e}")
+                    jobs = []
+                if not jobs:
+                    _wakeup.wait(IDLE_POLL_SECONDS)
+                    _wakeup.clear()
+                    continue
+                try:
+                    NotificationOutboxService.process_batch(jobs)
+                except Exception as e:
+                    print(f"[NotificationOutbox] Batch of {len(jobs)} jobs failed: {e}")
+
+    @staticmethod
+    def start_workers(app, count=NOTIFICATION_WORKERS):
+        """Start this process's worker pool once."""
+        with _workers_lock:
+            if _workers or count <= 0:
+                return
+            for index in range(count):
+                worker = threading.Thread(
+                    target=NotificationOutboxService._worker_loop,
+                    args=(app,),
+                    daemon=True,
+                    name=f"notification_worker_{index}"
+                )
+                worker.start()
+                _workers.append(worker)
+        print(f"[NotificationOutbox] Started {count} workers")
+
+    @staticmethod
+    def get_job(job_id):
+        return mongo.db[OUTBOX_COLLECTION].find_one({'_id': job_id})
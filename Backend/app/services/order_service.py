@@ -4,21 +4,52 @@ Order service encapsulating MongoDB operations for customer orders.
 import random
 import secrets
 import hashlib
+import heapq
 import threading
+import time
+from itertools import islice
 from datetime import datetime, timezone
-from bson import ObjectId
+from bson import ObjectId, json_util
 
 from app import mongo
 from app.models.order import Order
 from app.services.product_service import ProductService
 from app.services.statistics_service import StatisticsService
+from app.services.analytics_cache import invalidate_analytics_cache
+from app.services.analytics_rollup_service import AnalyticsRollupService
 from app.sockets.emitter import emit_product_event
+from app.utils.order_search import build_order_search_keys, build_seller_search_keys
+from app.utils.pagination import KEYSET_SORT, keyset_filter
 
 # Throttle: only run expiry check at most once every 5 minutes
 _last_expiry_check = None
 _EXPIRY_CHECK_INTERVAL_SECONDS = 300
 _expiry_check_lock = threading.Lock()
 
+# Cached order totals for count_mode='cached': {filter_key: (expires_at, total)}
+_ORDER_COUNT_CACHE_TTL_SECONDS = 30
+_order_count_cache = {}
+_order_count_lock = threading.Lock()
+
+# Status transitions are compare-and-set on the status they were validated against
+STATUS_UPDATE_ATTEMPTS = 3
+# Page-number listing reads and merges skip + limit documents from both collections, so it is
+# kept for compatibility only up to this offset; deeper pages must continue by cursor
+ORDER_PAGE_MAX_OFFSET = 1000
+STATUS_CHANGED_ERROR = "Order status changed, please refresh and try again"
+
+
+def _status_guard(order_obj_id, status):
+    """Update filter that matches only while the order still has the status a transition was checked against."""
+    if status == 'pending_seller':
+        # Legacy documents without a status read as pending_seller
+        return {'_id': order_obj_id, 'status': {'$in': ['pending_seller', None]}}
+    return {'_id': order_obj_id, 'status': status}
+
+
+def _order_sort_key(doc):
+    return (doc.get('created_at') or datetime.min, doc['_id'])
+
 
 class OrderService:
     """Business logic around order creation, retrieval, and status updates."""
@@ -134,8 +165,12 @@ class OrderService:
 
         order = Order(**order_data)
         collection = mongo.db.service_orders if is_service else mongo.db.orders
-        result = collection.insert_one(order.to_bson())
+        order_bson = order.to_bson()
+        order_bson['search_keys'] = build_order_search_keys(order_bson)
+        order_bson['seller_search_keys'] = build_seller_search_keys(order_bson)
+        result = collection.insert_one(order_bson)
         order._id = result.inserted_id
+        AnalyticsRollupService.record_new_order(order)
         return order
 
     @staticmethod
@@ -158,30 +193,83 @@ class OrderService:
         threading.Thread(target=run, daemon=True, name="expiry_check").start()
 
     @staticmethod
-    def get_orders(filter_query=None, page=1, limit=10):
-        """Fetch orders from both product and service collections, merged and sorted."""
-        OrderService._schedule_expiry_check()
+    def _count_orders(filter_query, count_mode='exact'):
+        """
+        Total orders across both collections.
+        count_mode: 'exact' counts every time, 'cached' reuses an exact count for a short TTL,
+        'estimated' uses collection metadata when unfiltered (falls back to 'cached').
+        """
+        if count_mode == 'estimated' and not filter_query:
+            return (
+                mongo.db.orders.estimated_document_count()
+                + mongo.db.service_orders.estimated_document_count()
+            )
+
+        def _exact():
+            return (
+                mongo.db.orders.count_documents(filter_query)
+                + mongo.db.service_orders.count_documents(filter_query)
+            )
+
+        if count_mode not in ('cached', 'estimated'):
+            return _exact()
+
+        cache_key = json_util.dumps(filter_query, sort_keys=True)
+        now = time.monotonic()
+        with _order_count_lock:
+            cached = _order_count_cache.get(cache_key)
+            if cached and cached[0] > now:
+                return cached[1]
+        total = _exact()
+        with _order_count_lock:
+            if len(_order_count_cache) > 512:
+                _order_count_cache.clear()
+            _order_count_cache[cache_key] = (now + _ORDER_COUNT_CACHE_TTL_SECONDS, total)
+        return total
 
+    @staticmethod
+    def get_orders(filter_query=None, page=1, limit=10, after=None, count_mode='exact'):
+        """
+        Fetch orders from both product and service collections, merged and sorted.
+
+        Both collections are read as (created_at, _id) descending streams and merged
+        lazily, so only the requested page is materialized. Pass after=(created_at, _id)
+        from a decoded cursor for keyset continuation (page is then ignored); its cost
+        does not grow with depth. Page numbers cost O(offset) and are rejected (ValueError)
+        once the offset reaches ORDER_PAGE_MAX_OFFSET.
+        Returns (orders, total); total is None when count_mode is 'none'.
+        """
         filter_query = filter_query or {}
-        skip = (page - 1) * limit
-        
-        # Count documents in both collections
-        count_products = mongo.db.orders.count_documents(filter_query)
-        count_services = mongo.db.service_orders.count_documents(filter_query)
-        total = count_products + count_services
-        
-        # Since we need to merge and sort across collections, we fetch a bit more then merge
-        # but for simple pagination we just query both and merge.
-        # This is a basic implementation of merging two sorted streams.
-        cursor_products = mongo.db.orders.find(filter_query).sort('created_at', -1).limit(skip + limit)
-        cursor_services = mongo.db.service_orders.find(filter_query).sort('created_at', -1).limit(skip + limit)
-        
-        all_docs = list(cursor_products) + list(cursor_services)
-        # Sort merged list by created_at descending
-        all_docs.sort(key=lambda x: x.get('created_at', datetime.min), reverse=True)
-        
-        # Apply pagination
-        paged_docs = all_docs[skip : skip + limit]
+        skip = 0 if after else (page - 1) * limit
+        if skip < 0:
+            raise ValueError("page must be 1 or greater")
+        if skip >= ORDER_PAGE_MAX_OFFSET:
+            raise ValueError(
+                f"Only the first {ORDER_PAGE_MAX_OFFSET} orders can be paged by number; continue with cursor"
+            )
+
+        OrderService._schedule_expiry_check()
+
+        total = None
+        if count_mode != 'none':
+            total = OrderService._count_orders(filter_query, count_mode)
+
+        page_query = {'$and': [filter_query, keyset_filter(after)]} if after else filter_query
+        fetch_limit = skip + limit
+        batch_size = min(max(limit, 1), 100)
+        cursor_products = (
+            mongo.db.orders.find(page_query).sort(KEYSET_SORT).limit(fetch_limit).batch_size(batch_size)
+        )
+        cursor_services = (
+            mongo.db.service_orders.find(page_query).sort(KEYSET_SORT).limit(fetch_limit).batch_size(batch_size)
+        )
+
+        # Two-way merge of the sorted cursors; documents before the page are streamed past, not kept
+        merged = heapq.merge(cursor_products, cursor_services, key=_order_sort_key, reverse=True)
+        paged_docs = list(islice(merged, skip, skip + limit))
+        cursor_products.close()
+        cursor_services.close()
+
         orders = [Order.from_bson(doc) for doc in paged_docs]
         return orders, total
 
@@ -249,34 +337,41 @@ class OrderService:
         except Exception as exc:
             raise ValueError("Invalid order ID") from exc
 
-        # Get current order to append to history
-        current_order = OrderService.get_order_by_id(order_id)
-        if not current_order:
-            return None
-
-        status_history = current_order.status_history or []
-        status_history.append({
-            'status': status,
-            'timestamp': datetime.now(timezone.utc),
-            'note': note or f'Status changed to {status}',
-            'updated_by': updated_by
-        })
+        # Compare-and-set on the current status so a concurrent transition is
+        # never counted twice in the analytics rollups; retry on a lost race
+        for _ in range(STATUS_UPDATE_ATTEMPTS):
+            # Get current order to append to history
+            current_order = OrderService.get_order_by_id(order_id)
+            if not current_order:
+                return None
+
+            status_history = current_order.status_history or []
+            status_history.append({
+                'status': status,
+                'timestamp': datetime.now(timezone.utc),
+                'note': note or f'Status changed to {status}',
+                'updated_by': updated_by
+            })
 
-        # Identify collection based on type
-        collection = mongo.db.service_orders if current_order.type == 'service' else mongo.db.orders
+            # Identify collection based on type
+            collection = mongo.db.service_orders if current_order.type == 'service' else mongo.db.orders
 
-        result = collection.update_one(
-            {'_id': order_obj_id},
-            {
-                '$set': {
-                    'status': status,
-                    'updated_at': datetime.now(timezone.utc),
-                    'status_history': status_history
+            result = collection.update_one(
+                _status_guard(order_obj_id, current_order.status),
+                {
+                    '$set': {
+                        'status': status,
+                        'updated_at': datetime.now(timezone.utc),
+                        'status_history': status_history
+                    }
                 }
-            }
-        )
-        if result.matched_count == 0:
+            )
+            if result.matched_count:
+                break
+        else:
             return None
+        AnalyticsRollupService.record_status_change(current_order, current_order.status, status)
+        invalidate_analytics_cache()
         
         updated_order = OrderService.get_order_by_id(order_id)
         
@@ -366,7 +461,7 @@ class OrderService:
             
             # Update order to completed in service_orders
             result = collection.update_one(
-                {'_id': order_obj_id},
+                _status_guard(order_obj_id, order.status),
                 {
                     '$set': {
                         'status': 'completed',
@@ -403,7 +498,7 @@ class OrderService:
                 )
 
             result = collection.update_one(
-                {'_id': order_obj_id},
+                _status_guard(order_obj_id, order.status),
                 {
                     '$set': update_set,
                     '$push': {
@@ -418,7 +513,8 @@ class OrderService:
             )
 
         if result.matched_count == 0:
-            return None, "Failed to update order"
+            return None, STATUS_CHANGED_ERROR
+        AnalyticsRollupService.record_status_change(order, order.status, 'completed' if is_service else 'seller_accepted')
 
         updated_order = OrderService.get_order_by_id(order_id)
         return updated_order, None
@@ -452,7 +548,7 @@ class OrderService:
 
         # Update order with rejection reason
         result = collection.update_one(
-            {'_id': order_obj_id},
+            _status_guard(order_obj_id, order.status),
             {
                 '$set': {
                     'status': 'seller_rejected',
@@ -472,7 +568,8 @@ class OrderService:
         )
 
         if result.matched_count == 0:
-            return None, "Failed to update order"
+            return None, STATUS_CHANGED_ERROR
+        AnalyticsRollupService.record_status_change(order, order.status, 'seller_rejected')
 
         updated_order = OrderService.get_order_by_id(order_id)
         return updated_order, None
@@ -596,15 +693,16 @@ class OrderService:
             collection = mongo.db.service_orders if order.type == 'service' else mongo.db.orders
 
             result = collection.update_one(
-                {'_id': order_obj_id},
+                _status_guard(order_obj_id, order.status),
                 update_doc
             )
 
             if result.matched_count == 0:
-                return None, "Failed to update order"
+                return None, STATUS_CHANGED_ERROR
 
             from app.services.slot_service import SlotService
             new_status = updates.get('status')
+            AnalyticsRollupService.record_status_change(order, order.status, new_status)
             if new_status == 'handed_over':
                 SlotService.assign_item_to_slot(order.user_id)
             elif new_status == 'completed':
@@ -646,7 +744,7 @@ class OrderService:
         was_handed_over = (order.status == 'handed_over')
 
         result = collection.update_one(
-            {'_id': order_obj_id},
+            _status_guard(order_obj_id, order.status),
             {
                 '$set': {
                     'status': 'cancelled_master',
@@ -668,7 +766,8 @@ class OrderService:
         )
 
         if result.matched_count == 0:
-            return None, "Failed to cancel order"
+            return None, STATUS_CHANGED_ERROR
+        AnalyticsRollupService.record_status_change(order, order.status, 'cancelled_master')
 
         if was_handed_over:
             from app.services.slot_service import SlotService
@@ -698,7 +797,7 @@ class OrderService:
 
         # Update order with cancellation reason
         result = collection.update_one(
-            {'_id': order_obj_id},
+            _status_guard(order_obj_id, order.status),
             {
                 '$set': {
                     'status': 'cancelled',
@@ -718,7 +817,8 @@ class OrderService:
         )
         
         if result.matched_count == 0:
-            return None, "Failed to update order"
+            return None, STATUS_CHANGED_ERROR
+        AnalyticsRollupService.record_status_change(order, order.status, 'cancelled')
 
         updated_order = OrderService.get_order_by_id(order_id)
         return updated_order, None
@@ -756,18 +856,15 @@ class OrderService:
         product_snapshot = order_doc.get('product_snapshot') or order_doc.get('product') or {}
         product_name = product_snapshot.get('name') or product_snapshot.get('product_name') or "item"
         
-        message_body = (
-            f"Dear {user_name}, we are sorry to inform you that your order #{order_number} "
-            f"for '{product_name}' has been automatically cancelled because the seller did not "
-            f"confirm the delivery timeframe. We apologize for the inconvenience."
-        )
-        
         # Use SMSService to deliver via SMTP email + WebSocket/FCM
-        SMSService.send_message(
+        SMSService.notify(
+            'order_auto_cancelled',
             phone_number=phone,
-            message_body=message_body,
-            product_thumbnail=product_snapshot.get('thumbnail'),
-            email=email
+            email=email,
+            thumbnail=product_snapshot.get('thumbnail'),
+            user_name=user_name,
+            order_number=order_number,
+            product_name=product_name
         )
 
     @staticmethod
@@ -806,8 +903,8 @@ class OrderService:
                         'updated_by': 'system'
                     })
                     
-                    collection.update_one(
-                        {'_id': order_id},
+                    result = collection.update_one(
+                        _status_guard(order_id, 'pending_seller'),
                         {
                             '$set': {
                                 'status': 'cancelled',
@@ -818,6 +915,10 @@ class OrderService:
                             }
                         }
                     )
+                    if not result.matched_count:
+                        # Accepted or cancelled meanwhile
+                        continue
+                    AnalyticsRollupService.record_status_change(doc, 'pending_seller', 'cancelled')
                     
                     # Send sorry message & mail to the user
                     try:
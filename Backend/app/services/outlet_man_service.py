@@ -4,6 +4,7 @@ Outlet Man service - Business logic for outlet man operations with MongoDB
 from bson import ObjectId
 from datetime import datetime, timezone
 from app import mongo
+from app.utils.contact_directory import invalidate_contact
 from app.models.outlet_man import OutletMan
 from app.services.blacklist_service import BlacklistService
 
@@ -105,6 +106,7 @@ class OutletManService:
             # Insert into MongoDB
             result = mongo.db.outlet_men.insert_one(outlet_man.to_bson())
             outlet_man._id = result.inserted_id
+            invalidate_contact(outlet_man.phone_number, outlet_man.email)
             
             return outlet_man
         except ValueError as e:
@@ -158,6 +160,7 @@ class OutletManService:
                 {'_id': outlet_man._id},
                 {'$set': outlet_man.to_bson()}
             )
+            invalidate_contact(outlet_man.phone_number, outlet_man.email)
             
             return outlet_man
         except ValueError as e:
@@ -0,0 +1,190 @@
+"""
+Pricing engine service - materializes effective prices on product/service documents
+"""
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app import mongo
+from app.services.pricing_rules_service import PricingRulesService
+
+PRICING_BULK_BATCH_SIZE = 500
+COMMISSION_BULK_BATCH_SIZE = 1000
+
+# Per item type: collection, base price field and the derived total field
+_ITEM_PRICING_FIELDS = {
+    'product': {
+        'collection': 'products',
+        'base_field': 'selling_price',
+        'total_field': 'total_selling_price',
+    },
+    'service': {
+        'collection': 'services',
+        'base_field': 'service_charge',
+        'total_field': 'total_service_charge',
+    },
+}
+
+
+def _item_config(item_type):
+    config = _ITEM_PRICING_FIELDS.get(item_type)
+    if not config:
+        raise ValueError("item_type must be 'product' or 'service'")
+    return config
+
+
+class PricingEngineService:
+    """Computes effective commission, total price and delivery charge at write time"""
+
+    @staticmethod
+    def pricing_projection(item_type='product'):
+        """Fields needed to compute effective pricing for an item"""
+        config = _item_config(item_type)
+        return {
+            config['base_field']: 1,
+            config['total_field']: 1,
+            'commission_rate': 1,
+            'categories': 1,
+            'delivery_charge': 1,
+            'effective_commission_rate': 1,
+            'effective_delivery_charge': 1,
+        }
+
+    @staticmethod
+    def compute_fields(item_doc, item_type='product', rules=None):
+        """
+        Return the materialized pricing fields for a product/service document.
+        Priority: item-specific > category > global (delivery) / none (commission).
+        """
+        config = _item_config(item_type)
+        rules = rules or PricingRulesService.get_rules()
+        categories = item_doc.get('categories') or []
+
+        commission_rate = item_doc.get('commission_rate')
+        if not commission_rate:
+            commission_rate = PricingRulesService.resolve_category_commission(categories, item_type, rules)
+        commission_rate = float(commission_rate or 0)
+
+        base_price = item_doc.get(config['base_field'])
+        total_price = None
+        if base_price and base_price > 0:
+            if commission_rate > 0:
+                total_price = round(base_price + (base_price * commission_rate) / 100, 2)
+            else:
+                total_price = base_price
+
+        delivery_charge = item_doc.get('delivery_charge')
+        if delivery_charge is None:
+            delivery_charge = PricingRulesService.resolve_delivery_charge(categories, item_type, rules)
+
+        return {
+            'effective_commission_rate': commission_rate,
+            config['total_field']: total_price,
+            'effective_delivery_charge': float(delivery_charge or 0),
+        }
+
+    @staticmethod
+    def refresh_item(item_id, item_type='product'):
+        """Recompute and store the pricing fields of a single item"""
+        try:
+            config = _item_config(item_type)
+            collection = mongo.db[config['collection']]
+            item_doc = collection.find_one(
+                {'_id': ObjectId(item_id)},
+                PricingEngineService.pricing_projection(item_type)
+            )
+            if not item_doc:
+                return None
+            fields = PricingEngineService.compute_fields(item_doc, item_type)
+            collection.update_one({'_id': item_doc['_id']}, {'$set': fields})
+            return fields
+        except Exception as e:
+            print(f"[PricingEngine] Failed to refresh {item_type} {item_id}: {e}")
+            return None
+
+    @staticmethod
+    def recompute_items(item_type='product', query=None, batch_size=PRICING_BULK_BATCH_SIZE):
+        """
+        Recompute pricing fields for every item matching query.
+        Only documents whose stored values differ are written, in bulk batches.
+        """
+        config = _item_config(item_type)
+        collection = mongo.db[config['collection']]
+        rules = PricingRulesService.get_rules()
+
+        operations = []
+        modified_count = 0
+        cursor = collection.find(query or {}, PricingEngineService.pricing_projection(item_type))
+        for item_doc in cursor:
+            fields = PricingEngineService.compute_fields(item_doc, item_type, rules)
+            if all(item_doc.get(key) == value for key, value in fields.items()):
+                continue
+            operations.append(UpdateOne({'_id': item_doc['_id']}, {'$set': fields}))
+            if len(operations) >= batch_size:
+                modified_count += collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+
+        if operations:
+            modified_count += collection.bulk_write(operations, ordered=False).modified_count
+        return modified_count
+
+    @staticmethod
+    def commission_update_pipeline(item_type, commission_rate):
+        """Aggregation-pipeline update that stamps a commission rate and its derived total server-side"""
+        config = _item_config(item_type)
+        commission_rate = float(commission_rate)
+        base_price = f"${config['base_field']}"
+        if commission_rate > 0:
+            total_price = {
+                '$round': [
+                    {'$add': [base_price, {'$divide': [{'$multiply': [base_price, commission_rate]}, 100]}]},
+                    2
+                ]
+            }
+        else:
+            total_price = base_price
+        return [{
+            '$set': {
+                'commission_rate': commission_rate,
+                'effective_commission_rate': commission_rate,
+                config['total_field']: total_price,
+                'updated_at': datetime.now(timezone.utc),
+            }
+        }]
+
+    @staticmethod
+    def apply_commission_bulk(item_type, query, commission_rate,
+                              batch_size=COMMISSION_BULK_BATCH_SIZE, progress_callback=None):
+        """
+        Apply commission_rate to every item matching query using pipeline update_many
+        batches (one round trip per batch). Returns the number of matched items.
+
+        progress_callback(processed, total, updated_count) is called after each batch.
+        """
+        config = _item_config(item_type)
+        collection = mongo.db[config['collection']]
+        pipeline = PricingEngineService.commission_update_pipeline(item_type, commission_rate)
+
+        # Snapshot matching ids first: updated items stop matching query mid-scan
+        item_ids = [item_doc['_id'] for item_doc in collection.find(query, {'_id': 1})]
+        total = len(item_ids)
+        updated_count = 0
+        if progress_callback:
+            progress_callback(0, total, updated_count)
+
+        for start in range(0, total, batch_size):
+            batch_ids = item_ids[start:start + batch_size]
+            result = collection.update_many({'$and': [query, {'_id': {'$in': batch_ids}}]}, pipeline)
+            updated_count += result.matched_count
+            if progress_callback:
+                progress_callback(start + len(batch_ids), total, updated_count)
+        return updated_count
+
+    @staticmethod
+    def refresh_product(product_id):
+        return PricingEngineService.refresh_item(product_id, 'product')
+
+    @staticmethod
+    def refresh_service(service_id):
+        return PricingEngineService.refresh_item(service_id, 'service')
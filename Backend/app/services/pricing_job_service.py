@@ -0,0 +1,205 @@
+"""
+Pricing job service - runs bulk commission propagation in the background
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from app import mongo
+
+# A running job refreshes heartbeat_at this often; a queued/running job whose heartbeat is older
+# than PRICING_JOB_STALE_SECONDS lost its worker (restart/crash) and is marked failed
+PRICING_JOB_HEARTBEAT_SECONDS = 15
+PRICING_JOB_STALE_SECONDS = 120
+STALE_JOB_ERROR = 'Worker stopped before the job finished; start the job again'
+
+
+def _job_runners():
+    """Map job types to callables taking (params, progress_callback)."""
+    from app.services.product_service import ProductService
+    from app.services.service_service import ServiceService
+
+    return {
+        'product_commission_all': lambda params, progress: ProductService.apply_commission_to_all(
+            params['commission_rate'], progress_callback=progress
+        ),
+        'product_commission_category': lambda params, progress: ProductService.apply_commission_by_category(
+            params['category'], params['commission_rate'], progress_callback=progress
+        ),
+        'service_commission_all': lambda params, progress: ServiceService.apply_commission_to_all(
+            params['commission_rate'], progress_callback=progress
+        ),
+        'service_commission_category': lambda params, progress: ServiceService.apply_commission_by_category(
+            params['category'], params['commission_rate'], progress_callback=progress
+        ),
+    }
+
+
+def _serialize_job(job_doc):
+    if not job_doc:
+        return None
+
+    def _iso(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    return {
+        'id': str(job_doc['_id']),
+        'job_type': job_doc.get('job_type'),
+        'params': job_doc.get('params') or {},
+        'status': job_doc.get('status'),
+        'total': job_doc.get('total', 0),
+        'processed': job_doc.get('processed', 0),
+        'updated_count': job_doc.get('updated_count', 0),
+        'error': job_doc.get('error'),
+        'started_by': job_doc.get('started_by'),
+        'created_at': _iso(job_doc.get('created_at')),
+        'started_at': _iso(job_doc.get('started_at')),
+        'finished_at': _iso(job_doc.get('finished_at')),
+        'heartbeat_at': _iso(job_doc.get('heartbeat_at')),
+    }
+
+
+def _stale_filter(now):
+    cutoff = now - timedelta(seconds=PRICING_JOB_STALE_SECONDS)
+    return {
+        'status': {'$in': ['queued', 'running']},
+        '$or': [
+            {'heartbeat_at': {'$lt': cutoff}},
+            # Jobs recorded before heartbeats existed
+            {'heartbeat_at': None, 'created_at': {'$lt': cutoff}},
+        ],
+    }
+
+
+def _fail_stale_update(now):
+    return {'$set': {'status': 'failed', 'error': STALE_JOB_ERROR, 'finished_at': now}}
+
+
+class PricingJobService:
+    """Tracks bulk pricing jobs in the pricing_jobs collection"""
+
+    JOB_TYPES = {
+        'product_commission_all',
+        'product_commission_category',
+        'service_commission_all',
+        'service_commission_category',
+    }
+
+    @staticmethod
+    def start_job(job_type, params, started_by=None):
+        """Record a queued job and run it on a background thread. Returns the job dict."""
+        if job_type not in PricingJobService.JOB_TYPES:
+            raise ValueError(f"Unknown pricing job type: {job_type}")
+
+        now = datetime.now(timezone.utc)
+        job_doc = {
+            '_id': ObjectId(),
+            'job_type': job_type,
+            'params': params,
+            'status': 'queued',
+            'total': 0,
+            'processed': 0,
+            'updated_count': 0,
+            'error': None,
+            'started_by': str(started_by) if started_by else None,
+            'created_at': now,
+            'started_at': None,
+            'finished_at': None,
+            'heartbeat_at': now,
+        }
+        mongo.db.pricing_jobs.insert_one(job_doc)
+
+        threading.Thread(
+            target=PricingJobService._run_job,
+            args=(job_doc['_id'], job_type, params),
+            daemon=True,
+            name=f"pricing_job_{job_doc['_id']}"
+        ).start()
+        return _serialize_job(job_doc)
+
+    @staticmethod
+    def _run_job(job_id, job_type, params):
+        def _progress(processed, total, updated_count):
+            mongo.db.pricing_jobs.update_one(
+                {'_id': job_id},
+                {'$set': {
+                    'processed': processed,
+                    'total': total,
+                    'updated_count': updated_count,
+                    'heartbeat_at': datetime.now(timezone.utc)
+                }}
+            )
+
+        # Heartbeat between progress updates too (the id snapshot and large batches can be slow)
+        stop = threading.Event()
+
+        def _heartbeat():
+            while not stop.wait(PRICING_JOB_HEARTBEAT_SECONDS):
+                try:
+                    mongo.db.pricing_jobs.update_one(
+                        {'_id': job_id, 'status': 'running'},
+                        {'$set': {'heartbeat_at': datetime.now(timezone.utc)}}
+                    )
+                except Exception as e:
+                    print(f"[PricingJob] Heartbeat for {job_id} failed: {e}")
+
+        threading.Thread(target=_heartbeat, daemon=True, name=f"pricing_job_heartbeat_{job_id}").start()
+        try:
+            now = datetime.now(timezone.utc)
+            mongo.db.pricing_jobs.update_one(
+                {'_id': job_id},
+                {'$set': {'status': 'running', 'started_at': now, 'heartbeat_at': now}}
+            )
+            updated_count = _job_runners()[job_type](params, _progress)
+            mongo.db.pricing_jobs.update_one(
+                {'_id': job_id},
+                {'$set': {
+                    'status': 'completed',
+                    'updated_count': updated_count,
+                    'finished_at': datetime.now(timezone.utc)
+                }}
+            )
+        except Exception as e:
+            print(f"[PricingJob] Job {job_id} ({job_type}) failed: {e}")
+            mongo.db.pricing_jobs.update_one(
+                {'_id': job_id},
+                {'$set': {
+                    'status': 'failed',
+                    'error': str(e),
+                    'finished_at': datetime.now(timezone.utc)
+                }}
+            )
+        finally:
+            stop.set()
+
+    @staticmethod
+    def fail_stale_jobs():
+        """Mark queued/running jobs whose worker stopped heartbeating as failed. Returns the count."""
+        now = datetime.now(timezone.utc)
+        return mongo.db.pricing_jobs.update_many(_stale_filter(now), _fail_stale_update(now)).modified_count
+
+    @staticmethod
+    def get_job(job_id):
+        """Return the job dict, or None when the id is unknown/invalid"""
+        try:
+            job_doc = mongo.db.pricing_jobs.find_one({'_id': ObjectId(job_id)})
+            now = datetime.now(timezone.utc)
+            if job_doc and job_doc.get('status') in ('queued', 'running'):
+                heartbeat_at = job_doc.get('heartbeat_at') or job_doc.get('created_at')
+                if heartbeat_at and heartbeat_at.tzinfo is None:
+                    heartbeat_at = heartbeat_at.replace(tzinfo=timezone.utc)
+                if not heartbeat_at or heartbeat_at < now - timedelta(seconds=PRICING_JOB_STALE_SECONDS):
+                    update = _fail_stale_update(now)
+                    # Only if no heartbeat arrived since the read
+                    result = mongo.db.pricing_jobs.update_one(
+                        {'_id': job_doc['_id'], 'status': job_doc['status'], 'heartbeat_at': job_doc.get('heartbeat_at')},
+                        update
+                    )
+                    if result.modified_count:
+                        job_doc.update(update['$set'])
+                    else:
+                        job_doc = mongo.db.pricing_jobs.find_one({'_id': job_doc['_id']})
+            return _serialize_job(job_doc)
+        except Exception:
+            return None
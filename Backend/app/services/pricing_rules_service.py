@@ -0,0 +1,146 @@
+"""
+Pricing rules service - in-process cache of delivery and commission rules
+"""
+import time
+from threading import RLock
+
+from app import mongo
+
+# Seconds a loaded rule set stays valid. Writes in this process invalidate
+# immediately; the TTL bounds staleness for writes made by other processes.
+PRICING_RULES_TTL_SECONDS = 30
+
+_rules_cache = None
+_rules_loaded_at = 0.0
+_rules_lock = RLock()
+
+
+def _empty_rules():
+    return {
+        'global_product_rate': None,
+        'global_service_rate': None,
+        'product_category_delivery_rates': {},
+        'service_category_delivery_rates': {},
+        'product_category_commissions': {},
+        'service_category_commissions': {},
+    }
+
+
+def _rule_sources():
+    """Build the $unionWith stages that pull every rule collection in one aggregate."""
+    def _source(collection_name, fields):
+        project = {'_id': 0, 'source': {'$literal': collection_name}}
+        project.update({field: 1 for field in fields})
+        return {
+            '$unionWith': {
+                'coll': collection_name,
+                'pipeline': [{'$project': project}],
+            }
+        }
+
+    return [
+        _source('product_category_delivery_rates', ['category', 'rate']),
+        _source('service_category_delivery_rates', ['category', 'rate']),
+        _source('category_commissions', ['category', 'commission_rate']),
+        _source('service_category_commissions', ['category', 'commission_rate']),
+    ]
+
+
+class PricingRulesService:
+    """Shared cache of category/global delivery rates and category commissions"""
+
+    @staticmethod
+    def _load_rule_docs():
+        pipeline = [
+            {'$match': {'key': {'$in': ['global_product_rate', 'global_service_rate']}}},
+            {'$project': {'_id': 0, 'source': {'$literal': 'delivery_settings'}, 'key': 1, 'rate': 1}},
+        ] + _rule_sources()
+        try:
+            return list(mongo.db.delivery_settings.aggregate(pipeline))
+        except Exception:
+            # Servers without $unionWith (< 4.4) fall back to one find per collection
+            docs = []
+            for doc in mongo.db.delivery_settings.find(
+                {'key': {'$in': ['global_product_rate', 'global_service_rate']}}
+            ):
+                docs.append({'source': 'delivery_settings', 'key': doc.get('key'), 'rate': doc.get('rate')})
+            for collection_name in (
+                'product_category_delivery_rates',
+                'service_category_delivery_rates',
+                'category_commissions',
+                'service_category_commissions',
+            ):
+                for doc in mongo.db[collection_name].find():
+                    doc['source'] = collection_name
+                    docs.append(doc)
+            return docs
+
+    @staticmethod
+    def _build_rules(docs):
+        rules = _empty_rules()
+        for doc in docs:
+            source = doc.get('source')
+            if source == 'delivery_settings':
+                key = doc.get('key')
+                if key in ('global_product_rate', 'global_service_rate'):
+                    rules[key] = float(doc.get('rate', 0) or 0)
+                continue
+
+            category = doc.get('category')
+            if category is None:
+                continue
+            if source == 'product_category_delivery_rates':
+                rules['product_category_delivery_rates'][category] = float(doc.get('rate', 0) or 0)
+            elif source == 'service_category_delivery_rates':
+                rules['service_category_delivery_rates'][category] = float(doc.get('rate', 0) or 0)
+            elif source == 'category_commissions':
+                rules['product_category_commissions'][category] = doc.get('commission_rate')
+            elif source == 'service_category_commissions':
+                rules['service_category_commissions'][category] = doc.get('commission_rate')
+        return rules
+
+    @staticmethod
+    def get_rules():
+        """Return the cached rule set, reloading it when invalidated or expired."""
+        global _rules_cache, _rules_loaded_at
+        with _rules_lock:
+            now = time.monotonic()
+            if _rules_cache is not None and now - _rules_loaded_at < PRICING_RULES_TTL_SECONDS:
+                return _rules_cache
+            try:
+                _rules_cache = PricingRulesService._build_rules(PricingRulesService._load_rule_docs())
+                _rules_loaded_at = now
+            except Exception as e:
+                print(f"[PricingRules] Failed to load pricing rules: {e}")
+                if _rules_cache is None:
+                    return _empty_rules()
+            return _rules_cache
+
+    @staticmethod
+    def invalidate():
+        """Drop the cached rule set so the next read reloads it."""
+        global _rules_cache, _rules_loaded_at
+        with _rules_lock:
+            _rules_cache = None
+            _rules_loaded_at = 0.0
+
+    @staticmethod
+    def resolve_delivery_charge(categories, item_type='product', rules=None):
+        """Resolve delivery charge from category rates, falling back to the global rate."""
+        rules = rules or PricingRulesService.get_rules()
+        category_rates = rules[f'{item_type}_category_delivery_rates']
+        for category in categories or []:
+            if category in category_rates:
+                return category_rates[category]
+        global_rate = rules[f'global_{item_type}_rate']
+        return global_rate if global_rate is not None else 0.0
+
+    @staticmethod
+    def resolve_category_commission(categories, item_type='product', rules=None):
+        """Return the commission rate of the first configured category, or None."""
+        rules = rules or PricingRulesService.get_rules()
+        category_commissions = rules[f'{item_type}_category_commissions']
+        for category in categories or []:
+            if category in category_commissions:
+                return category_commissions[category]
+        return None
@@ -6,6 +6,9 @@ from datetime import datetime, timezone
 
 from app import mongo
 from app.models.product import Product
+from app.services.pricing_rules_service import PricingRulesService
+from app.services.pricing_engine_service import PricingEngineService
+from app.utils.pagination import KEYSET_SORT, keyset_filter
 from app.utils.image_handler import save_stored_image_reference, delete_entity_images, is_base64_image
 
 
@@ -118,7 +121,13 @@ class ProductService:
             )
             product._id = product_id
 
+            # Materialize effective pricing so catalog reads need no rule lookups
             product_bson = product.to_bson()
+            pricing_fields = PricingEngineService.compute_fields(product_bson, 'product')
+            product_bson.update(pricing_fields)
+            for key, value in pricing_fields.items():
+                setattr(product, key, value)
+
             mongo.db.products.insert_one(product_bson)
             return product
         except ValueError as e:
@@ -135,36 +144,17 @@ class ProductService:
             
             product = Product.from_bson(product_doc)
             if product:
-                ProductService.populate_delivery_charge(product)
-            
-            # Ensure total_selling_price is calculated if missing
-            if product and product.selling_price and (not product.total_selling_price or product.total_selling_price == 0):
-                commission_rate = product.commission_rate
-                
-                # If no product-level commission, check category-level commission
-                if (commission_rate is None or commission_rate == 0) and product.categories:
-                    for category in product.categories:
-                        category_rate = ProductService.get_category_commission_rate(category)
-                        if category_rate:
-                            commission_rate = category_rate
-                            break
-                
-                # Calculate total_selling_price with commission
-                if commission_rate and commission_rate > 0:
-                    product.total_selling_price = ProductService.calculate_total_selling_price(
-                        product.selling_price, commission_rate
-                    )
-                else:
-                    # No commission, total_selling_price equals selling_price
-                    product.total_selling_price = product.selling_price
-            
+                ProductService.apply_pricing_rules(product)
             return product
         except Exception:
             return None
 
     @staticmethod
-    def get_products_by_seller(user_id=None, trade_id=None, skip=0, limit=100, include_pending=True):
-        """Fetch products for a specific seller by user_id or trade_id with DB-level filtering."""
+    def get_products_by_seller(user_id=None, trade_id=None, skip=0, limit=100, include_pending=True, after=None):
+        """
+        Fetch products for a specific seller by user_id or trade_id with DB-level filtering.
+        Pass after=(created_at, _id) from a decoded cursor for keyset pagination (skip is ignored).
+        """
         try:
             or_filters = []
             if trade_id:
@@ -198,41 +188,31 @@ class ProductService:
                 query = {'$and': [{'$or': or_filters}, orig_product_filter, status_filter]}
             else:
                 query = {'$and': [{'$or': or_filters}, orig_product_filter]}
+            if after:
+                query['$and'].append(keyset_filter(after))
+                skip = 0
 
             products_cursor = (
                 mongo.db.products.find(query)
-                .sort('created_at', -1)
+                .sort(KEYSET_SORT)
                 .skip(skip)
                 .limit(limit)
             )
             
-            products = []
-            category_commissions = ProductService.get_all_category_commissions()
-            for product_doc in products_cursor:
-                product = Product.from_bson(product_doc)
-                ProductService.populate_delivery_charge(product)
-                # Ensure total_selling_price is calculated if missing
-                if product.selling_price and (not product.total_selling_price or product.total_selling_price == 0):
-                    commission_rate = product.commission_rate
-                    if (commission_rate is None or commission_rate == 0) and product.categories:
-                        for category in product.categories:
-                            if category in category_commissions:
-                                commission_rate = category_commissions[category]
-                                break
-                    if commission_rate and commission_rate > 0:
-                        product.total_selling_price = ProductService.calculate_total_selling_price(
-                            product.selling_price, commission_rate
-                        )
-                    else:
-                        product.total_selling_price = product.selling_price
-                products.append(product)
+            # Effective pricing is stored on each document; legacy documents
+            # fall back to the cached pricing rules, so no per-item queries
+            products = [
+                ProductService.apply_pricing_rules(Product.from_bson(product_doc))
+                for product_doc in products_cursor
+            ]
             return products
         except Exception as e:
             print(f"Error in get_products_by_seller: {e}")
             return []
 
     @staticmethod
-    def get_all_products(skip=0, limit=100, include_pending=False):
+    def get_all_products(skip=0, limit=100, include_pending=False, after=None):
+        """List catalog products newest first; after=(created_at, _id) switches to keyset paging"""
         try:
             query = {}
             if not include_pending:
@@ -244,43 +224,23 @@ class ProductService:
                         {'approval_status': None}
                     ]
                 }
+            if after:
+                query = {'$and': [query, keyset_filter(after)]} if query else keyset_filter(after)
+                skip = 0
             
             products_cursor = (
                 mongo.db.products.find(query)
-                .sort('created_at', -1)
+                .sort(KEYSET_SORT)
                 .skip(skip)
                 .limit(limit)
             )
             
-            products = []
-            # Get all category commissions once for efficiency
-            category_commissions = ProductService.get_all_category_commissions()
-            
-            for product_doc in products_cursor:
-                product = Product.from_bson(product_doc)
-                ProductService.populate_delivery_charge(product)
-                
-                # Ensure total_selling_price is calculated if missing
-                if product.selling_price and (not product.total_selling_price or product.total_selling_price == 0):
-                    commission_rate = product.commission_rate
-                    
-                    # If no product-level commission, check category-level commission
-                    if (commission_rate is None or commission_rate == 0) and product.categories:
-                        for category in product.categories:
-                            if category in category_commissions:
-                                commission_rate = category_commissions[category]
-                                break
-                    
-                    # Calculate total_selling_price with commission
-                    if commission_rate and commission_rate > 0:
-                        product.total_selling_price = ProductService.calculate_total_selling_price(
-                            product.selling_price, commission_rate
-                        )
-                    else:
-                        # No commission, total_selling_price equals selling_price
-                        product.total_selling_price = product.selling_price
-                
-                products.append(product)
+            # Effective pricing is stored on each document; legacy documents
+            # fall back to the cached pricing rules, so no per-item queries
+            products = [
+                ProductService.apply_pricing_rules(Product.from_bson(product_doc))
+                for product_doc in products_cursor
+            ]
             
             return products
         except Exception:
@@ -305,28 +265,6 @@ class ProductService:
                             raise ValueError("Delivery span must be a valid integer")
                     else:
                         update_fields[field] = product_data[field]
-            
-            # Recalculate total_selling_price if commission_rate or selling_price is updated
-            if 'commission_rate' in update_fields or 'selling_price' in update_fields:
-                selling_price = update_fields.get('selling_price')
-                commission_rate = update_fields.get('commission_rate')
-                
-                # Get current values if not in update_fields
-                if selling_price is None:
-                    product = ProductService.get_product_by_id(product_id)
-                    if product:
-                        selling_price = product.selling_price
-                
-                if commission_rate is None:
-                    product = product or ProductService.get_product_by_id(product_id)
-                    if product:
-                        commission_rate = product.commission_rate or 0
-                
-                if selling_price and selling_price > 0:
-                    total_selling_price = ProductService.calculate_total_selling_price(
-                        selling_price, commission_rate or 0
-                    )
-                    update_fields['total_selling_price'] = total_selling_price
 
             if 'points' in product_data:
                 points = product_data['points']
@@ -372,6 +310,8 @@ class ProductService:
             if result.matched_count == 0:
                 return None
 
+            # Recalculate total_selling_price and effective charges from the stored document
+            PricingEngineService.refresh_product(product_id)
             return ProductService.get_product_by_id(product_id)
         except ValueError as e:
             raise e
@@ -428,6 +368,7 @@ class ProductService:
             if result.matched_count == 0:
                 return None
             
+            PricingEngineService.refresh_product(product_id)
             return ProductService.get_product_by_id(product_id)
         except Exception as e:
             raise Exception(f"Error applying commission: {str(e)}")
@@ -440,35 +381,12 @@ class ProductService:
                 'approval_status': 'pending'
             }).sort('created_at', -1)
             
-            products = []
-            # Get all category commissions once for efficiency
-            category_commissions = ProductService.get_all_category_commissions()
-            
-            for product_doc in products_cursor:
-                product = Product.from_bson(product_doc)
-                ProductService.populate_delivery_charge(product)
-                
-                # Ensure total_selling_price is calculated if missing
-                if product.selling_price and (not product.total_selling_price or product.total_selling_price == 0):
-                    commission_rate = product.commission_rate
-                    
-                    # If no product-level commission, check category-level commission
-                    if (commission_rate is None or commission_rate == 0) and product.categories:
-                        for category in product.categories:
-                            if category in category_commissions:
-                                commission_rate = category_commissions[category]
-                                break
-                    
-                    # Calculate total_selling_price with commission
-                    if commission_rate and commission_rate > 0:
-                        product.total_selling_price = ProductService.calculate_total_selling_price(
-                            product.selling_price, commission_rate
-                        )
-                    else:
-                        # No commission, total_selling_price equals selling_price
-                        product.total_selling_price = product.selling_price
-                
-                products.append(product)
+            # Effective pricing is stored on each document; legacy documents
+            # fall back to the cached pricing rules, so no per-item queries
+            products = [
+                ProductService.apply_pricing_rules(Product.from_bson(product_doc))
+                for product_doc in products_cursor
+            ]
             
             return products
         except Exception:
@@ -556,6 +474,7 @@ class ProductService:
                 },
                 upsert=True
             )
+            PricingRulesService.invalidate()
             return True
         except Exception as e:
             raise Exception(f"Error setting category commission: {str(e)}")
@@ -564,10 +483,7 @@ class ProductService:
     def get_category_commission_rate(category):
         """Get category commission rate"""
         try:
-            doc = mongo.db.category_commissions.find_one({'category': category})
-            if doc:
-                return doc.get('commission_rate')
-            return None
+            return PricingRulesService.get_rules()['product_category_commissions'].get(category)
         except Exception:
             return None
 
@@ -575,117 +491,101 @@ class ProductService:
     def get_all_category_commissions():
         """Get all category commission rates"""
         try:
-            docs = mongo.db.category_commissions.find()
-            return {doc['category']: doc.get('commission_rate') for doc in docs}
+            return dict(PricingRulesService.get_rules()['product_category_commissions'])
         except Exception:
             return {}
 
     @staticmethod
-    def apply_commission_by_category(category, commission_rate):
+    def apply_commission_by_category(category, commission_rate, progress_callback=None):
         """Apply commission to all products in a category (only if product doesn't have specific commission)"""
         try:
             # Store the category commission rate
             ProductService.set_category_commission_rate(category, commission_rate)
             
-            products = mongo.db.products.find({'categories': category})
-            updated_count = 0
-            
-            for product_doc in products:
-                selling_price = product_doc.get('selling_price')
-                # Only apply if product doesn't have a specific commission_rate set
-                # Products with specific commission have higher priority
-                if selling_price and selling_price > 0 and not product_doc.get('commission_rate'):
-                    total_selling_price = ProductService.calculate_total_selling_price(
-                        selling_price, commission_rate
-                    )
-                    
-                    mongo.db.products.update_one(
-                        {'_id': product_doc['_id']},
-                        {
-                            '$set': {
-                                'commission_rate': float(commission_rate),
-                                'total_selling_price': total_selling_price,
-                                'updated_at': datetime.now(timezone.utc)
-                            }
-                        }
-                    )
-                    updated_count += 1
-            
-            return updated_count
+            # Only apply if product doesn't have a specific commission_rate set
+            # Products with specific commission have higher priority
+            query = {
+                'categories': category,
+                'selling_price': {'$gt': 0},
+                'commission_rate': {'$in': [None, 0]}
+            }
+            return PricingEngineService.apply_commission_bulk(
+                'product', query, commission_rate, progress_callback=progress_callback
+            )
         except Exception as e:
             raise Exception(f"Error applying commission by category: {str(e)}")
 
     @staticmethod
-    def apply_commission_to_all(commission_rate):
+    def apply_commission_to_all(commission_rate, progress_callback=None):
         """Apply commission to all products (only if product doesn't have specific or category commission)"""
         try:
-            # Get all category commissions
+            # Priority: product-specific > category > general
+            # Only apply general commission if no product or category commission exists
             category_commissions = ProductService.get_all_category_commissions()
-            
-            products = mongo.db.products.find({'selling_price': {'$gt': 0}})
-            updated_count = 0
-            
-            for product_doc in products:
-                selling_price = product_doc.get('selling_price')
-                if selling_price and selling_price > 0:
-                    # Priority: product-specific > category > general
-                    # Only apply general if product has no specific commission
-                    if product_doc.get('commission_rate'):
-                        continue  # Skip products with specific commission
-                    
-                    # Check if product has category with commission
-                    categories = product_doc.get('categories', [])
-                    has_category_commission = False
-                    for cat in categories:
-                        if cat in category_commissions:
-                            has_category_commission = True
-                            break
-                    
-                    # Only apply general commission if no category commission exists
-                    if not has_category_commission:
-                        total_selling_price = ProductService.calculate_total_selling_price(
-                            selling_price, commission_rate
-                        )
-                        
-                        mongo.db.products.update_one(
-                            {'_id': product_doc['_id']},
-                            {
-                                '$set': {
-                                    'commission_rate': float(commission_rate),
-                                    'total_selling_price': total_selling_price,
-                                    'updated_at': datetime.now(timezone.utc)
-                                }
-                            }
-                        )
-                        updated_count += 1
-            
-            return updated_count
+            query = {
+                'selling_price': {'$gt': 0},
+                'commission_rate': {'$in': [None, 0]}
+            }
+            if category_commissions:
+                query['categories'] = {'$nin': list(category_commissions)}
+            return PricingEngineService.apply_commission_bulk(
+                'product', query, commission_rate, progress_callback=progress_callback
+            )
         except Exception as e:
             raise Exception(f"Error applying commission to all: {str(e)}")
 
     @staticmethod
-    def populate_delivery_charge(product):
+    def populate_delivery_charge(product, rules=None):
         """Populate active delivery charge based on priority hierarchy"""
         try:
             if product.delivery_charge is not None:
                 return product.delivery_charge
 
-            # Check category delivery rates
-            if product.categories:
-                for category in product.categories:
-                    doc = mongo.db.product_category_delivery_rates.find_one({'category': category})
-                    if doc:
-                        product.delivery_charge = float(doc.get('rate', 0))
-                        return product.delivery_charge
-
-            # Check global delivery rate
-            global_doc = mongo.db.delivery_settings.find_one({'key': 'global_product_rate'})
-            if global_doc:
-                product.delivery_charge = float(global_doc.get('rate', 0))
-            else:
-                product.delivery_charge = 0.0
+            # Materialized at write time by PricingEngineService
+            if product.effective_delivery_charge is not None:
+                product.delivery_charge = product.effective_delivery_charge
+                return product.delivery_charge
+
+            # Category rate first, then global rate (both served from the pricing rules cache)
+            product.delivery_charge = PricingRulesService.resolve_delivery_charge(
+                product.categories, 'product', rules
+            )
             return product.delivery_charge
         except Exception:
             product.delivery_charge = 0.0
             return 0.0
 
+    @staticmethod
+    def apply_pricing_rules(product, rules=None):
+        """Fill delivery charge and missing total_selling_price for API responses"""
+        # Materialized at write time: use the stored fields as-is
+        if product.effective_delivery_charge is not None and product.effective_commission_rate is not None:
+            if product.delivery_charge is None:
+                product.delivery_charge = product.effective_delivery_charge
+            if product.total_selling_price is None:
+                product.total_selling_price = product.selling_price
+            return product
+
+        # Legacy documents not yet backfilled: derive from cached pricing rules
+        rules = rules or PricingRulesService.get_rules()
+        ProductService.populate_delivery_charge(product, rules)
+
+        # Ensure total_selling_price is calculated if missing
+        if product.selling_price and (not product.total_selling_price or product.total_selling_price == 0):
+            commission_rate = product.commission_rate
+
+            # If no product-level commission, check category-level commission
+            if (commission_rate is None or commission_rate == 0) and product.categories:
+                commission_rate = PricingRulesService.resolve_category_commission(
+                    product.categories, 'product', rules
+                )
+
+            # Calculate total_selling_price with commission
+            if commission_rate and commission_rate > 0:
+                product.total_selling_price = ProductService.calculate_total_selling_price(
+                    product.selling_price, commission_rate
+                )
+            else:
+                # No commission, total_selling_price equals selling_price
+                product.total_selling_price = product.selling_price
+        return product
@@ -4,6 +4,7 @@ Sales Report Service - Computes sales report data for the admin dashboard
 from app import mongo
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
+from app.utils.order_search import order_search_filter
 import math
 
 class SalesReportService:
@@ -75,18 +76,18 @@ class SalesReportService:
         search = filters.get('search')
         if search:
             search_str = search.strip()
-            search_regex = {'$regex': search_str, '$options': 'i'}
-            or_conditions = [
-                {'seller_snapshot.first_name': search_regex},
-                {'seller_snapshot.last_name': search_regex},
-                {'seller_snapshot.trade_id': search_regex},
-            ]
+            # Token prefix match on the indexed seller_search_keys (seller first/last name and trade id only)
+            or_conditions = []
+            search_filter = order_search_filter(search_str, field='seller_search_keys')
+            if search_filter:
+                or_conditions.append(search_filter)
             try:
                 seller_oid = ObjectId(search_str)
                 or_conditions.append({'seller_id': seller_oid})
             except:
                 pass
-            match_query['$or'] = or_conditions
+            if or_conditions:
+                match_query['$or'] = or_conditions
             
         # Pagination
         skip = (page - 1) * limit
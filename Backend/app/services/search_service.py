@@ -0,0 +1,153 @@
+"""
+Catalog search service - ranked text search over products and services
+"""
+import heapq
+import itertools
+
+from app import mongo
+from app.models.product import Product
+from app.models.service import Service
+
+SEARCH_MAX_LIMIT = 50
+SEARCH_MAX_QUERY_LENGTH = 100
+SEARCH_FACET_LIMIT = 20
+# Deepest ranked result a page may reach; ranking only carries ids, so this bounds the facet output
+SEARCH_MAX_RESULTS = 1000
+
+# Per item type: collection, text index name and weighted fields
+_SEARCH_SOURCES = {
+    'product': {
+        'collection': 'products',
+        'index_name': 'catalog_text_search',
+        'weights': {'product_name': 10, 'categories': 5, 'points': 2, 'specification': 1},
+    },
+    'service': {
+        'collection': 'services',
+        'index_name': 'catalog_text_search',
+        'weights': {'service_name': 10, 'categories': 5, 'points': 2, 'description': 1},
+    },
+}
+
+# Same visibility rule as the public product/service listings
+_PUBLIC_FILTER = {
+    '$or': [
+        {'approval_status': 'approved'},
+        {'approval_status': {'$exists': False}},
+        {'approval_status': None}
+    ]
+}
+
+
+class SearchService:
+    """Text search backed by the catalog_text_search index on products and services"""
+
+    @staticmethod
+    def create_indexes():
+        """Create the weighted text indexes. Called from create_indexes() at startup."""
+        for config in _SEARCH_SOURCES.values():
+            try:
+                mongo.db[config['collection']].create_index(
+                    [(field, 'text') for field in config['weights']],
+                    name=config['index_name'],
+                    weights=config['weights'],
+                    default_language='english'
+                )
+            except Exception as e:
+                print(f"[Search] Could not create text index on {config['collection']}: {e}")
+
+    @staticmethod
+    def _search_collection(item_type, query, category, fetch_limit):
+        """Return (ranked [{_id, _score}], total, category counts) for one collection in a single aggregate."""
+        config = _SEARCH_SOURCES[item_type]
+        category_match = [{'$match': {'categories': category}}] if category else []
+        pipeline = [
+            {'$match': {'$and': [{'$text': {'$search': query}}, _PUBLIC_FILTER]}},
+            {'$addFields': {'_score': {'$meta': 'textScore'}}},
+            {'$facet': {
+                'results': category_match + [
+                    {'$sort': {'_score': -1, '_id': -1}},
+                    {'$limit': fetch_limit},
+                    {'$project': {'_score': 1}},
+                ],
+                'total': category_match + [{'$count': 'count'}],
+                # Facets ignore the selected category so clients can switch between them
+                'categories': [
+                    {'$unwind': '$categories'},
+                    {'$group': {'_id': '$categories', 'count': {'$sum': 1}}},
+                    {'$sort': {'count': -1, '_id': 1}},
+                    {'$limit': SEARCH_FACET_LIMIT},
+                ],
+            }},
+        ]
+        facet = next(mongo.db[config['collection']].aggregate(pipeline), {})
+        total = facet['total'][0]['count'] if facet.get('total') else 0
+        categories = {row['_id']: row['count'] for row in facet.get('categories', [])}
+        return facet.get('results', []), total, categories
+
+    @staticmethod
+    def search(query, item_type='all', category=None, page=1, limit=20):
+        """
+        Ranked search over the public catalog.
+        Returns {'items': [(item_type, model, score)], 'total', 'page', 'limit', 'facets'}.
+        """
+        query = (query or '').strip()
+        if not query:
+            raise ValueError('Search query is required')
+        if len(query) > SEARCH_MAX_QUERY_LENGTH:
+            raise ValueError(f'Search query must be at most {SEARCH_MAX_QUERY_LENGTH} characters')
+        if item_type == 'all':
+            item_types = list(_SEARCH_SOURCES)
+        elif item_type in _SEARCH_SOURCES:
+            item_types = [item_type]
+        else:
+            raise ValueError("type must be 'all', 'product' or 'service'")
+
+        page = max(int(page), 1)
+        limit = min(max(int(limit), 1), SEARCH_MAX_LIMIT)
+        skip = (page - 1) * limit
+        if skip >= SEARCH_MAX_RESULTS:
+            raise ValueError(f'Only the first {SEARCH_MAX_RESULTS} results can be paged through; refine the search')
+
+        ranked_streams = []
+        total = 0
+        category_counts = {}
+        type_counts = {}
+        for source_type in item_types:
+            docs, source_total, source_categories = SearchService._search_collection(
+                source_type, query, category, skip + limit
+            )
+            ranked_streams.append([(doc['_score'], source_type, doc) for doc in docs])
+            total += source_total
+            type_counts[source_type] = source_total
+            for name, count in source_categories.items():
+                category_counts[name] = category_counts.get(name, 0) + count
+
+        merged = heapq.merge(*ranked_streams, key=lambda entry: (entry[0], entry[2]['_id']), reverse=True)
+        page_entries = list(itertools.islice(merged, skip, skip + limit))
+
+        # Load full documents for this page only
+        docs_by_key = {}
+        for source_type in item_types:
+            ids = [ranked['_id'] for _score, entry_type, ranked in page_entries if entry_type == source_type]
+            if ids:
+                collection = mongo.db[_SEARCH_SOURCES[source_type]['collection']]
+                for doc in collection.find({'_id': {'$in': ids}}):
+                    docs_by_key[(source_type, doc['_id'])] = doc
+
+        items = []
+        for score, source_type, ranked in page_entries:
+            doc = docs_by_key.get((source_type, ranked['_id']))
+            if doc is None:
+                # Deleted since it was ranked
+                continue
+            model = Product.from_bson(doc) if source_type == 'product' else Service.from_bson(doc)
+            items.append((source_type, model, score))
+
+        facets = {
+            'categories': [
+                {'category': name, 'count': count}
+                for name, count in sorted(category_counts.items(), key=lambda kv: (-kv[1], kv[0]))
+            ][:SEARCH_FACET_LIMIT],
+            'types': type_counts,
+        }
+        return {'items': items, 'total': total, 'page': page, 'limit': limit, 'facets': facets}
@@ -1,13 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 from app import mongo
 
+IP_FAILURE_THRESHOLD = 15
+USER_FAILURE_THRESHOLD = 5
+BLOCK_DURATION = timedelta(minutes=15)
+# Failure counts older than this start over
+FAILURE_WINDOW = timedelta(hours=1)
+MAX_DAILY_USER_BLOCKS = 3
+
+# In-memory front layer: each IP may fail this many logins in a burst, refilled at
+# LOGIN_BUCKET_REFILL_PER_SECOND; once empty, further attempts are rejected before any
+# database work. Successful logins are free, so a campus NAT address is not throttled.
+LOGIN_BUCKET_CAPACITY = 30
+LOGIN_BUCKET_REFILL_PER_SECOND = 0.5
+LOGIN_BUCKET_MAX_KEYS = 100000
+
+_BLOCK_FIELDS = {'is_permanently_blocked': 1, 'blocked_until': 1}
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets held in memory (least recently used keys are dropped past max_keys)."""
+
+    def __init__(self, capacity, refill_per_second, max_keys=LOGIN_BUCKET_MAX_KEYS):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # {key: (tokens, updated_at)}
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+
+    def wait(self, key, now=None):
+        """Seconds until a token is available (0 if one is), without spending it."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens = self._tokens(key, now)
+        return 0 if tokens >= 1 else (1 - tokens) / self.refill_per_second
+
+    def take(self, key, now=None):
+        """Spend one token. Returns 0 when allowed, otherwise seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.refill_per_second
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+_login_limiter = TokenBucketLimiter(LOGIN_BUCKET_CAPACITY, LOGIN_BUCKET_REFILL_PER_SECOND)
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value else None
+
+
+def _block_error(record, now, subject):
+    """Login error for a blocked IP/account record, or None."""
+    if not record:
+        return None
+    if record.get('is_permanently_blocked'):
+        return f"PAUSED: This {subject} has been paused by the system."
+    blocked_until = _as_utc(record.get('blocked_until'))
+    if blocked_until and blocked_until > now:
+        return f"BLOCKED_UNTIL:{blocked_until.isoformat()}"
+    return None
+
+
+def _count_failure(count_field, last_field, cutoff, now):
+    """Pipeline stage: count this failure, starting over when the last one is outside the window."""
+    return {'$set': {
+        count_field: {'$add': [
+            {'$cond': [{'$gt': [f'${last_field}', cutoff]}, {'$ifNull': [f'${count_field}', 0]}, 0]},
+            1
+        ]},
+        last_field: now,
+        'total_blocks': {'$ifNull': ['$total_blocks', 0]},
+    }}
+
 class SecurityService:
     @staticmethod
     def get_client_ip(request):
-        """Extract IP address preferring X-Forwarded-For if available."""
-        if request.headers.get('X-Forwarded-For'):
-            return request.headers.get('X-Forwarded-For').split(',')[0].strip()
+        """
+        Client IP address: the socket peer, or with TRUSTED_PROXY_HOPS > 0 (set only behind
+        that many proxies) the X-Forwarded-For entry ProxyFix takes from the last trusted proxy.
+        """
         return request.remote_addr
 
     @staticmethod
@@ -17,40 +113,23 @@ class SecurityService:
         Returns (is_allowed, error_message).
         """
         now = datetime.now(timezone.utc)
+
+        # 0. In-memory rate limit on failures: storms are rejected before reaching the database
+        wait = _login_limiter.wait(ip_address)
+        if wait:
+            return False, f"BLOCKED_UNTIL:{(now + timedelta(seconds=wait)).isoformat()}"
         
         # 1. Check IP block
-        ip_record = mongo.db.ip_security.find_one({'ip_address': ip_address})
-        if ip_record:
-            if ip_record.get('is_permanently_blocked'):
-                return False, "PAUSED: This IP address has been paused by the system."
-            if ip_record.get('blocked_until') and ip_record['blocked_until'].replace(tzinfo=timezone.utc) > now:
-                return False, f"BLOCKED_UNTIL:{ip_record['blocked_until'].replace(tzinfo=timezone.utc).isoformat()}"
-            
-            # Reset IP count if 30 mins have passed since last failure
-            if ip_record.get('last_failed_at'):
-                last_failed = ip_record['last_failed_at'].replace(tzinfo=timezone.utc)
-                if now - last_failed > timedelta(hours=1):
-                    mongo.db.ip_security.update_one(
-                        {'_id': ip_record['_id']},
-                        {'$set': {'failed_count': 0, 'blocked_until': None}}
-                    )
+        ip_record = mongo.db.ip_security.find_one({'ip_address': ip_address}, _BLOCK_FIELDS)
+        error = _block_error(ip_record, now, 'IP address')
+        if error:
+            return False, error
 
         # 2. Check User block
-        user = mongo.db[user_collection_name].find_one({user_identifier_field: user_identifier_value})
-        if user:
-            if user.get('is_permanently_blocked'):
-                return False, "PAUSED: This account has been paused by the system."
-            if user.get('blocked_until') and user['blocked_until'].replace(tzinfo=timezone.utc) > now:
-                return False, f"BLOCKED_UNTIL:{user['blocked_until'].replace(tzinfo=timezone.utc).isoformat()}"
-            
-            # Reset user count if 30 mins have passed
-            if user.get('last_failed_login_at'):
-                last_failed = user['last_failed_login_at'].replace(tzinfo=timezone.utc)
-                if now - last_failed > timedelta(hours=1):
-                    mongo.db[user_collection_name].update_one(
-                        {'_id': user['_id']},
-                        {'$set': {'failed_login_count': 0, 'blocked_until': None}}
-                    )
+        user = mongo.db[user_collection_name].find_one({user_identifier_field: user_identifier_value}, _BLOCK_FIELDS)
+        error = _block_error(user, now, 'account')
+        if error:
+            return False, error
 
         return True, None
 
@@ -61,62 +140,60 @@ class SecurityService:
         IP threshold = 15
         User threshold = 5
         Block duration = 15 mins
+        Counts older than an hour start over. Each update is a single atomic
+        pipeline, so concurrent failures cannot overwrite each other's counts.
         """
+        _login_limiter.take(ip_address)
         now = datetime.now(timezone.utc)
-        block_duration = timedelta(minutes=15)
+        cutoff = now - FAILURE_WINDOW
+        blocked_until = now + BLOCK_DURATION
         
         # 1. Update IP Security
-        ip_record = mongo.db.ip_security.find_one({'ip_address': ip_address})
-        if not ip_record:
-            mongo.db.ip_security.insert_one({
-                'ip_address': ip_address,
-                'failed_count': 1,
-                'last_failed_at': now,
-                'blocked_until': None,
-                'total_blocks': 0,
-                'is_permanently_blocked': False
-            })
-        else:
-            new_count = ip_record.get('failed_count', 0) + 1
-            update_data = {
-                'failed_count': new_count,
-                'last_failed_at': now
-            }
-            if new_count >= 15:
-                update_data['blocked_until'] = now + block_duration
-                update_data['failed_count'] = 0 # reset count but apply block
-                new_total_blocks = ip_record.get('total_blocks', 0) + 1
-                update_data['total_blocks'] = new_total_blocks
-                if new_total_blocks > 1:
-                    update_data['is_permanently_blocked'] = True
-            mongo.db.ip_security.update_one({'_id': ip_record['_id']}, {'$set': update_data})
-
-        # 2. Update User Security
-        user = mongo.db[user_collection_name].find_one({user_identifier_field: user_identifier_value})
-        if user:
-            new_count = user.get('failed_login_count', 0) + 1
-            update_data = {
-                'failed_login_count': new_count,
-                'last_failed_login_at': now
-            }
-            if new_count >= 5:
-                update_data['blocked_until'] = now + block_duration
-                update_data['failed_login_count'] = 0
-                update_data['total_blocks'] = user.get('total_blocks', 0) + 1
-                
-                today_date = now.strftime('%Y-%m-%d')
-                if user.get('last_block_date') != today_date:
-                    daily_blocks = 1
-                else:
-                    daily_blocks = user.get('daily_blocks', 0) + 1
-                    
-                update_data['daily_blocks'] = daily_blocks
-                update_data['last_block_date'] = today_date
-                
-                if daily_blocks > 3:
-                    update_data['is_permanently_blocked'] = True
-            
-            mongo.db[user_collection_name].update_one({'_id': user['_id']}, {'$set': update_data})
+        ip_blocked = {'$gte': ['$failed_count', IP_FAILURE_THRESHOLD]}
+        mongo.db.ip_security.update_one(
+            {'ip_address': ip_address},
+            [
+                _count_failure('failed_count', 'last_failed_at', cutoff, now),
+                {'$set': {
+                    'blocked_until': {'$cond': [ip_blocked, blocked_until, {'$ifNull': ['$blocked_until', None]}]},
+                    'failed_count': {'$cond': [ip_blocked, 0, '$failed_count']},  # reset count but apply block
+                    'total_blocks': {'$cond': [ip_blocked, {'$add': ['$total_blocks', 1]}, '$total_blocks']},
+                    'is_permanently_blocked': {'$cond': [
+                        {'$and': [ip_blocked, {'$gte': ['$total_blocks', 1]}]},
+                        True,
+                        {'$ifNull': ['$is_permanently_blocked', False]}
+                    ]},
+                }},
+            ],
+            upsert=True
+        )
+
+        # 2. Update User Security (existing accounts only)
+        today_date = now.strftime('%Y-%m-%d')
+        user_blocked = {'$gte': ['$failed_login_count', USER_FAILURE_THRESHOLD]}
+        daily_blocks = {'$cond': [
+            {'$eq': ['$last_block_date', today_date]},
+            {'$add': [{'$ifNull': ['$daily_blocks', 0]}, 1]},
+            1
+        ]}
+        mongo.db[user_collection_name].update_one(
+            {user_identifier_field: user_identifier_value},
+            [
+                _count_failure('failed_login_count', 'last_failed_login_at', cutoff, now),
+                {'$set': {
+                    'blocked_until': {'$cond': [user_blocked, blocked_until, {'$ifNull': ['$blocked_until', None]}]},
+                    'failed_login_count': {'$cond': [user_blocked, 0, '$failed_login_count']},
+                    'total_blocks': {'$cond': [user_blocked, {'$add': ['$total_blocks', 1]}, '$total_blocks']},
+                    'daily_blocks': {'$cond': [user_blocked, daily_blocks, {'$ifNull': ['$daily_blocks', 0]}]},
+                    'last_block_date': {'$cond': [user_blocked, today_date, {'$ifNull': ['$last_block_date', None]}]},
+                    'is_permanently_blocked': {'$cond': [
+                        {'$and': [user_blocked, {'$gt': [daily_blocks, MAX_DAILY_USER_BLOCKS]}]},
+                        True,
+                        {'$ifNull': ['$is_permanently_blocked', False]}
+                    ]},
+                }},
+            ]
+        )
 
     @staticmethod
     def record_successful_login(ip_address, user_collection_name, user_identifier_field, user_identifier_value):
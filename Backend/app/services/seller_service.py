@@ -4,6 +4,7 @@ Seller service - Business logic for seller operations with MongoDB
 from bson import ObjectId
 from datetime import datetime
 from app import mongo
+from app.utils.contact_directory import invalidate_contact
 from app.models.seller import Seller
 from app.services.blacklist_service import BlacklistService
 
@@ -137,6 +138,8 @@ class SellerService:
             # Insert into MongoDB sellers collection
             result = mongo.db.sellers.insert_one(seller_bson)
             seller._id = result.inserted_id
+            invalidate_contact(seller_bson.get('phone_number'), seller_bson.get('email'))
+            invalidate_contact(seller_bson.get('seller_phone'))
             
             return seller
         except ValueError as e:
@@ -163,6 +166,8 @@ class SellerService:
             
             if result.matched_count == 0:
                 return None
+            invalidate_contact(update_data.get('phone_number'), update_data.get('email'))
+            invalidate_contact(update_data.get('seller_phone'))
             
             # Return updated seller
             return SellerService.get_seller_by_id(seller_id)
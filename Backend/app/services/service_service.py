@@ -6,6 +6,9 @@ from datetime import datetime, timezone
 
 from app import mongo
 from app.models.service import Service
+from app.services.pricing_rules_service import PricingRulesService
+from app.services.pricing_engine_service import PricingEngineService
+from app.utils.pagination import KEYSET_SORT, keyset_filter
 from app.utils.image_handler import save_stored_image_reference, delete_entity_images, is_base64_image
 
 
@@ -104,6 +107,11 @@ class ServiceService:
             service._id = service_id
 
             service_bson = service.to_bson()
+            pricing_fields = PricingEngineService.compute_fields(service_bson, 'service')
+            service_bson.update(pricing_fields)
+            for key, value in pricing_fields.items():
+                setattr(service, key, value)
+
             mongo.db.services.insert_one(service_bson)
             return service
         except ValueError as e:
@@ -125,7 +133,8 @@ class ServiceService:
             return None
 
     @staticmethod
-    def get_all_services(skip=0, limit=100, include_pending=False):
+    def get_all_services(skip=0, limit=100, include_pending=False, after=None):
+        """List services newest first; after=(created_at, _id) switches to keyset paging"""
         try:
             query = {}
             if not include_pending:
@@ -135,10 +144,13 @@ class ServiceService:
                         {'approval_status': {'$exists': False}}
                     ]
                 }
+            if after:
+                query = {'$and': [query, keyset_filter(after)]} if query else keyset_filter(after)
+                skip = 0
             
             services_cursor = (
                 mongo.db.services.find(query)
-                .sort('created_at', -1)
+                .sort(KEYSET_SORT)
                 .skip(skip)
                 .limit(limit)
             )
@@ -174,25 +186,6 @@ class ServiceService:
                         update_fields[field] = float(service_data[field])
                     else:
                         update_fields[field] = service_data[field]
-            
-            if 'commission_rate' in update_fields or 'service_charge' in update_fields:
-                service_charge = update_fields.get('service_charge')
-                commission_rate = update_fields.get('commission_rate')
-                
-                if service_charge is None:
-                    service = ServiceService.get_service_by_id(service_id)
-                    if service:
-                        service_charge = service.service_charge
-                
-                if commission_rate is None:
-                    service = service or ServiceService.get_service_by_id(service_id)
-                    if service:
-                        commission_rate = service.commission_rate or 0
-                
-                if service_charge and service_charge > 0:
-                    update_fields['total_service_charge'] = ServiceService.calculate_total_service_charge(
-                        service_charge, commission_rate or 0
-                    )
 
             if 'points' in service_data:
                 points = service_data['points']
@@ -233,6 +226,7 @@ class ServiceService:
             if result.matched_count == 0:
                 return None
 
+            PricingEngineService.refresh_service(service_id)
             return ServiceService.get_service_by_id(service_id)
         except ValueError as e:
             raise e
@@ -273,6 +267,7 @@ class ServiceService:
                 },
                 upsert=True,
             )
+            PricingRulesService.invalidate()
             return True
         except Exception as e:
             raise Exception(f'Error setting service category commission: {str(e)}')
@@ -280,18 +275,14 @@ class ServiceService:
     @staticmethod
     def get_category_commission_rate(category):
         try:
-            doc = mongo.db.service_category_commissions.find_one({'category': category})
-            if doc:
-                return doc.get('commission_rate')
-            return None
+            return PricingRulesService.get_rules()['service_category_commissions'].get(category)
         except Exception:
             return None
 
     @staticmethod
     def get_all_category_commissions():
         try:
-            docs = mongo.db.service_category_commissions.find()
-            return {doc['category']: doc.get('commission_rate') for doc in docs}
+            return dict(PricingRulesService.get_rules()['service_category_commissions'])
         except Exception:
             return {}
 
@@ -317,6 +308,7 @@ class ServiceService:
                     }
                 },
             )
+            PricingEngineService.refresh_service(service_id)
             return ServiceService.get_service_by_id(service_id)
         except ValueError:
             raise
@@ -324,63 +316,33 @@ class ServiceService:
             raise Exception(f'Error applying service commission: {str(e)}')
 
     @staticmethod
-    def apply_commission_by_category(category, commission_rate):
+    def apply_commission_by_category(category, commission_rate, progress_callback=None):
         try:
             ServiceService.set_category_commission_rate(category, commission_rate)
-            services = mongo.db.services.find({'categories': category})
-            updated_count = 0
-            for service_doc in services:
-                service_charge = service_doc.get('service_charge')
-                if service_charge and service_charge > 0 and not service_doc.get('commission_rate'):
-                    total_service_charge = ServiceService.calculate_total_service_charge(
-                        service_charge, commission_rate
-                    )
-                    mongo.db.services.update_one(
-                        {'_id': service_doc['_id']},
-                        {
-                            '$set': {
-                                'commission_rate': float(commission_rate),
-                                'total_service_charge': total_service_charge,
-                                'updated_at': datetime.now(timezone.utc),
-                            }
-                        },
-                    )
-                    updated_count += 1
-            return updated_count
+            query = {
+                'categories': category,
+                'service_charge': {'$gt': 0},
+                'commission_rate': {'$in': [None, 0]},
+            }
+            return PricingEngineService.apply_commission_bulk(
+                'service', query, commission_rate, progress_callback=progress_callback
+            )
         except Exception as e:
             raise Exception(f'Error applying service commission by category: {str(e)}')
 
     @staticmethod
-    def apply_commission_to_all(commission_rate):
+    def apply_commission_to_all(commission_rate, progress_callback=None):
         try:
             category_commissions = ServiceService.get_all_category_commissions()
-            services = mongo.db.services.find({'service_charge': {'$gt': 0}})
-            updated_count = 0
-            for service_doc in services:
-                service_charge = service_doc.get('service_charge')
-                if not service_charge or service_charge <= 0:
-                    continue
-                if service_doc.get('commission_rate'):
-                    continue
-                categories = service_doc.get('categories') or []
-                has_category_commission = any(cat in category_commissions for cat in categories)
-                if has_category_commission:
-                    continue
-                total_service_charge = ServiceService.calculate_total_service_charge(
-                    service_charge, commission_rate
-                )
-                mongo.db.services.update_one(
-                    {'_id': service_doc['_id']},
-                    {
-                        '$set': {
-                            'commission_rate': float(commission_rate),
-                            'total_service_charge': total_service_charge,
-                            'updated_at': datetime.now(timezone.utc),
-                        }
-                    },
-                )
-                updated_count += 1
-            return updated_count
+            query = {
+                'service_charge': {'$gt': 0},
+                'commission_rate': {'$in': [None, 0]},
+            }
+            if category_commissions:
+                query['categories'] = {'$nin': list(category_commissions)}
+            return PricingEngineService.apply_commission_bulk(
+                'service', query, commission_rate, progress_callback=progress_callback
+            )
         except Exception as e:
             raise Exception(f'Error applying commission to all services: {str(e)}')
 
@@ -448,26 +410,21 @@ class ServiceService:
             return False, f"Error rejecting service: {str(e)}"
 
     @staticmethod
-    def populate_delivery_charge(service):
+    def populate_delivery_charge(service, rules=None):
         """Populate active delivery charge based on priority hierarchy"""
         try:
             if service.delivery_charge is not None:
                 return service.delivery_charge
 
-            # Check category delivery rates
-            if service.categories:
-                for category in service.categories:
-                    doc = mongo.db.service_category_delivery_rates.find_one({'category': category})
-                    if doc:
-                        service.delivery_charge = float(doc.get('rate', 0))
-                        return service.delivery_charge
-
-            # Check global delivery rate
-            global_doc = mongo.db.delivery_settings.find_one({'key': 'global_service_rate'})
-            if global_doc:
-                service.delivery_charge = float(global_doc.get('rate', 0))
-            else:
-                service.delivery_charge = 0.0
+            # Materialized at write time by PricingEngineService
+            if service.effective_delivery_charge is not None:
+                service.delivery_charge = service.effective_delivery_charge
+                return service.delivery_charge
+
+            # Category rate first, then global rate (both served from the pricing rules cache)
+            service.delivery_charge = PricingRulesService.resolve_delivery_charge(
+                service.categories, 'service', rules
+            )
             return service.delivery_charge
         except Exception:
             service.delivery_charge = 0.0
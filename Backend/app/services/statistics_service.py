@@ -5,6 +5,7 @@ from app import mongo
 from app.models.statistics import Statistics
 from datetime import datetime, timezone
 from bson import ObjectId
+from app.services.analytics_cache import invalidate_analytics_cache
 
 
 class StatisticsService:
@@ -71,6 +72,7 @@ class StatisticsService:
                     upsert=True
                 )
             
+            invalidate_analytics_cache()
             return True
         except Exception as e:
             print(f"Error adding revenue and commission: {e}")
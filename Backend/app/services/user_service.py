@@ -4,6 +4,8 @@ User service - Business logic for user operations with MongoDB
 from bson import ObjectId
 from datetime import datetime, timezone
 from app import mongo
+from app.utils.contact_directory import invalidate_contact
+from app.utils.principal_status import invalidate_principal
 from app.models.user import User
 
 
@@ -124,6 +126,8 @@ class UserService:
             # Insert into MongoDB
             result = mongo.db.users.insert_one(user_bson)
             user._id = result.inserted_id
+            # A new account can take over a contact cached for another role
+            invalidate_contact(user_bson.get('phone_number'), user_bson.get('email'))
             
             return user
         except ValueError as e:
@@ -149,6 +153,9 @@ class UserService:
             
             if result.matched_count == 0:
                 return None
+            invalidate_contact(update_data.get('phone_number'), update_data.get('email'))
+            if 'is_active' in update_data:
+                invalidate_principal('user', user_id)
             
             # Return updated user
             return UserService.get_user_by_id(user_id)
@@ -160,6 +167,7 @@ class UserService:
         """Delete a user"""
         try:
             result = mongo.db.users.delete_one({'_id': ObjectId(user_id)})
+            invalidate_principal('user', user_id)
             return result.deleted_count > 0
         except Exception:
             return False
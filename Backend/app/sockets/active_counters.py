@@ -4,11 +4,13 @@ Defines specialized handlers for active counting.
 Registration/Connection logic is centralized in events.py to avoid handler conflicts.
 """
 from flask_socketio import emit
-from app.utils.active_counters import get_all_counts
+from app.utils.active_counters import get_all_counts, start_heartbeat
 
 
 def register_active_counter_events(socketio):
     """Register specialized active counter socket events"""
+    # Keeps this worker's sockets alive in the counter store and expires dead ones
+    start_heartbeat(socketio)
     
     @socketio.on('request_active_counts', namespace='/')
     def handle_request_active_counts():
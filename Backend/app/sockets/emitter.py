@@ -1,102 +1,175 @@
 """
 Utility helpers for emitting socket events to connected clients.
+
+Product and service events are batched per room. The first event in a quiet
+period is sent immediately. Events arriving during the following
+BATCH_WINDOW_SECONDS are coalesced (latest payload per event and item id wins)
+and sent as one frame when the window closes:
+
+    products_batch_updated / services_batch_updated
+    {
+        "count": 2,
+        "events": [
+            {"event": "product_updated", "data": {...product dict...}},
+            {"event": "product_deleted", "data": {"id": "..."}}
+        ]
+    }
+
+A window that collects a single event sends it under its original name, so
+clients that do not know the batch events still work for ordinary updates.
 """
-from bson import ObjectId
+import itertools
+from collections import OrderedDict
+from threading import Lock
+
+from app import socketio
+from app.sockets.rooms import principal_room, role_room
+
+BATCH_WINDOW_SECONDS = 0.25
+# A window holding this many events is flushed early to bound frame size
+BATCH_MAX_EVENTS = 200
+
+BATCH_EVENT_NAMES = {
+    'product': 'products_batch_updated',
+    'service': 'services_batch_updated',
+}
+
+# {(kind, room): EventBatch} for windows currently open
+_open_batches = {}
+_batch_lock = Lock()
+
+
+class EventBatch:
+    """Events collected during one window, coalesced per (event name, item id)."""
 
-from app import mongo, socketio
+    _anonymous_ids = itertools.count()
 
+    def __init__(self):
+        self._events = OrderedDict()
 
-def _emit_to_collection(collection_name, filter_query, event_name, payload):
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, event_name, payload):
+        item_id = payload.get('id') or payload.get('_id') if isinstance(payload, dict) else None
+        key = (event_name, str(item_id) if item_id else f'#{next(self._anonymous_ids)}')
+        # Re-adding moves the item to the end so the batch keeps the latest order
+        self._events.pop(key, None)
+        self._events[key] = (event_name, payload)
+
+    def drain(self):
+        events = list(self._events.values())
+        self._events.clear()
+        return events
+
+
+def batch_payload(events):
+    """Wire payload for a batch of (event_name, payload) pairs."""
+    return {
+        'count': len(events),
+        'events': [{'event': event_name, 'data': payload} for event_name, payload in events],
+    }
+
+
+def _emit_to_rooms(rooms, event_name, payload):
     """
-    Emit an event to all active sockets stored on the given collection.
+    Emit an event once to the union of rooms (each socket receives it once,
+    and the payload is serialized once for all recipients).
     """
+    rooms = [room for room in dict.fromkeys(rooms) if room]
+    if not rooms:
+        return
     try:
-        cursor = mongo.db[collection_name].find(filter_query, {'socket_id': 1})
-        for doc in cursor:
-            socket_id = doc.get('socket_id')
-            if socket_id:
-                socketio.emit(event_name, payload, to=socket_id)
+        socketio.emit(event_name, payload, to=rooms if len(rooms) > 1 else rooms[0])
     except Exception as exc:
         # We intentionally swallow errors here to avoid breaking the main request flow.
-        print(f"[SocketEmitter] Failed to emit to {collection_name}: {exc}")
+        print(f"[SocketEmitter] Failed to emit {event_name} to {rooms}: {exc}")
 
 
 def _emit_to_user(user_id, event_name, payload):
     """Emit event to a specific user by their user_id."""
-    try:
-        user_doc = mongo.db.users.find_one({'_id': ObjectId(user_id)}, {'socket_id': 1})
-        if user_doc and user_doc.get('socket_id'):
-            socketio.emit(event_name, payload, to=user_doc['socket_id'])
-    except Exception as exc:
-        print(f"[SocketEmitter] Failed to emit to user {user_id}: {exc}")
+    _emit_to_rooms([principal_room('user', user_id)], event_name, payload)
 
 
 def _emit_to_seller(seller_id, event_name, payload):
     """Emit event to a specific seller by their seller_id."""
+    _emit_to_rooms([principal_room('seller', seller_id)], event_name, payload)
+
+
+def _send_batch(kind, room, events):
+    if not events:
+        return
     try:
-        seller_doc = mongo.db.sellers.find_one({'_id': ObjectId(seller_id)}, {'socket_id': 1})
-        if seller_doc and seller_doc.get('socket_id'):
-            socketio.emit(event_name, payload, to=seller_doc['socket_id'])
+        if len(events) == 1:
+            event_name, payload = events[0]
+            socketio.emit(event_name, payload, to=room)
+        else:
+            socketio.emit(BATCH_EVENT_NAMES[kind], batch_payload(events), to=room)
     except Exception as exc:
-        print(f"[SocketEmitter] Failed to emit to seller {seller_id}: {exc}")
+        print(f"[SocketEmitter] Failed to emit {kind} batch to {room or 'all'}: {exc}")
+
+
+def _run_batch_window(kind, room):
+    """Flush the window's events every BATCH_WINDOW_SECONDS until one passes quietly."""
+    key = (kind, room)
+    while True:
+        socketio.sleep(BATCH_WINDOW_SECONDS)
+        with _batch_lock:
+            batch = _open_batches.get(key)
+            events = batch.drain() if batch is not None else []
+            if not events:
+                _open_batches.pop(key, None)
+                return
+        _send_batch(kind, room, events)
+
+
+def _emit_batched(kind, event_name, payload, room=None):
+    """Send now if no window is open for (kind, room), otherwise coalesce into the window."""
+    key = (kind, room)
+    flush = None
+    with _batch_lock:
+        batch = _open_batches.get(key)
+        if batch is None:
+            _open_batches[key] = EventBatch()
+        else:
+            batch.add(event_name, payload)
+            if len(batch) >= BATCH_MAX_EVENTS:
+                flush = batch.drain()
+
+    if batch is None:
+        _send_batch(kind, room, [(event_name, payload)])
+        try:
+            socketio.start_background_task(_run_batch_window, kind, room)
+        except Exception as exc:
+            with _batch_lock:
+                _open_batches.pop(key, None)
+            print(f"[SocketEmitter] Failed to start batch window: {exc}")
+    elif flush:
+        _send_batch(kind, room, flush)
 
 
 def emit_product_event(event_name, product_dict):
     """
-    Broadcast product event to all listeners plus targeted masters/sellers.
+    Broadcast product event to all listeners (batched, see module docstring).
+    The broadcast already reaches masters and the owning seller, so no targeted re-emits.
     """
     if not product_dict:
         return
 
     # Broadcast to everyone (masters, sellers, public users)
-    socketio.emit(event_name, product_dict)
-
-    seller_trade_id = product_dict.get('seller_trade_id')
-    seller_id = product_dict.get('created_by_user_id')
-
-    # Notify the owning seller explicitly if we have their trade ID or object id
-    seller_filter = {}
-    if seller_id:
-        try:
-            seller_filter['_id'] = ObjectId(seller_id)
-        except Exception:
-            seller_filter['_id'] = seller_id
-    elif seller_trade_id:
-        seller_filter['trade_id'] = seller_trade_id
-    if seller_filter:
-        _emit_to_collection('sellers', seller_filter, event_name, product_dict)
-
-    # Notify all masters who are currently active
-    _emit_to_collection('master', {'socket_id': {'$ne': None}}, event_name, product_dict)
+    _emit_batched('product', event_name, product_dict)
 
 
 def emit_service_event(event_name, service_dict):
     """
-    Broadcast service event to all listeners plus targeted masters/sellers.
+    Broadcast service event to all listeners (batched, see module docstring).
+    The broadcast already reaches masters and the owning seller, so no targeted re-emits.
     """
     if not service_dict:
         return
 
     # Broadcast to everyone (masters, sellers, public users)
-    socketio.emit(event_name, service_dict)
-
-    seller_trade_id = service_dict.get('seller_trade_id')
-    seller_id = service_dict.get('created_by_user_id')
-
-    # Notify the owning seller explicitly if we have their trade ID or object id
-    seller_filter = {}
-    if seller_id:
-        try:
-            seller_filter['_id'] = ObjectId(seller_id)
-        except Exception:
-            seller_filter['_id'] = seller_id
-    elif seller_trade_id:
-        seller_filter['trade_id'] = seller_trade_id
-    if seller_filter:
-        _emit_to_collection('sellers', seller_filter, event_name, service_dict)
-
-    # Notify all masters who are currently active
-    _emit_to_collection('master', {'socket_id': {'$ne': None}}, event_name, service_dict)
+    _emit_batched('service', event_name, service_dict)
 
 
 def emit_order_event(event_name, order_dict, target_user_id=None, target_seller_id=None):
@@ -110,20 +183,15 @@ def emit_order_event(event_name, order_dict, target_user_id=None, target_seller_
     if not order_dict:
         return
     
-    # Broadcast to all masters
-    _emit_to_collection('master', {'socket_id': {'$ne': None}}, event_name, order_dict)
-    
-    # Target specific user
-    if target_user_id:
-        _emit_to_user(target_user_id, event_name, order_dict)
-    
-    # Target specific seller
-    if target_seller_id:
-        _emit_to_seller(target_seller_id, event_name, order_dict)
-    
-    # Broadcast to outlet men only for specific events
+    rooms = [
+        role_room('master'),
+        principal_room('user', target_user_id),
+        principal_room('seller', target_seller_id),
+    ]
+    # Outlet men only receive specific events
     if event_name in ['new_order', 'order_status_update']:
-        _emit_to_collection('outlet_men', {'socket_id': {'$ne': None}}, event_name, order_dict)
+        rooms.append(role_room('outlet_man'))
+    _emit_to_rooms(rooms, event_name, order_dict)
 
 
 def emit_rating_update(product_id, rating_stats):
@@ -161,5 +229,4 @@ def emit_seller_credits_updated(seller_id, credits, trade_id=None):
     }
     if trade_id:
         payload['trade_id'] = trade_id
-    _emit_to_seller(seller_id, 'seller_credits_updated', payload)
-    _emit_to_collection('master', {'socket_id': {'$ne': None}}, 'seller_credits_updated', payload)
\ No newline at end of file
+    _emit_to_rooms([principal_room('seller', sid), role_room('master')], 'seller_credits_updated', payload)
\ No newline at end of file
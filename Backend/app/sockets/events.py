@@ -1,21 +1,24 @@
 """
 Socket.IO event handlers - minimal configuration
 """
-from flask_socketio import emit, disconnect, ConnectionRefusedError
+from flask_socketio import emit, disconnect, join_room, leave_room, rooms, ConnectionRefusedError
 from flask import request
 from flask_jwt_extended import decode_token
 from bson import ObjectId
 from app import mongo
 from datetime import datetime, timezone
 from app.utils.active_counters import (
-    increment_counter,
-    decrement_counter,
     register_socket,
+    register_principal,
     unregister_socket,
+    is_principal_online,
     get_role_for_socket,
-    get_all_counts
+    get_all_counts,
+    schedule_counts_broadcast
 )
 from app.services.blacklist_service import BlacklistService
+from app.sockets.presence import register_presence, unregister_presence
+from app.sockets.rooms import is_managed_room, principal_room, role_room
 
 
 def register_events(socketio):
@@ -65,17 +68,24 @@ def register_events(socketio):
                 
                 if user_id and user_type:
                     authenticated = True
-                    # Update Online Status in DB
-                    user_obj_id = ObjectId(user_id) if not isinstance(user_id, ObjectId) else user_id
+                    # Track the socket and join its role/principal rooms (emitters target rooms)
+                    register_presence(sid, user_type, user_id)
+                    register_principal(sid, user_type, user_id)
+                    for room in rooms(sid=sid):
+                        if is_managed_room(room):
+                            leave_room(room, sid=sid)
+                    join_room(role_room(user_type), sid=sid)
+                    join_room(principal_room(user_type, user_id), sid=sid)
                     
+                    # Set after the socket is registered, so a concurrent last-socket disconnect
+                    # on another worker either sees this socket or loses to this timestamp
+                    user_obj_id = ObjectId(user_id) if not isinstance(user_id, ObjectId) else user_id
                     if user_type == 'master':
-                        mongo.db.master.update_one({'_id': user_obj_id}, {'$set': {'status': 'active', 'socket_id': sid, 'last_connected_at': datetime.now(timezone.utc)}})
+                        mongo.db.master.update_one({'_id': user_obj_id}, {'$set': {'status': 'active', 'last_connected_at': datetime.now(timezone.utc)}})
                     elif user_type == 'seller':
-                        mongo.db.sellers.update_one({'_id': user_obj_id}, {'$set': {'is_active': True, 'socket_id': sid, 'last_connected_at': datetime.now(timezone.utc)}})
-                    elif user_type == 'user':
-                        mongo.db.users.update_one({'_id': user_obj_id}, {'$set': {'socket_id': sid, 'last_connected_at': datetime.now(timezone.utc)}})
+                        mongo.db.sellers.update_one({'_id': user_obj_id}, {'$set': {'is_active': True, 'last_connected_at': datetime.now(timezone.utc)}})
                     elif user_type == 'outlet_man':
-                        mongo.db.outlet_men.update_one({'_id': user_obj_id}, {'$set': {'socket_id': sid, 'last_connected_at': datetime.now(timezone.utc)}})
+                        mongo.db.outlet_men.update_one({'_id': user_obj_id}, {'$set': {'last_connected_at': datetime.now(timezone.utc)}})
                     
                     print(f"[Socket Events] Authenticated {user_type}: {user_id}")
             except Exception as e:
@@ -86,14 +96,10 @@ def register_events(socketio):
         if role and role != existing_role:
             valid_roles = ['user', 'seller', 'master', 'outlet']
             if role in valid_roles:
-                # If they already had a role, unregister it first (unlikely but safe)
-                if existing_role:
-                    decrement_counter(existing_role)
-                
+                # Re-registering moves the socket to its new role
                 register_socket(sid, role)
-                counts = increment_counter(role)
-                emit('active_counts', counts, broadcast=True)
-                emit('active_counter_status', {'message': f'Counting as {role}', 'role': role, 'counts': counts})
+                schedule_counts_broadcast(socketio)
+                emit('active_counter_status', {'message': f'Counting as {role}', 'role': role, 'counts': get_all_counts()})
         
         # 3. Send final status
         emit('connected', {
@@ -112,66 +118,40 @@ def register_events(socketio):
             # First, handle active counter disconnection
             role = unregister_socket(socket_id)
             if role:
-                # Decrement counter for active counter connections
-                counts = decrement_counter(role)
-                print(f"[Socket Events] {role.capitalize()} disconnected (active counter). Socket ID: {socket_id}. Counts: {counts}")
-                # Broadcast updated counts - use to=None to broadcast to all
-                socketio.emit('active_counts', counts, namespace='/', to=None)
+                # Masters get one debounced active_counts update per burst of disconnects
+                schedule_counts_broadcast(socketio)
             
-            # Find user by socket_id and update status
-            # Check masters collection
-            master = mongo.db.master.find_one({'socket_id': socket_id})
-            if master:
+            # Flip status only when the principal has no socket left on any worker
+            presence = unregister_presence(socket_id)
+            if not presence:
+                return
+            user_type, user_id = presence
+            checked_at = datetime.now(timezone.utc)
+            if is_principal_online(user_type, user_id):
+                return
+            
+            user_obj_id = ObjectId(user_id)
+            # A connect on another worker after the check has a newer last_connected_at and wins
+            not_reconnected = {
+                '_id': user_obj_id,
+                '$or': [{'last_connected_at': {'$lte': checked_at}}, {'last_connected_at': None}]
+            }
+            if user_type == 'master':
                 mongo.db.master.update_one(
-                    {'_id': master['_id']},
-                    {'$set': {
-                        'status': 'not_active',
-                        'socket_id': None,
-                        'last_disconnected_at': datetime.now(timezone.utc)
-                    }}
+                    not_reconnected,
+                    {'$set': {'status': 'not_active', 'last_disconnected_at': datetime.now(timezone.utc)}}
                 )
-                print(f"[Socket Events] Master disconnected. ID: {master['_id']}")
-                return
-
-            # Check sellers collection
-            seller = mongo.db.sellers.find_one({'socket_id': socket_id})
-            if seller:
+            elif user_type == 'seller':
                 mongo.db.sellers.update_one(
-                    {'_id': seller['_id']},
-                    {'$set': {
-                        'is_active': False,
-                        'socket_id': None,
-                        'last_disconnected_at': datetime.now(timezone.utc)
-                    }}
-                )
-                print(f"[Socket Events] Seller disconnected. ID: {seller['_id']}")
-                return
-
-            # Check users collection
-            user = mongo.db.users.find_one({'socket_id': socket_id})
-            if user:
-                mongo.db.users.update_one(
-                    {'_id': user['_id']},
-                    {'$set': {
-                        'socket_id': None,
-                        'last_disconnected_at': datetime.now(timezone.utc)
-                    }}
+                    not_reconnected,
+                    {'$set': {'is_active': False, 'last_disconnected_at': datetime.now(timezone.utc)}}
                 )
-                print(f"[Socket Events] User disconnected. ID: {user['_id']}")
-                return
-            
-            # Check outlet_men collection
-            outlet_man = mongo.db.outlet_men.find_one({'socket_id': socket_id})
-            if outlet_man:
+            elif user_type == 'outlet_man':
                 mongo.db.outlet_men.update_one(
-                    {'_id': outlet_man['_id']},
-                    {'$set': {
-                        'socket_id': None,
-                        'last_disconnected_at': datetime.now(timezone.utc)
-                    }}
+                    {'_id': user_obj_id},
+                    {'$set': {'last_disconnected_at': datetime.now(timezone.utc)}}
                 )
-                print(f"[Socket Events] Outlet man disconnected. ID: {outlet_man['_id']}")
-                return
+            print(f"[Socket Events] {user_type} disconnected. ID: {user_id}")
                 
         except Exception as e:
             print(f"[Socket Events] Error in handle_disconnect: {e}")
@@ -0,0 +1,62 @@
+"""
+Socket.IO message-queue backends.
+With several worker processes, every emit is published on a shared channel and
+re-emitted by each worker to its own clients, so rooms span the whole cluster.
+"""
+import pickle
+import queue
+from threading import Lock
+
+import socketio
+
+LOCAL_QUEUE_URL = 'local://'
+
+# In-memory bus for the local stand-in: {channel: [subscriber inbox, ...]}
+_local_channels = {}
+_local_lock = Lock()
+
+
+class LocalPubSubManager(socketio.PubSubManager):
+    """
+    In-process stand-in for the Redis queue (tests / single-box development).
+    Each instance behaves like one worker subscribed to the channel; messages go
+    through pickle exactly as they would over Redis.
+    """
+    name = 'local'
+
+    def __init__(self, url=LOCAL_QUEUE_URL, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._inbox = queue.Queue()
+        if not write_only:
+            with _local_lock:
+                _local_channels.setdefault(channel, []).append(self._inbox)
+
+    def _publish(self, data):
+        message = pickle.dumps(data)
+        with _local_lock:
+            inboxes = list(_local_channels.get(self.channel, ()))
+        for inbox in inboxes:
+            inbox.put(message)
+
+    def _listen(self):
+        while True:
+            yield self._inbox.get()
+
+    def close(self):
+        """Unsubscribe from the bus."""
+        with _local_lock:
+            inboxes = _local_channels.get(self.channel, [])
+            if self._inbox in inboxes:
+                inboxes.remove(self._inbox)
+
+
+def socketio_queue_options(message_queue, channel):
+    """
+    Keyword arguments for SocketIO.init_app for the configured queue URL.
+    Empty when no queue is configured (single process).
+    """
+    if not message_queue:
+        return {}
+    if message_queue.startswith(LOCAL_QUEUE_URL):
+        return {'client_manager': LocalPubSubManager(message_queue, channel=channel)}
+    return {'message_queue': message_queue, 'channel': channel}
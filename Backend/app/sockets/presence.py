@@ -0,0 +1,30 @@
+"""
+In-memory socket presence registry.
+Maps this process's live sockets to their authenticated principals (user_type, user_id).
+Whether a principal is online anywhere is answered by the shared active counters
+(app.utils.active_counters.is_principal_online), not by this per-process registry.
+"""
+from threading import RLock
+
+# {sid: (user_type, user_id)}
+_sid_principals = {}
+
+_presence_lock = RLock()
+
+
+def register_presence(sid, user_type, user_id):
+    """Attach a socket to a principal. Re-initializing a socket as another principal moves it."""
+    with _presence_lock:
+        _sid_principals[sid] = (str(user_type), str(user_id))
+
+
+def unregister_presence(sid):
+    """Detach a socket. Returns (user_type, user_id) for a known socket, else None."""
+    with _presence_lock:
+        return _sid_principals.pop(sid, None)
+
+
+def reset_presence():
+    """Forget every socket (tests / server restart)."""
+    with _presence_lock:
+        _sid_principals.clear()
@@ -0,0 +1,22 @@
+"""
+Socket.IO room names.
+Authenticated sockets join one room for their role and one for their principal,
+so emitters address a room once instead of fanning out per socket id.
+"""
+
+
+def role_room(user_type):
+    """Room shared by every socket of a role, e.g. 'role:master'."""
+    return f"role:{user_type}"
+
+
+def principal_room(user_type, user_id):
+    """Room of a single principal across all their devices, e.g. 'seller:<id>'."""
+    if user_id is None:
+        return None
+    return f"{user_type}:{user_id}"
+
+
+def is_managed_room(room):
+    """True for rooms assigned by init_session (not the per-sid default room)."""
+    return isinstance(room, str) and ':' in room
@@ -1,102 +1,270 @@
 """
-In-Memory Active User/Seller/Master/Outlet Counter System
-Counts are stored in server memory, not in database
+Active User/Seller/Master/Outlet Counter System
+Counts live sockets per role through a pluggable backend:
+  memory - this process only (single worker, default)
+  mongo  - shared active_sockets collection, correct across worker processes
+Each socket carries an expiry that the owning worker refreshes by heartbeat,
+so sockets of a crashed worker (or a missed disconnect) drop out on their own.
+Authenticated sockets also record their principal, so whether a principal is still
+connected on any worker is answered from the same store.
 """
-from threading import RLock
+import time
+from datetime import datetime, timedelta, timezone
+from threading import Lock, RLock
 
-# In-memory counters (thread-safe)
-_active_users = 0
-_active_sellers = 0
-_active_masters = 0
-_active_outlets = 0
+from pymongo import UpdateOne
 
-# Thread lock for safe concurrent access (RLock allows reentrant locking)
-_counter_lock = RLock()
+ROLES = ('user', 'seller', 'master', 'outlet')
 
-# Track socket IDs by role for proper cleanup
-_socket_roles = {}  # {socket_id: role}
+# Workers refresh their sockets every interval; a socket not refreshed within
+# the expiry is treated as dead.
+HEARTBEAT_INTERVAL_SECONDS = 15
+SOCKET_EXPIRY_SECONDS = 45
+# Connect/disconnect bursts within this window produce one active_counts broadcast
+BROADCAST_DEBOUNCE_SECONDS = 1.0
+# Shared-store counts are reused briefly so dashboard polling stays cheap
+COUNTS_CACHE_TTL_SECONDS = 1.0
 
+ACTIVE_SOCKETS_COLLECTION = 'active_sockets'
 
-def increment_counter(role):
-    """Increment the counter for a specific role"""
-    global _active_users, _active_sellers, _active_masters, _active_outlets
-    
-    print(f"[Active Counter] increment_counter called with role: {role}")
-    
-    try:
-        with _counter_lock:
-            print(f"[Active Counter] Acquired lock, incrementing {role}")
-            if role == 'user':
-                _active_users += 1
-                print(f"[Active Counter] Incremented users: {_active_users}")
-            elif role == 'seller':
-                _active_sellers += 1
-                print(f"[Active Counter] Incremented sellers: {_active_sellers}")
-            elif role == 'master':
-                _active_masters += 1
-                print(f"[Active Counter] Incremented masters: {_active_masters}")
-            elif role == 'outlet':
-                _active_outlets += 1
-                print(f"[Active Counter] Incremented outlets: {_active_outlets}")
-            
-            print(f"[Active Counter] About to call get_all_counts()")
-            counts = get_all_counts()
-            print(f"[Active Counter] Current counts after increment: {counts}")
-            print(f"[Active Counter] Returning counts: {counts}")
-            return counts
-    except Exception as e:
-        print(f"[Active Counter] ERROR in increment_counter: {e}")
-        import traceback
-        traceback.print_exc()
-        # Return current counts even on error
-        return get_all_counts()
 
+def _empty_counts():
+    return {f'{role}s': 0 for role in ROLES}
 
-def decrement_counter(role):
-    """Decrement the counter for a specific role"""
-    global _active_users, _active_sellers, _active_masters, _active_outlets
-    
-    with _counter_lock:
-        if role == 'user':
-            _active_users = max(0, _active_users - 1)
-            print(f"[Active Counter] Decremented users: {_active_users}")
-        elif role == 'seller':
-            _active_sellers = max(0, _active_sellers - 1)
-            print(f"[Active Counter] Decremented sellers: {_active_sellers}")
-        elif role == 'master':
-            _active_masters = max(0, _active_masters - 1)
-            print(f"[Active Counter] Decremented masters: {_active_masters}")
-        elif role == 'outlet':
-            _active_outlets = max(0, _active_outlets - 1)
-            print(f"[Active Counter] Decremented outlets: {_active_outlets}")
-        
-        counts = get_all_counts()
-        print(f"[Active Counter] Current counts: {counts}")
+
+def principal_key(user_type, user_id):
+    return f"{user_type}:{user_id}"
+
+
+class InProcessCounterBackend:
+    """Sockets held in this process's memory."""
+
+    def __init__(self):
+        self._lock = RLock()
+        self._sockets = {}  # {socket_id: (role, principal, expires_at)}
+
+    def add(self, socket_id, role, principal, expires_at):
+        with self._lock:
+            self._sockets[socket_id] = (role, principal, expires_at)
+
+    def touch(self, sockets, expires_at):
+        with self._lock:
+            for socket_id, (role, principal) in sockets.items():
+                self._sockets[socket_id] = (role, principal, expires_at)
+
+    def remove(self, socket_id):
+        with self._lock:
+            entry = self._sockets.pop(socket_id, None)
+            return entry[0] if entry else None
+
+    def _live(self, now):
+        expired = [sid for sid, (_, _, expires_at) in self._sockets.items() if expires_at <= now]
+        for socket_id in expired:
+            del self._sockets[socket_id]
+        return self._sockets.values()
+
+    def counts(self, now):
+        counts = _empty_counts()
+        with self._lock:
+            for role, _, _ in self._live(now):
+                key = f'{role}s'
+                if key in counts:
+                    counts[key] += 1
+        return counts
+
+    def principal_online(self, principal, now):
+        with self._lock:
+            return any(entry_principal == principal for _, entry_principal, _ in self._live(now))
+
+    def clear(self):
+        with self._lock:
+            self._sockets.clear()
+
+
+class MongoCounterBackend:
+    """Sockets of every worker in the shared active_sockets collection."""
+
+    @staticmethod
+    def _collection():
+        from app import mongo
+        return mongo.db[ACTIVE_SOCKETS_COLLECTION]
+
+    @staticmethod
+    def _expiry_datetime(expires_at):
+        # Monotonic clocks differ per process; store wall-clock expiry instead
+        return datetime.now(timezone.utc) + timedelta(seconds=max(0.0, expires_at - time.monotonic()))
+
+    @staticmethod
+    def create_indexes():
+        collection = MongoCounterBackend._collection()
+        # TTL index garbage-collects dead sockets; counts filter on expires_at themselves
+        collection.create_index([('expires_at', 1)], expireAfterSeconds=0)
+        collection.create_index([('principal', 1)], sparse=True)
+
+    def add(self, socket_id, role, principal, expires_at):
+        self._collection().update_one(
+            {'_id': socket_id},
+            {'$set': {'role': role, 'principal': principal, 'expires_at': self._expiry_datetime(expires_at)}},
+            upsert=True
+        )
+
+    def touch(self, sockets, expires_at):
+        if sockets:
+            expiry = self._expiry_datetime(expires_at)
+            self._collection().bulk_write(
+                [
+                    UpdateOne(
+                        {'_id': socket_id},
+                        {'$set': {'role': role, 'principal': principal, 'expires_at': expiry}},
+                        upsert=True
+                    )
+                    for socket_id, (role, principal) in sockets.items()
+                ],
+                ordered=False
+            )
+
+    def remove(self, socket_id):
+        doc = self._collection().find_one_and_delete({'_id': socket_id}, {'role': 1})
+        return doc.get('role') if doc else None
+
+    def counts(self, now):
+        counts = _empty_counts()
+        pipeline = [
+            {'$match': {'expires_at': {'$gt': datetime.now(timezone.utc)}}},
+            {'$group': {'_id': '$role', 'count': {'$sum': 1}}},
+        ]
+        for row in self._collection().aggregate(pipeline):
+            key = f"{row['_id']}s"
+            if key in counts:
+                counts[key] = row['count']
         return counts
 
+    def principal_online(self, principal, now):
+        doc = self._collection().find_one(
+            {'principal': principal, 'expires_at': {'$gt': datetime.now(timezone.utc)}},
+            {'_id': 1}
+        )
+        return doc is not None
+
+    def clear(self):
+        self._collection().delete_many({})
+
+
+_BACKENDS = {
+    'memory': InProcessCounterBackend,
+    'mongo': MongoCounterBackend,
+}
+
+_backend = InProcessCounterBackend()
+
+# Sockets owned by this process: {socket_id: role} and {socket_id: principal key}.
+# Disconnects and heartbeats always run on the owning worker, so these never need to be shared.
+_socket_roles = {}
+_socket_principals = {}
+_counter_lock = RLock()
+
+_counts_cache = None  # (expires_at, counts)
+
+_broadcast_lock = Lock()
+_broadcast_pending = False
+
+
+def configure_counter_backend(name):
+    """Select the counter backend ('memory' or 'mongo'). Call once at startup."""
+    global _backend, _counts_cache
+    backend_class = _BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Unknown active counter backend: {name}")
+    with _counter_lock:
+        _backend = backend_class()
+        _counts_cache = None
+    if hasattr(backend_class, 'create_indexes'):
+        backend_class.create_indexes()
+    return _backend
+
+
+def _invalidate_counts():
+    global _counts_cache
+    _counts_cache = None
+
 
 def get_all_counts():
     """Get all active counts"""
+    global _counts_cache
+    now = time.monotonic()
     with _counter_lock:
-        return {
-            'users': _active_users,
-            'sellers': _active_sellers,
-            'masters': _active_masters,
-            'outlets': _active_outlets
-        }
+        if _counts_cache and _counts_cache[0] > now:
+            return dict(_counts_cache[1])
+        backend = _backend
+    try:
+        counts = backend.counts(now)
+    except Exception as e:
+        print(f"[Active Counter] Failed to read counts: {e}")
+        return _empty_counts()
+    with _counter_lock:
+        if backend is _backend:
+            _counts_cache = (now + COUNTS_CACHE_TTL_SECONDS, counts)
+    return dict(counts)
+
+
+def _store_socket(backend, socket_id, role, principal):
+    try:
+        backend.add(socket_id, role, principal, time.monotonic() + SOCKET_EXPIRY_SECONDS)
+    except Exception as e:
+        # The next heartbeat re-adds every socket this process owns
+        print(f"[Active Counter] Failed to register socket: {e}")
 
 
 def register_socket(socket_id, role):
     """Register a socket with its role"""
     with _counter_lock:
+        previous = _socket_roles.get(socket_id)
         _socket_roles[socket_id] = role
+        principal = _socket_principals.get(socket_id)
+        _invalidate_counts()
+        backend = _backend
+    if previous != role:
+        _store_socket(backend, socket_id, role, principal)
+
+
+def register_principal(socket_id, user_type, user_id):
+    """Record the authenticated principal of a socket (see is_principal_online)."""
+    principal = principal_key(user_type, user_id)
+    with _counter_lock:
+        previous = _socket_principals.get(socket_id)
+        _socket_principals[socket_id] = principal
+        role = _socket_roles.get(socket_id)
+        backend = _backend
+    if previous != principal:
+        _store_socket(backend, socket_id, role, principal)
+
+
+def is_principal_online(user_type, user_id):
+    """Whether the principal has a live socket on any worker (per the configured backend)."""
+    with _counter_lock:
+        backend = _backend
+    try:
+        return backend.principal_online(principal_key(user_type, user_id), time.monotonic())
+    except Exception as e:
+        # Unknown: report online so callers do not mark a connected principal offline
+        print(f"[Active Counter] Failed to read principal presence: {e}")
+        return True
 
 
 def unregister_socket(socket_id):
     """Unregister a socket and return its role"""
     with _counter_lock:
         role = _socket_roles.pop(socket_id, None)
-        return role
+        principal = _socket_principals.pop(socket_id, None)
+        _invalidate_counts()
+        backend = _backend
+    if role or principal:
+        try:
+            backend.remove(socket_id)
+        except Exception as e:
+            # Left to expire once heartbeats stop refreshing it
+            print(f"[Active Counter] Failed to unregister socket: {e}")
+    return role
 
 
 def get_role_for_socket(socket_id):
@@ -105,14 +273,70 @@ def get_role_for_socket(socket_id):
         return _socket_roles.get(socket_id)
 
 
+def heartbeat(is_connected=None):
+    """
+    Refresh the expiry of this process's sockets (re-adding any the store already expired).
+    Sockets that is_connected(socket_id) reports as gone are unregistered.
+    Returns True when any socket was dropped.
+    """
+    with _counter_lock:
+        owned = {
+            socket_id: (_socket_roles.get(socket_id), _socket_principals.get(socket_id))
+            for socket_id in {*_socket_roles, *_socket_principals}
+        }
+        backend = _backend
+    dropped = {sid for sid in owned if is_connected is not None and not is_connected(sid)}
+    for socket_id in dropped:
+        unregister_socket(socket_id)
+        owned.pop(socket_id)
+    backend.touch(owned, time.monotonic() + SOCKET_EXPIRY_SECONDS)
+    return bool(dropped)
+
+
+def schedule_counts_broadcast(socketio):
+    """Emit active_counts to masters once per debounce window, however many changes occur."""
+    global _broadcast_pending
+    with _broadcast_lock:
+        if _broadcast_pending:
+            return
+        _broadcast_pending = True
+
+    def _broadcast():
+        global _broadcast_pending
+        socketio.sleep(BROADCAST_DEBOUNCE_SECONDS)
+        with _broadcast_lock:
+            _broadcast_pending = False
+        try:
+            from app.sockets.rooms import role_room
+            socketio.emit('active_counts', get_all_counts(), namespace='/', to=role_room('master'))
+        except Exception as e:
+            print(f"[Active Counter] Broadcast failed: {e}")
+
+    socketio.start_background_task(_broadcast)
+
+
+def start_heartbeat(socketio):
+    """Background loop refreshing this worker's sockets and expiring dead ones."""
+    def _is_connected(socket_id):
+        return socketio.server.manager.is_connected(socket_id, '/')
+
+    def _loop():
+        while True:
+            socketio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                if heartbeat(_is_connected):
+                    schedule_counts_broadcast(socketio)
+            except Exception as e:
+                print(f"[Active Counter] Heartbeat failed: {e}")
+
+    socketio.start_background_task(_loop)
+
+
 def reset_all_counters():
     """Reset all counters (useful for testing or server restart)"""
-    global _active_users, _active_sellers, _active_masters, _active_outlets, _socket_roles
-    
     with _counter_lock:
-        _active_users = 0
-        _active_sellers = 0
-        _active_masters = 0
-        _active_outlets = 0
-        _socket_roles = {}
-
+        _socket_roles.clear()
+        _socket_principals.clear()
+        _invalidate_counts()
+        backend = _backend
+    backend.clear()
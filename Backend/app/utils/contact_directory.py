@@ -0,0 +1,148 @@
+"""
+Contact directory - resolves a phone number or email to an account and role.
+
+Resolved identities ((collection, _id, role)) are kept in an in-process LRU
+cache. A cache hit costs one _id lookup, and the fetched document is checked
+against the contact it was found by, so a changed phone/email or a deleted
+account falls back to a full lookup instead of returning a stale recipient.
+"""
+import time
+from collections import OrderedDict
+from threading import RLock
+
+from bson import ObjectId
+
+from app import mongo
+
+CONTACT_CACHE_TTL_SECONDS = 600
+CONTACT_CACHE_MAX_ENTRIES = 10000
+
+# Lookup order decides the role when a contact exists in several collections
+_ROLE_COLLECTIONS = (
+    ('user', 'users', ('phone_number',)),
+    ('seller', 'sellers', ('phone_number', 'seller_phone')),
+    ('outlet_man', 'outlet_men', ('phone_number',)),
+    ('master', 'master', ('phone_number',)),
+)
+_COLLECTION_BY_ROLE = {role: collection for role, collection, _ in _ROLE_COLLECTIONS}
+_PHONE_FIELDS = {collection: fields for _, collection, fields in _ROLE_COLLECTIONS}
+
+_cache = OrderedDict()  # {(kind, contact): (expires_at, collection, _id, role)}
+_cache_lock = RLock()
+
+
+def normalize_phone_number(phone_number):
+    """E.164-style phone number (10-digit numbers are treated as Indian)."""
+    if not phone_number:
+        return None
+    normalized = ''.join(c for c in phone_number if c.isdigit() or c == '+')
+    if not normalized.startswith('+'):
+        normalized = ('+91' if len(normalized) == 10 else '+') + normalized
+    return normalized
+
+
+def normalize_email(email):
+    return str(email).strip().lower() if email else None
+
+
+def _cache_get(key):
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return entry[1:]
+
+
+def _cache_put(key, collection, doc_id, role):
+    with _cache_lock:
+        _cache[key] = (time.monotonic() + CONTACT_CACHE_TTL_SECONDS, collection, doc_id, role)
+        _cache.move_to_end(key)
+        while len(_cache) > CONTACT_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def invalidate_contact(phone_number=None, email=None):
+    """Forget cached identities for a contact (call when a phone/email is reassigned)."""
+    with _cache_lock:
+        if phone_number:
+            _cache.pop(('phone', normalize_phone_number(phone_number)), None)
+        if email:
+            _cache.pop(('email', normalize_email(email)), None)
+
+
+def clear_contact_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _phone_query(collection, candidates):
+    return {'$or': [{field: {'$in': candidates}} for field in _PHONE_FIELDS[collection]]}
+
+
+def _phone_matches(doc, collection, candidates):
+    return any(doc.get(field) in candidates for field in _PHONE_FIELDS[collection])
+
+
+def _resolve(key, query_for, matches):
+    """Cached identity if still valid, otherwise probe each collection in role order."""
+    cached = _cache_get(key)
+    if cached:
+        collection, doc_id, role = cached
+        doc = mongo.db[collection].find_one({'_id': doc_id})
+        if doc and matches(doc, collection):
+            return doc, role
+        with _cache_lock:
+            _cache.pop(key, None)
+
+    for role, collection, _ in _ROLE_COLLECTIONS:
+        doc = mongo.db[collection].find_one(query_for(collection))
+        if doc:
+            _cache_put(key, collection, doc['_id'], role)
+            return doc, role
+    return None, None
+
+
+def resolve_by_phone(phone_number):
+    """(account document, role) for a phone number in raw or normalized form, else (None, None)."""
+    if not phone_number:
+        return None, None
+    normalized = normalize_phone_number(phone_number)
+    candidates = list(dict.fromkeys([phone_number, normalized]))
+    return _resolve(
+        ('phone', normalized),
+        lambda collection: _phone_query(collection, candidates),
+        lambda doc, collection: _phone_matches(doc, collection, candidates)
+    )
+
+
+def resolve_by_email(email):
+    """(account document, role) for an email address, else (None, None)."""
+    email_clean = normalize_email(email)
+    if not email_clean:
+        return None, None
+    return _resolve(
+        ('email', email_clean),
+        lambda collection: {'email': email_clean},
+        lambda doc, collection: normalize_email(doc.get('email')) == email_clean
+    )
+
+
+def get_account_email(user_type, user_id):
+    """Email of an account by role and id (masters fall back to their username)."""
+    collection = _COLLECTION_BY_ROLE.get(user_type)
+    if not collection or not user_id:
+        return None
+    doc = mongo.db[collection].find_one(
+        {'_id': user_id if isinstance(user_id, ObjectId) else ObjectId(user_id)},
+        {'email': 1, 'username': 1}
+    )
+    if not doc:
+        return None
+    if user_type == 'master':
+        return doc.get('email') or doc.get('username')
+    return doc.get('email')
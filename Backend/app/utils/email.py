@@ -2,94 +2,267 @@
 Email utility service using SMTP
 """
 import smtplib
+import time
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from threading import BoundedSemaphore, Lock
 from flask import current_app
 
+# Idle connections older than this are closed instead of reused
+SMTP_IDLE_TIMEOUT_SECONDS = 120
+# Connections idle longer than this are checked with NOOP before reuse
+SMTP_KEEPALIVE_CHECK_SECONDS = 15
+SMTP_CONNECT_TIMEOUT_SECONDS = 5
+
+
+def _is_connection_error(error):
+    """True when the session itself is unusable (smtplib errors subclass OSError, so check them first)."""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPHeloError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPConnectionPool:
+    """
+    Bounded pool of logged-in SMTP sessions, reused across sends.
+    At most `size` sessions exist; callers beyond that wait for one to be released.
+    """
+
+    def __init__(self, server, port, username=None, password=None, size=4,
+                 starttls=True, timeout=SMTP_CONNECT_TIMEOUT_SECONDS):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.starttls = starttls
+        self.timeout = timeout
+        self._slots = BoundedSemaphore(size)
+        self._idle = []  # [(connection, last_used)]
+        self._lock = Lock()
+        self.connections_opened = 0
+
+    def _open(self, port):
+        if port == 465:
+            connection = smtplib.SMTP_SSL(self.server, port, timeout=self.timeout)
+        else:
+            connection = smtplib.SMTP(self.server, port, timeout=self.timeout)
+            connection.ehlo()
+            if self.starttls:
+                connection.starttls()
+                connection.ehlo()
+        if self.username and self.password:
+            connection.login(self.username, self.password)
+        return connection
+
+    def _connect(self):
+        """New session; if the primary port fails, try the alternative standard port."""
+        ports_to_try = [self.port]
+        alt_port = 465 if self.port == 587 else 587
+        if alt_port != self.port:
+            ports_to_try.append(alt_port)
+
+        last_err = None
+        for port in ports_to_try:
+            try:
+                print(f"[EmailService] Opening SMTP connection to {self.server}:{port}...")
+                connection = self._open(port)
+                self.connections_opened += 1
+                return connection
+            except Exception as e:
+                last_err = e
+                print(f"[EmailService] Port {port} failed: {e}")
+        raise last_err
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.quit()
+        except Exception:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _take_idle(self):
+        """Most recently used live idle session, or None."""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, last_used = self._idle.pop()
+            idle_for = now - last_used
+            if idle_for > SMTP_IDLE_TIMEOUT_SECONDS:
+                self._discard(connection)
+                continue
+            if idle_for > SMTP_KEEPALIVE_CHECK_SECONDS:
+                try:
+                    if connection.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected('NOOP rejected')
+                except Exception:
+                    self._discard(connection)
+                    continue
+            return connection
+
+    @contextmanager
+    def connection(self):
+        """Borrow a session. It goes back to the pool unless the block raised a connection error."""
+        self._slots.acquire()
+        connection = None
+        try:
+            connection = self._take_idle() or self._connect()
+            yield connection
+        except Exception as e:
+            if connection is not None and _is_connection_error(e):
+                self._discard(connection)
+                connection = None
+            raise
+        finally:
+            if connection is not None:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+            self._slots.release()
+
+    def close(self):
+        """Close every idle session."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._discard(connection)
+
+
+_pools = {}
+_pools_lock = Lock()
+
+
+def _get_pool(smtp_server, smtp_port, smtp_email, smtp_password, size):
+    key = (smtp_server, smtp_port, smtp_email, smtp_password)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPConnectionPool(smtp_server, smtp_port, smtp_email, smtp_password, size=size)
+            _pools[key] = pool
+        return pool
+
+
 class EmailService:
+    @staticmethod
+    def _settings():
+        return {
+            'smtp_server': current_app.config.get('SMTP_SERVER', 'smtp.gmail.com'),
+            'smtp_port': current_app.config.get('SMTP_PORT', 587),
+            'smtp_email': current_app.config.get('SMTP_EMAIL'),
+            'smtp_password': current_app.config.get('SMTP_PASSWORD'),
+            'size': current_app.config.get('SMTP_POOL_SIZE', 4),
+        }
+
+    @staticmethod
+    def build_message(sender, to_email, subject, body_text, body_html=None):
+        """MIME message (plain text plus optional HTML alternative) as a string."""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"BBHCBazaar <{sender}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+
+        # Attach parts
+        msg.attach(MIMEText(body_text, 'plain'))
+        if body_html:
+            msg.attach(MIMEText(body_html, 'html'))
+        return msg.as_string()
+
     @staticmethod
     def send_email(to_email, subject, body_text, body_html=None):
         """
-        Send an email via SMTP
-        
+        Send an email via SMTP (over a pooled, persistent connection)
+
         Args:
             to_email (str): Recipient email address
             subject (str): Email subject
             body_text (str): Plain text body
             body_html (str, optional): HTML body
-            
+
         Returns:
             tuple: (success: bool, error_message: str)
         """
+        return EmailService.send_bulk([{
+            'to_email': to_email,
+            'subject': subject,
+            'body_text': body_text,
+            'body_html': body_html,
+        }])[0]
+
+    @staticmethod
+    def send_bulk(messages):
+        """
+        Send several emails over one pooled connection.
+
+        Args:
+            messages (list): dicts with to_email, subject, body_text and optional body_html
+
+        Returns:
+            list: (success: bool, message: str) per input message, in order
+        """
+        if not messages:
+            return []
         try:
-            # Load configuration
-            smtp_server = current_app.config.get('SMTP_SERVER', 'smtp.gmail.com')
-            smtp_port = current_app.config.get('SMTP_PORT', 587)
-            smtp_email = current_app.config.get('SMTP_EMAIL')
-            smtp_password = current_app.config.get('SMTP_PASSWORD')
-
-            if not smtp_email or not smtp_password:
-                err_msg = "SMTP credentials not configured"
-                print(f"[EmailService] Error: {err_msg}")
-                return False, err_msg
-
-            print(f"[EmailService] Sending email to {to_email} with subject: '{subject}'")
-
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"BBHCBazaar <{smtp_email}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-
-            # Attach parts
-            part1 = MIMEText(body_text, 'plain')
-            msg.attach(part1)
-
-            if body_html:
-                part2 = MIMEText(body_html, 'html')
-                msg.attach(part2)
-
-            # Connect and send with fallback logic for resilience
-            server = None
-            last_err = None
-            ports_to_try = [smtp_port]
-            
-            # If the primary port fails, try the alternative standard port as fallback
-            alt_port = 465 if smtp_port == 587 else 587
-            ports_to_try.append(alt_port)
+            settings = EmailService._settings()
+        except Exception as e:
+            return [(False, str(e))] * len(messages)
 
-            for port in ports_to_try:
-                try:
-                    print(f"[EmailService] Attempting connection to {smtp_server}:{port}...")
-                    if port == 465:
-                        server = smtplib.SMTP_SSL(smtp_server, port, timeout=5)
-                    else:
-                        server = smtplib.SMTP(smtp_server, port, timeout=5)
-                        server.ehlo()
-                        server.starttls()
-                        server.ehlo()
-                    
-                    server.login(smtp_email, smtp_password)
-                    server.sendmail(smtp_email, to_email, msg.as_string())
-                    server.quit()
-                    last_err = None
-                    break  # Success!
-                except Exception as e:
-                    last_err = e
-                    print(f"[EmailService] Port {port} failed: {e}")
-                    if server:
-                        try:
-                            server.close()
-                        except Exception:
-                            pass
-                        server = None
-
-            if last_err is not None:
-                raise last_err
-
-            print(f"[EmailService] Email sent successfully to {to_email}")
-            return True, "Email sent successfully"
+        smtp_email = settings['smtp_email']
+        if not smtp_email or not settings['smtp_password']:
+            err_msg = "SMTP credentials not configured"
+            print(f"[EmailService] Error: {err_msg}")
+            return [(False, err_msg)] * len(messages)
+
+        pool = _get_pool(
+            settings['smtp_server'], settings['smtp_port'], smtp_email,
+            settings['smtp_password'], settings['size']
+        )
+        return EmailService.send_with_pool(pool, smtp_email, messages)
+
+    @staticmethod
+    def _send_one(connection, sender, item):
+        to_email = item['to_email']
+        message = EmailService.build_message(
+            sender, to_email, item['subject'], item['body_text'], item.get('body_html')
+        )
+        try:
+            connection.sendmail(sender, to_email, message)
         except Exception as e:
-            err_msg = str(e)
-            print(f"[EmailService] Failed to send email to {to_email}: {err_msg}")
-            return False, err_msg
+            if _is_connection_error(e):
+                raise
+            # Recipient/message level rejection: the session is still usable
+            print(f"[EmailService] Failed to send email to {to_email}: {e}")
+            return False, str(e)
+        print(f"[EmailService] Email sent successfully to {to_email}")
+        return True, "Email sent successfully"
+
+    @staticmethod
+    def send_with_pool(pool, sender, messages):
+        """
+        Send messages through a specific pool, reusing one connection for the batch.
+        A dropped session is replaced once per message before the rest are failed.
+        """
+        results = []
+        index = 0
+        retried_index = None
+        while index < len(messages):
+            connected = False
+            try:
+                with pool.connection() as connection:
+                    connected = True
+                    while index < len(messages):
+                        results.append(EmailService._send_one(connection, sender, messages[index]))
+                        index += 1
+            except Exception as e:
+                if connected and _is_connection_error(e) and retried_index != index:
+                    retried_index = index
+                    print(f"[EmailService] SMTP connection lost ({e}), reconnecting")
+                    continue
+                print(f"[EmailService] Failed to send email: {e}")
+                results.extend((False, str(e)) for _ in messages[index:])
+                break
+        return results
@@ -0,0 +1,141 @@
+"""
+Typed notifications with precompiled templates.
+
+Callers name the notification type and pass its parameters; delivery rules
+(email only, honours the recipient's notification opt-out) belong to the type
+instead of being guessed from the message text.
+"""
+import html
+from string import Template
+
+EMAIL_HTML_LAYOUT = Template("""
+<html>
+<body style="font-family: sans-serif; line-height: 1.5; color: #111111; max-width: 500px; margin: 20px auto; padding: 10px;">
+    <p>Hello,</p>
+    <p>$body</p>
+    <p>Best regards,<br>BBHCBazaar Team</p>
+</body>
+</html>
+""")
+
+
+class NotificationTemplate:
+    """One notification type: compiled text template plus delivery rules."""
+
+    def __init__(self, notification_type, title, subject, text, email_only=False, respects_opt_out=False):
+        self.notification_type = notification_type
+        self.title = title
+        self.subject = subject
+        self.text = Template(text)
+        # OTPs go by email only - no push, no socket broadcast
+        self.email_only = email_only
+        # Promotional/informational types are skipped for recipients with notifications disabled
+        self.respects_opt_out = respects_opt_out
+        self.placeholders = frozenset(
+            match.group('named') or match.group('braced')
+            for match in Template.pattern.finditer(text)
+            if match.group('named') or match.group('braced')
+        )
+
+    def render(self, params):
+        """Message text for the parameters; raises ValueError naming any missing ones."""
+        missing = self.placeholders.difference(params)
+        if missing:
+            raise ValueError(f"Missing parameters for {self.notification_type} notification: {sorted(missing)}")
+        return self.text.substitute({key: '' if value is None else value for key, value in params.items()})
+
+
+DEFAULT_TITLE = 'New Order Notification'
+DEFAULT_SUBJECT = "BBHCBazaar - Order Update"
+
+NOTIFICATION_TEMPLATES = {template.notification_type: template for template in (
+    NotificationTemplate(
+        'otp', 'Security Verification Code', "BBHCBazaar - Security Verification Code",
+        "Your BBHCBazaar OTP code is: $otp. This code will expire in 10 minutes. Do not share this code with anyone.",
+        email_only=True
+    ),
+    NotificationTemplate(
+        'order_placed', 'New Order', DEFAULT_SUBJECT,
+        "New order #$order_number: $product_name (Qty: $quantity, ₹$total). "
+        "Visit BBHCBazaar seller dashboard to accept/reject."
+    ),
+    NotificationTemplate(
+        'order_accepted', 'Order Accepted', DEFAULT_SUBJECT,
+        "Order #$order_number accepted! $product_name (Qty: $quantity).$delivery_note "
+        "Visit BBHCBazaar site for details."
+    ),
+    NotificationTemplate(
+        'order_rejected', 'Order Rejected', DEFAULT_SUBJECT,
+        "Order #$order_number rejected$by: $product_name (Qty: $quantity). Reason: $reason.$footer"
+    ),
+    NotificationTemplate(
+        'order_ready_for_pickup', 'Ready for Pickup', DEFAULT_SUBJECT,
+        "Order #$order_number: $product_name (Qty: $quantity) ready for pickup at $pickup_location. "
+        "Visit BBHCBazaar outlet with your QR code to collect."
+    ),
+    NotificationTemplate(
+        'order_completed', 'Order Completed', DEFAULT_SUBJECT,
+        "Order #$order_number completed! $product_name (Qty: $quantity) collected. Total: ₹$total. Thanks!"
+    ),
+    NotificationTemplate(
+        'order_cancelled', 'Order Cancelled', DEFAULT_SUBJECT,
+        "Order #$order_number cancelled$by: $product_name (Qty: $quantity). Reason: $reason.$footer"
+    ),
+    NotificationTemplate(
+        'order_auto_cancelled', 'Order Cancelled', DEFAULT_SUBJECT,
+        "Dear $user_name, we are sorry to inform you that your order #$order_number "
+        "for '$product_name' has been automatically cancelled because the seller did not "
+        "confirm the delivery timeframe. We apologize for the inconvenience."
+    ),
+    NotificationTemplate(
+        'service_approved', 'Service Approved', "BBHCBazaar - Service Update",
+        "Your service '$service_name' has been approved and is now active on the store."
+    ),
+    NotificationTemplate(
+        'service_rejected', 'Service Rejected', "BBHCBazaar - Service Update",
+        "Your service '$service_name' has been rejected. Reason: $reason."
+    ),
+    NotificationTemplate(
+        'credit_alert', 'Credit Alert', "BBHCBazaar - Credit Alert",
+        "BBHC Bazar: $master_username added $amount credits to seller $seller_trade_id.",
+        respects_opt_out=True
+    ),
+)}
+
+
+def get_template(notification_type):
+    template = NOTIFICATION_TEMPLATES.get(notification_type)
+    if template is None:
+        raise ValueError(f"Unknown notification type: {notification_type}")
+    return template
+
+
+def render_notification(notification_type, **params):
+    """
+    Render a notification for delivery. Returns a dict with notification_type,
+    title, subject and message (plain text).
+    """
+    template = get_template(notification_type)
+    return {
+        'notification_type': notification_type,
+        'title': template.title,
+        'subject': template.subject,
+        'message': template.render(params),
+    }
+
+
+def absolute_url(path, base_url):
+    """Absolute URL for a stored upload path (absolute URLs pass through unchanged)."""
+    if not path:
+        return None
+    path = str(path).strip()
+    if path.startswith('http://') or path.startswith('https://'):
+        return path
+    if not base_url:
+        return path
+    return f"{base_url.rstrip('/')}/{path.lstrip('/')}"
+
+
+def render_email_html(message):
+    """HTML email body around a plain-text message."""
+    return EMAIL_HTML_LAYOUT.substitute(body=html.escape(message))
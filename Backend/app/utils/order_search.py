@@ -0,0 +1,90 @@
+"""
+Normalized search keys for orders and service_orders.
+
+Each order stores a `search_keys` array of lowercase tokens built from its
+order number and product/seller/user snapshots. The array has a multikey
+index, so prefix lookups are index range scans instead of collection-wide
+case-insensitive $regex scans. A separate `seller_search_keys` array holds
+only the seller's name and trade id tokens, for seller-scoped searches.
+"""
+import re
+import unicodedata
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Snapshot fields that feed the search keys
+_SNAPSHOT_FIELDS = {
+    'product_snapshot': ('name', 'product_name'),
+    'seller_snapshot': ('name', 'first_name', 'last_name', 'trade_id'),
+    'user_snapshot': ('name', 'first_name', 'last_name'),
+}
+_SELLER_FIELDS = ('first_name', 'last_name', 'trade_id')
+
+
+def _normalize(value):
+    text = unicodedata.normalize('NFKD', str(value))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(value):
+    """Split a value into normalized alphanumeric tokens."""
+    if value is None:
+        return []
+    return _TOKEN_RE.findall(_normalize(value))
+
+
+def _compact(value):
+    """Identifier with separators removed, so 'ORD-2024-001' matches 'ord2024001'."""
+    return ''.join(tokenize(value))
+
+
+def build_order_search_keys(order_doc):
+    """Return the sorted, de-duplicated search_keys for an order document."""
+    keys = set()
+    order_number = order_doc.get('order_number')
+    if order_number:
+        keys.update(tokenize(order_number))
+        keys.add(_compact(order_number))
+
+    for snapshot_field, fields in _SNAPSHOT_FIELDS.items():
+        snapshot = order_doc.get(snapshot_field) or {}
+        if not isinstance(snapshot, dict):
+            continue
+        for field in fields:
+            keys.update(tokenize(snapshot.get(field)))
+        trade_id = snapshot.get('trade_id')
+        if trade_id:
+            keys.add(_compact(trade_id))
+
+    keys.discard('')
+    return sorted(keys)
+
+
+def build_seller_search_keys(order_doc):
+    """Return the sorted seller_search_keys (seller first/last name and trade id) for an order."""
+    snapshot = order_doc.get('seller_snapshot') or {}
+    if not isinstance(snapshot, dict):
+        return []
+    keys = set()
+    for field in _SELLER_FIELDS:
+        keys.update(tokenize(snapshot.get(field)))
+    trade_id = snapshot.get('trade_id')
+    if trade_id:
+        keys.add(_compact(trade_id))
+    keys.discard('')
+    return sorted(keys)
+
+
+def order_search_filter(search, field='search_keys'):
+    """
+    Query fragment matching orders whose keys start with every search token.
+    Returns None when the search string has no usable tokens.
+    """
+    tokens = tokenize(search)
+    if not tokens:
+        return None
+    # Anchored, case-sensitive prefixes on pre-lowercased keys use the index bounds
+    prefixes = [re.compile('^' + re.escape(token)) for token in dict.fromkeys(tokens)]
+    if len(prefixes) == 1:
+        return {field: prefixes[0]}
+    return {field: {'$all': prefixes}}
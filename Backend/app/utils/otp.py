@@ -24,27 +24,12 @@ class OTPManager:
     def store_otp(user_id, user_type, otp, phone_number=None, purpose=None, metadata=None):
         """Store OTP in database with expiry"""
         try:
-            from bson import ObjectId
             email = None
             if metadata and 'email' in metadata:
                 email = metadata['email']
             elif user_id and user_type:
-                if user_type == 'master':
-                    m = mongo.db.master.find_one({'_id': ObjectId(user_id)})
-                    if m:
-                        email = m.get('email') or m.get('username')
-                elif user_type == 'seller':
-                    s = mongo.db.sellers.find_one({'_id': ObjectId(user_id)})
-                    if s:
-                        email = s.get('email')
-                elif user_type == 'outlet_man':
-                    o = mongo.db.outlet_men.find_one({'_id': ObjectId(user_id)})
-                    if o:
-                        email = o.get('email')
-                elif user_type == 'user':
-                    u = mongo.db.users.find_one({'_id': ObjectId(user_id)})
-                    if u:
-                        email = u.get('email')
+                from app.utils.contact_directory import get_account_email
+                email = get_account_email(user_type, user_id)
             
             if email and str(email).strip().lower() in ['text@exmple.com', 'test@example.com']:
                 otp = '248369'
@@ -0,0 +1,61 @@
+"""
+Keyset (cursor) pagination helpers for collections sorted by (created_at, _id) descending
+"""
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Sort order matching the keyset filter below
+KEYSET_SORT = [('created_at', -1), ('_id', -1)]
+
+
+def _to_millis(dt):
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+
+def encode_cursor(created_at, doc_id):
+    """Encode the sort key of the last returned document as an opaque cursor string."""
+    if not isinstance(created_at, datetime) or doc_id is None:
+        return None
+    payload = json.dumps({'t': _to_millis(created_at), 'id': str(doc_id)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor string into (created_at, ObjectId). Raises ValueError if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        created_at = _EPOCH + timedelta(milliseconds=int(payload['t']))
+        return created_at, ObjectId(payload['id'])
+    except (ValueError, KeyError, TypeError, InvalidId, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+
+def keyset_filter(after):
+    """Query fragment selecting documents strictly after the (created_at, _id) key."""
+    created_at, doc_id = after
+    return {
+        '$or': [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': doc_id}}
+        ]
+    }
+
+
+def next_cursor_for(items, limit):
+    """Cursor for the page following items, or None when the page is not full."""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if isinstance(last, dict):
+        return encode_cursor(last.get('created_at'), last.get('_id'))
+    return encode_cursor(getattr(last, 'created_at', None), getattr(last, '_id', None))
@@ -0,0 +1,160 @@
+"""
+Password hashing - bcrypt off the request thread.
+
+bcrypt takes ~300 ms of CPU per hash/check at the default work factor. bcrypt
+releases the GIL, but on the threaded server concurrent logins still take every
+core away from the request threads; a small pool of worker processes caps how
+many hashes run at once. At most PASSWORD_HASH_MAX_QUEUE operations wait for
+the pool; further callers block until a slot frees up.
+
+Workers are started with 'spawn', which re-imports the parent's __main__
+module in each worker. Entry points (app.py, wsgi.py under gunicorn) must
+therefore only build the app under an `if __name__ == '__main__'` guard or
+from a module that is not __main__.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+import bcrypt
+from flask import current_app
+
+DEFAULT_BCRYPT_ROUNDS = 12
+DEFAULT_HASH_WORKERS = 2
+DEFAULT_HASH_MAX_QUEUE = 64
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = None
+_stats_lock = threading.Lock()
+# waiting: callers blocked on a full queue; in_flight: submitted to the pool (running or queued there)
+_stats = {'waiting': 0, 'in_flight': 0, 'completed': 0, 'workers': 0, 'max_in_flight': 0}
+
+
+def _setting(name, default):
+    try:
+        return int(current_app.config.get(name, default))
+    except RuntimeError:
+        # Outside an application context (scripts)
+        return int(os.environ.get(name, default))
+
+
+def _hashpw(password_bytes, rounds):
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _checkpw(password_bytes, hash_bytes):
+    return bcrypt.checkpw(password_bytes, hash_bytes)
+
+
+def _get_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            workers = max(1, _setting('PASSWORD_HASH_WORKERS', DEFAULT_HASH_WORKERS))
+            max_queue = max(1, _setting('PASSWORD_HASH_MAX_QUEUE', DEFAULT_HASH_MAX_QUEUE))
+            # spawn: forking a threaded server (Mongo client, socket threads) is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _slots = threading.BoundedSemaphore(workers + max_queue)
+            with _stats_lock:
+                _stats['workers'] = workers
+                _stats['max_in_flight'] = workers + max_queue
+        return _pool, _slots
+
+
+def _reset_pool(broken):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False)
+
+
+def _run(func, *args):
+    """Run func in the pool (inline if the pool cannot be used) and wait for the result."""
+    pool, slots = _get_pool()
+    with _stats_lock:
+        _stats['waiting'] += 1
+    slots.acquire()
+    try:
+        with _stats_lock:
+            _stats['waiting'] -= 1
+            _stats['in_flight'] += 1
+        try:
+            return pool.submit(func, *args).result()
+        except BrokenProcessPool:
+            print("[PasswordHashing] Worker pool broke, hashing inline and restarting the pool")
+            _reset_pool(pool)
+            return func(*args)
+    finally:
+        slots.release()
+        with _stats_lock:
+            _stats['in_flight'] -= 1
+            _stats['completed'] += 1
+
+
+def bcrypt_rounds():
+    """Configured bcrypt work factor (BCRYPT_ROUNDS)."""
+    return _setting('BCRYPT_ROUNDS', DEFAULT_BCRYPT_ROUNDS)
+
+
+def hash_password(password):
+    """bcrypt hash of a password at the configured work factor."""
+    return _run(_hashpw, password.encode('utf-8'), bcrypt_rounds())
+
+
+def verify_password(password, password_hash):
+    """True if the password matches the bcrypt hash (False for non-bcrypt placeholders)."""
+    if not password or not password_hash:
+        return False
+    if isinstance(password_hash, str):
+        password_hash = password_hash.encode('utf-8')
+    if hash_rounds(password_hash) is None:
+        return False
+    return _run(_checkpw, password.encode('utf-8'), password_hash)
+
+
+def hash_rounds(password_hash):
+    """Work factor of a bcrypt hash ($2b$12$...), or None if it is not a bcrypt hash."""
+    if isinstance(password_hash, bytes):
+        password_hash = password_hash.decode('utf-8', 'ignore')
+    parts = (password_hash or '').split('$')
+    if len(parts) != 4 or parts[1] not in ('2a', '2b', '2y') or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(password_hash):
+    """True if a bcrypt hash was made with a different work factor than configured."""
+    rounds = hash_rounds(password_hash)
+    return rounds is not None and rounds != bcrypt_rounds()
+
+
+def rehash_if_needed(collection, doc_id, password, password_hash):
+    """
+    After a successful login, store a fresh hash if the work factor changed.
+    Only replaces the hash that was verified, so a concurrent password change wins.
+    """
+    if not needs_rehash(password_hash):
+        return False
+    from app import mongo
+
+    try:
+        result = mongo.db[collection].update_one(
+            {'_id': doc_id, 'password_hash': password_hash},
+            {'$set': {'password_hash': hash_password(password)}}
+        )
+        return result.modified_count > 0
+    except Exception as e:
+        print(f"[PasswordHashing] Rehash failed for {collection} {doc_id}: {e}")
+        return False
+
+
+def hashing_stats():
+    """Queue depth and throughput of the hashing pool in this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['queue_depth'] = stats['waiting'] + max(0, stats['in_flight'] - stats['workers'])
+    return stats
@@ -0,0 +1,76 @@
+"""
+Principal status cache - whether a JWT principal may still use the API.
+
+The JWT user lookup runs on every protected request. Only the bits it needs
+(blacklist membership for sellers/outlet men, is_active for users) are loaded.
+User answers are kept in memory for a short TTL; deactivation in this process
+invalidates immediately and the TTL bounds how long another process can keep
+serving the old answer. Seller/outlet man answers are not cached here: they come
+from BlacklistService's in-memory set, which its refresher keeps current.
+"""
+import time
+from collections import OrderedDict
+from threading import RLock
+
+from bson import ObjectId
+
+from app import mongo
+
+PRINCIPAL_STATUS_TTL_SECONDS = 30
+PRINCIPAL_STATUS_MAX_ENTRIES = 50000
+# Answered from the in-memory blacklist set; a second cache would only delay its refreshes
+BLACKLIST_CHECKED_TYPES = ('seller', 'outlet_man')
+
+_cache = OrderedDict()  # {(user_type, user_id): (expires_at, allowed)}
+_cache_lock = RLock()
+
+
+def _load_status(user_type, user_id):
+    """Fetch whether the principal is allowed. Raises on lookup errors (the result is then not cached)."""
+    if user_type in BLACKLIST_CHECKED_TYPES:
+        from app.services.blacklist_service import BlacklistService
+        return not BlacklistService.is_blacklisted(user_id, user_type)
+    if user_type == 'user':
+        doc = mongo.db.users.find_one({'_id': ObjectId(user_id)}, {'is_active': 1})
+        return bool(doc) and doc.get('is_active', True) is not False
+    return True
+
+
+def is_principal_allowed(user_type, user_id):
+    """True unless the principal is blacklisted, deactivated or (for users) deleted."""
+    key = (user_type, str(user_id))
+    cached = user_type not in BLACKLIST_CHECKED_TYPES
+    now = time.monotonic()
+    if cached:
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry and entry[0] > now:
+                _cache.move_to_end(key)
+                return entry[1]
+
+    try:
+        allowed = _load_status(user_type, user_id)
+    except Exception as e:
+        print(f"[PrincipalStatus] Lookup failed for {user_type} {user_id}: {e}")
+        # Same outcome as before caching: unknown users are rejected, blacklist errors are not
+        return user_type != 'user'
+
+    if not cached:
+        return allowed
+    with _cache_lock:
+        _cache[key] = (now + PRINCIPAL_STATUS_TTL_SECONDS, allowed)
+        _cache.move_to_end(key)
+        while len(_cache) > PRINCIPAL_STATUS_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return allowed
+
+
+def invalidate_principal(user_type, user_id):
+    """Forget a principal's cached status (call after blacklisting or deactivating it)."""
+    with _cache_lock:
+        _cache.pop((user_type, str(user_id)), None)
+
+
+def clear_principal_cache():
+    with _cache_lock:
+        _cache.clear()
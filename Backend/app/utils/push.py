@@ -0,0 +1,90 @@
+"""
+Push notification utility - batched Firebase Cloud Messaging delivery
+"""
+from app import mongo
+
+# FCM accepts at most 500 messages per send_each call (it still makes one HTTP request per message)
+FCM_BATCH_SIZE = 500
+
+
+def _chunks(items, size=FCM_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def dead_tokens(tokens, responses):
+    """Tokens whose send failed because the registration no longer exists."""
+    from firebase_admin import messaging
+
+    dead = []
+    for token, response in zip(tokens, responses):
+        if response.success:
+            continue
+        if isinstance(response.exception, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+            dead.append(token)
+    return dead
+
+
+class PushService:
+    """Sends FCM messages in batches and drops tokens FCM reports as dead"""
+
+    @staticmethod
+    def _notification_parts(title, body, data=None, image=None):
+        from firebase_admin import messaging
+
+        payload = {key: str(value) for key, value in (data or {}).items() if value is not None}
+        return messaging.Notification(title=title, body=body, image=image), payload
+
+    @staticmethod
+    def build_message(token, title, body, data=None, image=None):
+        """Build one FCM message; returns the (token, message) pair send_batch expects."""
+        from firebase_admin import messaging
+
+        notification, payload = PushService._notification_parts(title, body, data, image)
+        return token, messaging.Message(notification=notification, data=payload, token=token)
+
+    @staticmethod
+    def send_batch(entries):
+        """
+        Send (token, message) pairs through send_each, up to FCM_BATCH_SIZE messages per call.
+
+        Returns:
+            list: one entry per message - None if FCM accepted it, otherwise the error (str)
+        """
+        from firebase_admin import messaging
+
+        errors = []
+        dead = []
+        for chunk in _chunks(entries):
+            tokens = [token for token, _ in chunk]
+            try:
+                batch = messaging.send_each([message for _, message in chunk])
+            except Exception as e:
+                print(f"[PushService] Batch send failed: {e}")
+                errors.extend([str(e) or "Push send failed"] * len(chunk))
+                continue
+            errors.extend(
+                None if response.success else (str(response.exception) or "Push send failed")
+                for response in batch.responses
+            )
+            dead.extend(dead_tokens(tokens, batch.responses))
+            if batch.failure_count:
+                print(f"[PushService] {batch.failure_count}/{len(chunk)} push messages failed")
+        PushService.prune_tokens(dead)
+        return errors
+
+    @staticmethod
+    def prune_tokens(tokens):
+        """Clear FCM tokens that FCM no longer accepts from user documents."""
+        if not tokens:
+            return 0
+        try:
+            result = mongo.db.users.update_many(
+                {'fcm_token': {'$in': list(set(tokens))}},
+                {'$set': {'fcm_token': None}}
+            )
+            print(f"[PushService] Pruned {result.modified_count} dead FCM tokens")
+            return result.modified_count
+        except Exception as e:
+            print(f"[PushService] Failed to prune FCM tokens: {e}")
+            return 0
@@ -1,11 +1,23 @@
 """
 SMS utility re-implemented to send in-app notifications via Socket.IO
 """
-import os
 from datetime import datetime, timezone
 from flask import current_app
-from bson import ObjectId
-from app import mongo, socketio
+from app import socketio
+from app.sockets.rooms import principal_room
+from app.utils.contact_directory import normalize_phone_number, resolve_by_email, resolve_by_phone
+from app.utils.notifications import (
+    DEFAULT_SUBJECT, DEFAULT_TITLE, NOTIFICATION_TEMPLATES,
+    absolute_url, render_email_html, render_notification
+)
+
+# Delivery channels and their per-channel outcomes (any other value is the error it failed with)
+CHANNELS = ('email', 'push', 'socket')
+CHANNEL_SENT = 'sent'
+CHANNEL_SKIPPED = 'skipped'
+# Push message added to the caller's batch; the caller records the send result
+CHANNEL_QUEUED = 'queued'
+CHANNEL_DONE = (CHANNEL_SENT, CHANNEL_SKIPPED)
 
 
 class SMSService:
@@ -22,109 +34,22 @@ class SMSService:
         Returns:
             str: Normalized phone number in E.164 format
         """
-        if not phone_number:
-            return None
-        
-        # Remove all non-digit characters except +
-        normalized = ''.join(c for c in phone_number if c.isdigit() or c == '+')
-        
-        # Ensure it starts with +
-        if not normalized.startswith('+'):
-            # If it doesn't start with +, assume it's a local number
-            # For Indian numbers, add +91
-            if len(normalized) == 10:
-                normalized = '+91' + normalized
-            else:
-                normalized = '+' + normalized
-        
-        return normalized
+        return normalize_phone_number(phone_number)
     
     @staticmethod
     def _find_user_or_seller_by_phone(phone_number):
         """Find user, seller, outlet_man, or master by phone number and return their document and role"""
-        if not phone_number:
-            return None, None
-        
-        normalized = SMSService.normalize_phone_number(phone_number)
-        
-        # Check users collection
-        user = mongo.db.users.find_one({
-            '$or': [
-                {'phone_number': phone_number},
-                {'phone_number': normalized}
-            ]
-        })
-        if user:
-            return user, 'user'
-            
-        # Check sellers collection
-        seller = mongo.db.sellers.find_one({
-            '$or': [
-                {'phone_number': phone_number},
-                {'phone_number': normalized},
-                {'seller_phone': phone_number},
-                {'seller_phone': normalized}
-            ]
-        })
-        if seller:
-            return seller, 'seller'
-            
-        # Check outlet_men collection
-        outlet = mongo.db.outlet_men.find_one({
-            '$or': [
-                {'phone_number': phone_number},
-                {'phone_number': normalized}
-            ]
-        })
-        if outlet:
-            return outlet, 'outlet_man'
-            
-        # Check master collection
-        master = mongo.db.master.find_one({
-            '$or': [
-                {'phone_number': phone_number},
-                {'phone_number': normalized}
-            ]
-        })
-        if master:
-            return master, 'master'
-            
-        return None, None
+        return resolve_by_phone(phone_number)
 
     @staticmethod
     def _find_user_or_seller_by_email(email):
         """Find user, seller, outlet_man, or master by email and return their document and role"""
-        if not email:
-            return None, None
-            
-        email_clean = str(email).strip().lower()
-        
-        # Check users collection
-        user = mongo.db.users.find_one({'email': email_clean})
-        if user:
-            return user, 'user'
-            
-        # Check sellers collection
-        seller = mongo.db.sellers.find_one({'email': email_clean})
-        if seller:
-            return seller, 'seller'
-            
-        # Check outlet_men collection
-        outlet = mongo.db.outlet_men.find_one({'email': email_clean})
-        if outlet:
-            return outlet, 'outlet_man'
-            
-        # Check master collection
-        master = mongo.db.master.find_one({'email': email_clean})
-        if master:
-            return master, 'master'
-            
-        return None, None
+        return resolve_by_email(email)
 
     @staticmethod
     def send_otp(phone_number, otp, email=None):
         """
-        Send OTP via SMTP Email (and fallback to WebSocket/FCM)
+        Send OTP via SMTP Email (OTPs are never pushed or broadcast)
         
         Args:
             phone_number (str): Recipient phone number (format: +1234567890)
@@ -134,200 +59,186 @@ class SMSService:
         Returns:
             tuple: (success: bool, message: str)
         """
-        message_body = f"Your BBHCBazaar OTP code is: {otp}. This code will expire in 10 minutes. Do not share this code with anyone."
+        notification = render_notification('otp', otp=otp)
         # OTP must be delivered synchronously — user is waiting for it
-        return SMSService._send_message_sync(phone_number, message_body, email=email)
+        return SMSService.deliver(notification, phone_number, email=email)
 
     @staticmethod
-    def send_message(phone_number, message_body, product_thumbnail=None, email=None):
+    def notify(notification_type, phone_number=None, email=None, thumbnail=None, **params):
         """
-        Send a notification via Email (using SMTP) and Socket.IO/FCM in the background.
+        Render a typed notification (see app.utils.notifications) and queue it
+        (Email via SMTP, Socket.IO and FCM) in the notification outbox.
+        Delivery, retries and status tracking happen in NotificationOutboxService workers.
         """
-        import threading
-        
-        def run_async():
-            try:
-                SMSService._send_message_sync(phone_number, message_body, product_thumbnail, email)
-            except Exception as e:
-                print(f"[SMSService] Asynchronous send_message failed: {e}")
+        from app.services.notification_outbox_service import NotificationOutboxService
 
-        threading.Thread(target=run_async, name="sms_send_thread", daemon=True).start()
-        return True, "Message scheduled"
+        try:
+            notification = render_notification(notification_type, **params)
+            NotificationOutboxService.enqueue(
+                notification,
+                phone_number=phone_number,
+                email=email,
+                thumbnail=absolute_url(thumbnail, current_app.config.get('BASE_URL'))
+            )
+        except Exception as e:
+            print(f"[SMSService] Failed to queue {notification_type} notification: {e}")
+            return False, str(e)
+        return True, "Message queued"
 
     @staticmethod
-    def _send_message_sync(phone_number, message_body, product_thumbnail=None, email=None):
+    def deliver(notification, phone_number=None, email=None, thumbnail=None):
+        """
+        Deliver a rendered notification now.
+
+        Args:
+            notification (dict): Output of render_notification
+            phone_number (str, optional): Recipient phone number
+            email (str, optional): Recipient email address
+            thumbnail (str, optional): Absolute thumbnail URL
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
         try:
-            print(f"[SMSService] Processing notification/email for {phone_number} (email: {email}): {message_body}")
-            
-            # Lookup by email first if available (emails are unique in DB)
-            user_doc = None
-            role = None
-            if email:
-                user_doc, role = SMSService._find_user_or_seller_by_email(email)
-                
-            # Fallback to phone lookup if email lookup returned nothing
-            if not user_doc:
-                user_doc, role = SMSService._find_user_or_seller_by_phone(phone_number)
-            
-            # If it is not a security verification code or OTP, check if the recipient has notifications enabled
-            is_otp = 'OTP' in message_body or 'Verification' in message_body or 'security code' in message_body.lower()
-            is_order_transactional = 'order' in message_body.lower() or 'booking' in message_body.lower() or '#' in message_body or 'accepted' in message_body.lower() or 'rejected' in message_body.lower() or 'cancelled' in message_body.lower()
-            if not is_otp and not is_order_transactional and user_doc:
-                if not user_doc.get('notifications_enabled', False):
-                    print(f"[SMSService] Notifications not enabled for {phone_number}. Skipping.")
-                    return False, "Notifications not enabled"
-            
-            socket_id = user_doc.get('socket_id') if user_doc else None
-            
-            # Construct notification payload
-            payload = {
-                'title': 'Security Verification Code' if is_otp else 'New Order Notification',
-                'message': message_body,
-                'thumbnail': product_thumbnail,
-                'timestamp': datetime.now(timezone.utc).isoformat() + 'Z'
-            }
+            results, error = SMSService.deliver_channels(notification, phone_number, email=email, thumbnail=thumbnail)
+        except Exception as e:
+            print(f"[SMSService] Error sending notification: {str(e)}")
+            return False, str(e)
+        if error:
+            return False, error
 
-            # Send via Email SMTP
-            recipient_email = email
-            if not recipient_email and user_doc:
-                recipient_email = user_doc.get('email')
-                
-            email_sent = False
-            email_error = None
-            if recipient_email:
-                try:
-                    # Print OTP to terminal for debug
-                    if is_otp:
-                        print(f"\n[DEBUG OTP SENDING] Target Email: {recipient_email} | Message: {message_body}\n", flush=True)
+        template = NOTIFICATION_TEMPLATES.get(notification.get('notification_type'))
+        if template and template.email_only:
+            if results['email'] != CHANNEL_SENT:
+                return False, results['email'] if results['email'] != CHANNEL_SKIPPED else "No email address found"
+            return True, "OTP email sent successfully"
 
-                    if str(recipient_email).strip().lower() in ['text@exmple.com', 'test@example.com']:
-                        email_sent = True
-                        print(f"[SMSService] Bypassed actual SMTP sending for target bypass email: {recipient_email}")
-                    else:
-                        from app.utils.email import EmailService
-                        subject = "BBHCBazaar - Security Verification Code" if is_otp else "BBHCBazaar - Order Update"
-                        
-                        # Simple, clean HTML body to prevent spam detection
-                        html_body = f"""
-                        <html>
-                        <body style="font-family: sans-serif; line-height: 1.5; color: #111111; max-width: 500px; margin: 20px auto; padding: 10px;">
-                            <p>Hello,</p>
-                            <p>{message_body}</p>
-                            <p>Best regards,<br>BBHCBazaar Team</p>
-                        </body>
-                        </html>
-                        """
-                        
-                        ok, err = EmailService.send_email(
-                            to_email=recipient_email,
-                            subject=subject,
-                            body_text=message_body,
-                            body_html=html_body
-                        )
-                        if ok:
-                            email_sent = True
-                        else:
-                            email_error = err
-                except Exception as e:
-                    email_error = str(e)
-                    print(f"[SMSService] SMTP sending error: {str(e)}")
-            else:
-                print(f"[SMSService] No email found for {phone_number}. Cannot send SMTP email.")
-                email_error = "No email address found"
-            
-            # Resolve absolute URL for product thumbnail
-            absolute_thumbnail = None
-            if product_thumbnail:
-                thumb_str = str(product_thumbnail).strip()
-                if thumb_str.startswith('http://') or thumb_str.startswith('https://'):
-                    absolute_thumbnail = thumb_str
-                else:
-                    if thumb_str.startswith('/'):
-                        thumb_str = thumb_str[1:]
-                    
-                    base_url = None
-                    try:
-                        from flask import request
-                        if request and request.url_root:
-                            base_url = request.url_root
-                    except Exception:
-                        pass
-                        
-                    if not base_url:
-                        try:
-                            base_url = current_app.config.get('BASE_URL')
-                        except Exception:
-                            pass
-                    if not base_url:
-                        import os
-                        base_url = os.environ.get('BASE_URL')
-                    if not base_url:
-                        base_url = 'http://apps.bbhegdecollege.com:9000/'
-                        
-                    if not base_url.endswith('/'):
-                        base_url += '/'
-                    absolute_thumbnail = f"{base_url}{thumb_str}"
+        email_sent = results['email'] == CHANNEL_SENT
+        if results['socket'] == CHANNEL_SENT:
+            return True, "Email and WebSocket notification sent" if email_sent else "Notification sent via websocket"
+        if email_sent:
+            return True, "Email sent (no account for WebSocket)"
+        failed = [f"{channel}: {result}" for channel, result in results.items() if result not in CHANNEL_DONE]
+        return False, "; ".join(failed) or "Recipient unknown and email not sent"
 
-            # Short-circuit: OTPs must only be delivered via email. No push notification, no WebSocket broadcast.
-            if is_otp:
-                if not email_sent:
-                    print(f"[SMSService] Aborting OTP delivery: email failed ({email_error})")
-                    return False, email_error or "Failed to send OTP email"
-                print(f"[SMSService] OTP email delivered successfully. Bypassing push/WS.")
-                return True, "OTP email sent successfully"
+    @staticmethod
+    def deliver_channels(notification, phone_number=None, email=None, thumbnail=None, skip=(), push_batch=None):
+        """
+        Deliver a rendered notification on every channel (email, push, socket) not in `skip`.
 
-            # Update payload with absolute thumbnail path
-            if absolute_thumbnail:
-                payload['thumbnail'] = absolute_thumbnail
+        If `push_batch` is a list, the FCM message is appended to it as a (token, message)
+        pair and the push result is 'queued'; the caller sends the batch with
+        PushService.send_batch and records the outcome. Otherwise it is sent right away.
 
-            # If user has an FCM token, send a push notification
-            fcm_token = user_doc.get('fcm_token') if user_doc else None
-            if fcm_token and role == 'user':
-                try:
-                    from firebase_admin import messaging
-                    
-                    fcm_notification = messaging.Notification(
-                        title='Security Verification Code' if is_otp else 'New Order Notification',
-                        body=message_body,
-                        image=absolute_thumbnail
-                    )
-                    
-                    fcm_data = {
-                        'title': 'Security Verification Code' if is_otp else 'New Order Notification',
-                        'message': message_body,
-                        'timestamp': datetime.now(timezone.utc).isoformat() + 'Z'
-                    }
-                    if absolute_thumbnail:
-                        fcm_data['thumbnail'] = absolute_thumbnail
-                        
-                    message = messaging.Message(
-                        notification=fcm_notification,
-                        data=fcm_data,
-                        token=fcm_token
+        Returns:
+            tuple: (results: dict, error: str or None) - results maps each channel to
+            'sent', 'skipped' (nothing to deliver there), 'queued' or the error it failed with;
+            error is set when the notification is not delivered at all (opted out).
+            Recipient lookup errors are raised.
+        """
+        results = {channel: CHANNEL_SKIPPED for channel in CHANNELS}
+        notification_type = notification.get('notification_type')
+        message_body = notification['message']
+        template = NOTIFICATION_TEMPLATES.get(notification_type)
+        email_only = bool(template and template.email_only)
+        print(f"[SMSService] Processing {notification_type} notification for {phone_number} (email: {email})")
+
+        # Lookup by email first if available (emails are unique in DB)
+        user_doc = None
+        role = None
+        if email:
+            user_doc, role = SMSService._find_user_or_seller_by_email(email)
+
+        # Fallback to phone lookup if email lookup returned nothing
+        if not user_doc:
+            user_doc, role = SMSService._find_user_or_seller_by_phone(phone_number)
+
+        # Informational types are only sent to recipients with notifications enabled
+        if template and template.respects_opt_out and user_doc:
+            if not user_doc.get('notifications_enabled', False):
+                print(f"[SMSService] Notifications not enabled for {phone_number}. Skipping.")
+                return results, "Notifications not enabled"
+
+        # Send via Email SMTP
+        recipient_email = email
+        if not recipient_email and user_doc:
+            recipient_email = user_doc.get('email')
+
+        if 'email' in skip:
+            pass
+        elif recipient_email:
+            try:
+                # Print OTP to terminal for debug
+                if email_only:
+                    print(f"\n[DEBUG OTP SENDING] Target Email: {recipient_email} | Message: {message_body}\n", flush=True)
+
+                if str(recipient_email).strip().lower() in ['text@exmple.com', 'test@example.com']:
+                    results['email'] = CHANNEL_SENT
+                    print(f"[SMSService] Bypassed actual SMTP sending for target bypass email: {recipient_email}")
+                else:
+                    from app.utils.email import EmailService
+
+                    ok, err = EmailService.send_email(
+                        to_email=recipient_email,
+                        subject=notification.get('subject') or DEFAULT_SUBJECT,
+                        body_text=message_body,
+                        body_html=render_email_html(message_body)
                     )
-                    response = messaging.send(message)
-                    print(f"[SMSService] Successfully sent FCM push: {response}")
-                except Exception as e:
-                    print(f"[SMSService] Failed to send FCM push: {str(e)}")
+                    results['email'] = CHANNEL_SENT if ok else (err or "Failed to send email")
+            except Exception as e:
+                results['email'] = str(e)
+                print(f"[SMSService] SMTP sending error: {str(e)}")
+        else:
+            print(f"[SMSService] No email found for {phone_number}. Cannot send SMTP email.")
+
+        # Short-circuit: OTPs must only be delivered via email. No push notification, no WebSocket broadcast.
+        if email_only:
+            if results['email'] != CHANNEL_SENT:
+                print(f"[SMSService] Aborting OTP delivery: email not sent ({results['email']})")
+            return results, None
+
+        title = notification.get('title') or DEFAULT_TITLE
+        payload = {
+            'title': title,
+            'type': notification_type,
+            'message': message_body,
+            'thumbnail': thumbnail,
+            'timestamp': datetime.now(timezone.utc).isoformat() + 'Z'
+        }
+
+        # If user has an FCM token, build a push notification (sent in batches via send_each)
+        fcm_token = user_doc.get('fcm_token') if user_doc else None
+        if fcm_token and role == 'user' and 'push' not in skip:
+            try:
+                from app.utils.push import PushService
+
+                entry = PushService.build_message(fcm_token, title=title, body=message_body, data=payload, image=thumbnail)
+                if push_batch is not None:
+                    push_batch.append(entry)
+                    results['push'] = CHANNEL_QUEUED
+                else:
+                    push_error, = PushService.send_batch([entry])
+                    results['push'] = push_error or CHANNEL_SENT
+            except Exception as e:
+                results['push'] = str(e)
+                print(f"[SMSService] Failed to send FCM push: {str(e)}")
+
+        # Rooms span all worker processes, so emit even if the socket lives on another worker
+        if not user_doc:
+            # Unknown recipient: do NOT broadcast to all connected clients. Just log it.
+            print(f"[SMSService] No account found for {phone_number}. Skipping WebSocket notification to avoid broadcasting.")
+        elif 'socket' not in skip:
+            recipient_room = principal_room(role, user_doc.get('_id'))
+            try:
+                print(f"[SMSService] Emitting app_notification to room: {recipient_room}")
+                socketio.emit('app_notification', payload, to=recipient_room)
+                results['socket'] = CHANNEL_SENT
+            except Exception as e:
+                results['socket'] = str(e)
+                print(f"[SMSService] WebSocket emit error: {str(e)}")
+
+        return results, None
 
-            # Emit socket event
-            if socket_id:
-                print(f"[SMSService] Emitting app_notification to socket: {socket_id}")
-                socketio.emit('app_notification', payload, to=socket_id)
-                if email_sent:
-                    return True, "Email and WebSocket notification sent"
-                return True, "Notification sent via websocket"
-            else:
-                # If recipient is offline, do NOT broadcast to all connected clients. Just log it.
-                print(f"[SMSService] Recipient {phone_number} is offline. Skipping WebSocket notification to avoid broadcasting.")
-                if email_sent:
-                    return True, "Email sent (Recipient offline for WebSocket)"
-                return False, "Recipient offline and email not sent"
-                
-        except Exception as e:
-            print(f"[SMSService] Error sending notification: {str(e)}")
-            return False, str(e)
-    
     @staticmethod
     def is_configured():
         """Always returns True to ensure notification routing bypasses configuration checks"""
@@ -52,6 +52,21 @@ class Config:
     # Socket.IO Configuration
     SOCKETIO_CORS_ALLOWED_ORIGINS = CORS_ORIGINS
     SOCKETIO_ASYNC_MODE = 'threading'  # Changed from 'eventlet' for Python 3.13 compatibility
+    # Shared queue for multi-process deployments, e.g. redis://localhost:6379/0 ('local://' = in-memory stand-in)
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'bbhc-socketio')
+    # Active socket counters: 'memory' (this process) or 'mongo' (shared by all workers)
+    ACTIVE_COUNTER_BACKEND = os.environ.get('ACTIVE_COUNTER_BACKEND') or (
+        'mongo' if SOCKETIO_MESSAGE_QUEUE and not SOCKETIO_MESSAGE_QUEUE.startswith('local://') else 'memory'
+    )
+    # serve.py: worker processes, each listening on PORT + index. More than one is opt-in and
+    # needs SOCKETIO_MESSAGE_QUEUE (and the shared 'mongo' counter backend it selects).
+    WORKER_PROCESSES = int(os.environ.get('WORKER_PROCESSES') or 1)
+    WORKER_THREADS = int(os.environ.get('WORKER_THREADS', 100))
+    # Reverse proxies in front of the app; the client address is taken from the X-Forwarded-For
+    # entry the last trusted proxy appended. 0 (default) = exposed directly, headers are ignored.
+    # Set it only in deployments behind a proxy, e.g. TRUSTED_PROXY_HOPS=1 behind nginx.
+    TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
     
     # JWT Configuration - STRICT RS256 ENFORCED
     JWT_ALGORITHM = 'RS256'
@@ -89,12 +104,24 @@ class Config:
     SMTP_EMAIL = os.environ.get('SMTP_EMAIL')
     SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD')
     
+    # Persistent SMTP sessions kept per process (see app/utils/email.py)
+    SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', 4))
+    
     # Debug: Print SMTP configuration status
     if SMTP_EMAIL and SMTP_PASSWORD:
         print(f"[OK] SMTP credentials loaded successfully ({SMTP_EMAIL})")
     else:
         print("[WARN] SMTP credentials not fully configured in .env")
 
+    # Notification outbox worker threads per process (0 disables delivery in this process)
+    NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', 4))
+
+    # bcrypt work factor for new hashes; logins rehash stored passwords made with another factor
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    # Password hashing worker processes per server process, and how many operations may wait for them
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 64))
+
     # Google Drive Configuration
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
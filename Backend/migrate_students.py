@@ -1,8 +1,10 @@
+import argparse
 import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import BulkWriteError
 import bcrypt
 from datetime import datetime, timezone
 import re
@@ -11,28 +13,128 @@ import re
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from config import Config
 
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+DEFAULT_JSON_PATH = r'c:\D\students.json'
+BATCH_SIZE = 500
+READ_CHUNK_SIZE = 1 << 20
+DUPLICATE_KEY_ERROR = 11000
+JSON_WHITESPACE = ' \t\n\r'
+
+
+def hash_password(password, rounds=None):
+    salt = bcrypt.gensalt(rounds) if rounds else bcrypt.gensalt()
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
 
 def is_valid_email(email):
     if not email:
         return False
     return bool(re.match(r"[^@]+@[^@]+\.[^@]+", email))
 
-def migrate_students(json_file_path):
-    print(f"Loading students from {json_file_path}...")
+
+def iter_json_array(json_file_path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield the elements of a top-level JSON array without loading the whole file.
+    Elements are decoded in place with a moving index; the consumed prefix is only
+    dropped when the next chunk is read, so each byte is copied a bounded number of times.
+    """
+    decoder = json.JSONDecoder()
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        idx = 0
+        eof = False
+        started = False
+        while True:
+            # Skip whitespace (and element separators once inside the array)
+            while idx < len(buffer) and (buffer[idx] in JSON_WHITESPACE or (started and buffer[idx] == ',')):
+                idx += 1
+            if idx < len(buffer):
+                if not started:
+                    if buffer[idx] != '[':
+                        raise ValueError("Expected a JSON array of students")
+                    started = True
+                    idx += 1
+                    continue
+                if buffer[idx] == ']':
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, idx)
+                    # A value running to the end of the buffer may continue in the next chunk
+                    complete = eof or end < len(buffer)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    complete = False
+                if complete:
+                    yield item
+                    idx = end
+                    continue
+            elif eof:
+                raise ValueError("Unterminated JSON array" if started else "Expected a JSON array of students")
+
+            # Need more input: drop the consumed prefix and append the next chunk
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[idx:] + chunk
+            idx = 0
+
+
+def load_checkpoint(checkpoint_path):
+    """Number of array elements already handled by an earlier run."""
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            students = json.load(f)
-    except Exception as e:
-        print(f"Error reading JSON file: {e}")
-        return
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            return int(json.load(f).get('processed', 0))
+    except FileNotFoundError:
+        return 0
+
 
-    print(f"Found {len(students)} students. Connecting to MongoDB...")
-    
+def save_checkpoint(checkpoint_path, processed):
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'processed': processed, 'updated_at': datetime.now(timezone.utc).isoformat()}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def build_student_user(student, username):
+    """User document for a student, without the password hash."""
+    raw_email = student.get('email')
+    # validate email
+    email = raw_email if is_valid_email(raw_email) else f"{username}@bbhcbazaar.local"
+    now = datetime.now(timezone.utc)
+    return {
+        'username': username,
+        'email': email,
+        'first_name': student.get('studentName', ''),
+        'last_name': '',
+        'phone_number': student.get('studentContact'),
+        'address': student.get('address'),
+        'date_of_birth': student.get('dob'),
+        'is_active': True,
+        'is_admin': False,
+        'role': 'student',
+        'notifications_enabled': True,
+        'created_at': now,
+        'updated_at': now
+    }
+
+
+def insert_batch(users_col, users):
+    """insert_many (unordered); duplicates are skipped. Returns (inserted, skipped)."""
+    try:
+        result = users_col.insert_many(users, ordered=False)
+        return len(result.inserted_ids), 0
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        other_errors = [err for err in errors if err.get('code') != DUPLICATE_KEY_ERROR]
+        if other_errors:
+            raise
+        # Maybe email collided with existing non-student user
+        return e.details.get('nInserted', 0), len(errors)
+
+
+def get_database():
     mongodb_uri = Config.MONGODB_URI
     mongodb_db = Config.MONGODB_DB
-    
+
     if '@' in mongodb_uri:
         after_at = mongodb_uri.split('@', 1)[1]
         if '/' not in after_at.split('?')[0]:
@@ -42,68 +144,91 @@ def migrate_students(json_file_path):
     else:
         if not mongodb_uri.endswith('/'):
             mongodb_uri += '/'
-            
+
     client = MongoClient(mongodb_uri)
-    db = client[mongodb_db]
+    return client[mongodb_db]
+
+
+def migrate_students(json_file_path, checkpoint_path=None, batch_size=BATCH_SIZE, workers=None):
+    """
+    Import students as users. Passwords (date of birth) are hashed in a process
+    pool and users are inserted in unordered batches. Progress is recorded in a
+    checkpoint file after every batch, so an interrupted import resumes where it stopped.
+    """
+    checkpoint_path = checkpoint_path or f"{json_file_path}.checkpoint"
+    resume_from = load_checkpoint(checkpoint_path)
+    if not os.path.exists(json_file_path):
+        print(f"Error reading JSON file: {json_file_path} not found")
+        return
+
+    print(f"Streaming students from {json_file_path}. Connecting to MongoDB...")
+    db = get_database()
     users_col = db.users
-    
+    rounds = Config.BCRYPT_ROUNDS
+
     new_users = 0
     skipped_users = 0
-    
-    print("Starting migration...")
-    
+    processed = 0
+
+    print(f"Starting migration (resuming after {resume_from} records)..." if resume_from else "Starting migration...")
+
     existing_usernames = set(doc['username'] for doc in users_col.find({}, {"username": 1}))
-    
-    for student in students:
-        roll_no = student.get('rollNo')
-        raw_email = student.get('email')
-        dob = student.get('dob')
-        
-        if not roll_no or not dob:
-            continue
-            
-        username = str(roll_no)
-        
-        if username in existing_usernames:
-            skipped_users += 1
-            continue
-            
-        password_hash = hash_password(dob)
-        
-        # validate email
-        email = raw_email if is_valid_email(raw_email) else f"{username}@bbhcbazaar.local"
-        
-        new_user = {
-            'username': username,
-            'email': email,
-            'password_hash': password_hash,
-            'first_name': student.get('studentName', ''),
-            'last_name': '',
-            'phone_number': student.get('studentContact'),
-            'address': student.get('address'),
-            'date_of_birth': dob,
-            'is_active': True,
-            'is_admin': False,
-            'role': 'student',
-            'notifications_enabled': True,
-            'created_at': datetime.now(timezone.utc),
-            'updated_at': datetime.now(timezone.utc)
-        }
-        
-        try:
-            users_col.insert_one(new_user)
-            existing_usernames.add(username)
-            new_users += 1
-            if new_users % 100 == 0:
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def flush(batch):
+            nonlocal new_users, skipped_users
+            if batch:
+                hashes = pool.map(
+                    hash_password,
+                    [user['date_of_birth'] for user in batch],
+                    [rounds] * len(batch),
+                    chunksize=max(1, len(batch) // (workers * 4))
+                )
+                for user, password_hash in zip(batch, hashes):
+                    user['password_hash'] = password_hash
+                inserted, skipped = insert_batch(users_col, batch)
+                new_users += inserted
+                skipped_users += skipped
                 print(f"Inserted {new_users} new users...")
-        except DuplicateKeyError:
-            # Maybe email collided with existing non-student user
-            skipped_users += 1
-            
+            save_checkpoint(checkpoint_path, processed)
+
+        batch = []
+        for student in iter_json_array(json_file_path):
+            processed += 1
+            if processed <= resume_from:
+                continue
+
+            roll_no = student.get('rollNo')
+            if not roll_no or not student.get('dob'):
+                continue
+
+            username = str(roll_no)
+
+            if username in existing_usernames:
+                skipped_users += 1
+                continue
+            existing_usernames.add(username)
+
+            batch.append(build_student_user(student, username))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        flush(batch)
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
     print(f"Migration completed!")
     print(f"Successfully added: {new_users} students")
     print(f"Skipped (already exist): {skipped_users} students")
 
+
 if __name__ == '__main__':
-    json_path = r'c:\D\students.json'
-    migrate_students(json_path)
+    parser = argparse.ArgumentParser(description='Import students from a JSON array as user accounts')
+    parser.add_argument('json_path', nargs='?', default=DEFAULT_JSON_PATH)
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <json_path>.checkpoint)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, help='Hashing processes (default: one per core)')
+    args = parser.parse_args()
+    migrate_students(args.json_path, args.checkpoint, args.batch_size, args.workers)
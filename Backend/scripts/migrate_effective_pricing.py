@@ -0,0 +1,24 @@
+import sys
+import os
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, mongo
+from app.services.pricing_engine_service import PricingEngineService
+
+def migrate_effective_pricing():
+    app, _ = create_app()
+    with app.app_context():
+        print("Starting effective pricing backfill...")
+
+        for item_type, collection_name in (('product', 'products'), ('service', 'services')):
+            count = mongo.db[collection_name].count_documents({})
+            print(f"Recomputing pricing for {count} {collection_name}...")
+            modified = PricingEngineService.recompute_items(item_type)
+            print(f"Updated effective pricing on {modified} {collection_name}.")
+
+        print("Backfill complete.")
+
+if __name__ == "__main__":
+    migrate_effective_pricing()
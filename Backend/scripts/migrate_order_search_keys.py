@@ -0,0 +1,54 @@
+import sys
+import os
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+
+from app import create_app, mongo
+from app.utils.order_search import build_order_search_keys, build_seller_search_keys
+
+BATCH_SIZE = 500
+
+SEARCH_SOURCE_PROJECTION = {
+    'order_number': 1,
+    'search_keys': 1,
+    'seller_search_keys': 1,
+    'product_snapshot': 1,
+    'seller_snapshot': 1,
+    'user_snapshot': 1,
+}
+
+
+def migrate_order_search_keys():
+    app, _ = create_app()
+    with app.app_context():
+        print("Starting order search_keys / seller_search_keys backfill...")
+
+        for collection_name in ('orders', 'service_orders'):
+            collection = mongo.db[collection_name]
+            print(f"Scanning {collection.count_documents({})} {collection_name}...")
+
+            operations = []
+            modified = 0
+            for order_doc in collection.find({}, SEARCH_SOURCE_PROJECTION):
+                keys = {
+                    'search_keys': build_order_search_keys(order_doc),
+                    'seller_search_keys': build_seller_search_keys(order_doc),
+                }
+                if all(order_doc.get(field) == value for field, value in keys.items()):
+                    continue
+                operations.append(UpdateOne({'_id': order_doc['_id']}, {'$set': keys}))
+                if len(operations) >= BATCH_SIZE:
+                    modified += collection.bulk_write(operations, ordered=False).modified_count
+                    operations = []
+            if operations:
+                modified += collection.bulk_write(operations, ordered=False).modified_count
+
+            print(f"Updated search_keys on {modified} {collection_name}.")
+
+        print("Backfill complete.")
+
+if __name__ == "__main__":
+    migrate_order_search_keys()
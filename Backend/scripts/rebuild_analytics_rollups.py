@@ -0,0 +1,18 @@
+import sys
+import os
+
+# Add the parent directory to sys.path to import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.analytics_rollup_service import AnalyticsRollupService
+
+def rebuild_analytics_rollups():
+    app, _ = create_app()
+    with app.app_context():
+        print("Rebuilding analytics rollups from order history...")
+        scanned = AnalyticsRollupService.rebuild()
+        print(f"Rollups rebuilt from {scanned} orders.")
+
+if __name__ == "__main__":
+    rebuild_analytics_rollups()
@@ -0,0 +1,79 @@
+"""
+Production entry point: runs several Socket.IO worker processes.
+
+Each worker is a single gunicorn process (threaded, so WebSockets keep working)
+listening on PORT + index. Socket.IO needs sticky sessions, so put a proxy that
+pins each client to one worker in front (e.g. nginx upstream with ip_hash) rather
+than letting several processes share one port.
+
+Workers share state through MongoDB and the Socket.IO message queue
+(SOCKETIO_MESSAGE_QUEUE), so room emits from any worker reach every client.
+
+Usage:
+    SOCKETIO_MESSAGE_QUEUE=redis://localhost:6379/0 WORKER_PROCESSES=4 python serve.py
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from config import Config
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def worker_command(port):
+    return [
+        sys.executable, '-m', 'gunicorn',
+        '--workers', '1',
+        '--threads', str(Config.WORKER_THREADS),
+        '--bind', f"{Config.HOST}:{port}",
+        '--chdir', BASE_DIR,
+        'wsgi:app',
+    ]
+
+
+def main():
+    workers = max(1, Config.WORKER_PROCESSES)
+    if workers > 1 and not Config.SOCKETIO_MESSAGE_QUEUE:
+        print("[Serve] SOCKETIO_MESSAGE_QUEUE is required for more than one worker "
+              "(e.g. redis://localhost:6379/0)")
+        return 1
+    if workers > 1 and Config.SOCKETIO_MESSAGE_QUEUE.startswith('local://'):
+        print("[Serve] local:// only works inside one process; use a Redis queue for multiple workers")
+        return 1
+
+    processes = []
+    for index in range(workers):
+        port = Config.PORT + index
+        print(f"[Serve] Starting worker {index + 1}/{workers} on {Config.HOST}:{port}")
+        processes.append(subprocess.Popen(worker_command(port), cwd=BASE_DIR))
+
+    def _shutdown(signum, _frame):
+        print(f"[Serve] Received signal {signum}, stopping workers")
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    # Exit as soon as any worker dies so the supervisor (systemd, docker) restarts the set
+    exit_code = 0
+    while processes:
+        for process in list(processes):
+            code = process.poll()
+            if code is None:
+                continue
+            processes.remove(process)
+            if code != 0 and exit_code == 0:
+                exit_code = code
+                print(f"[Serve] Worker pid {process.pid} exited with code {code}")
+                _shutdown(signal.SIGTERM, None)
+        time.sleep(0.5)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Tests for the active socket counters (in-process and Mongo backends)
+"""
+import time
+
+import pytest
+
+from app.utils import active_counters
+from app.utils.active_counters import (
+    InProcessCounterBackend,
+    configure_counter_backend,
+    get_all_counts,
+    get_role_for_socket,
+    heartbeat,
+    is_principal_online,
+    register_principal,
+    register_socket,
+    reset_all_counters,
+    unregister_socket,
+)
+
+
+@pytest.fixture(autouse=True)
+def _memory_backend():
+    configure_counter_backend('memory')
+    yield
+    reset_all_counters()
+
+
+def test_counts_follow_socket_registration():
+    register_socket('sid-1', 'user')
+    register_socket('sid-2', 'user')
+    register_socket('sid-3', 'master')
+    assert get_all_counts() == {'users': 2, 'sellers': 0, 'masters': 1, 'outlets': 0}
+
+    assert unregister_socket('sid-1') == 'user'
+    assert unregister_socket('sid-1') is None
+    assert get_all_counts()['users'] == 1
+
+
+def test_reregistering_moves_socket_between_roles():
+    register_socket('sid-1', 'user')
+    register_socket('sid-1', 'seller')
+    assert get_role_for_socket('sid-1') == 'seller'
+    assert get_all_counts() == {'users': 0, 'sellers': 1, 'masters': 0, 'outlets': 0}
+
+
+def test_heartbeat_drops_disconnected_sockets():
+    register_socket('sid-live', 'user')
+    register_socket('sid-dead', 'user')
+    assert heartbeat(lambda sid: sid == 'sid-live') is True
+    assert get_role_for_socket('sid-dead') is None
+    assert get_all_counts()['users'] == 1
+
+
+def test_unrefreshed_sockets_expire():
+    # Sockets registered by a worker that stopped heartbeating
+    backend = InProcessCounterBackend()
+    now = time.monotonic()
+    backend.add('sid-1', 'seller', None, now + 10)
+    backend.add('sid-2', 'seller', None, now + 60)
+    assert backend.counts(now)['sellers'] == 2
+    assert backend.counts(now + 30)['sellers'] == 1
+
+    backend.touch({'sid-1': ('seller', None)}, now + 90)
+    assert backend.counts(now + 70) == {'users': 0, 'sellers': 1, 'masters': 0, 'outlets': 0}
+
+
+def test_principal_stays_online_until_its_last_socket_leaves():
+    register_principal('sid-1', 'seller', 's1')
+    register_principal('sid-2', 'seller', 's1')
+    register_socket('sid-2', 'seller')
+    assert is_principal_online('seller', 's1')
+    assert not is_principal_online('seller', 's2')
+
+    unregister_socket('sid-1')
+    assert is_principal_online('seller', 's1')
+    unregister_socket('sid-2')
+    assert not is_principal_online('seller', 's1')
+
+
+def test_heartbeat_keeps_principal_only_sockets_alive():
+    register_principal('sid-1', 'master', 'm1')
+    heartbeat(lambda sid: True)
+    assert is_principal_online('master', 'm1')
+    assert get_all_counts()['masters'] == 0
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        configure_counter_backend('nope')
+    assert isinstance(active_counters._backend, InProcessCounterBackend)
+
+
+class FakeActiveSockets:
+    """Just enough of a pymongo collection for MongoCounterBackend."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def update_one(self, query, update, upsert=False):
+        if query['_id'] in self.docs or upsert:
+            self.docs.setdefault(query['_id'], {'_id': query['_id']}).update(update['$set'])
+
+    def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            self.update_one(op._filter, op._doc, upsert=op._upsert)
+
+    def find_one_and_delete(self, query, projection=None):
+        return self.docs.pop(query['_id'], None)
+
+    def find_one(self, query, projection=None):
+        cutoff = query['expires_at']['$gt']
+        return next((doc for doc in self.docs.values()
+                     if doc.get('principal') == query['principal'] and doc['expires_at'] > cutoff), None)
+
+    def aggregate(self, pipeline):
+        match, group = pipeline
+        cutoff = match['$match']['expires_at']['$gt']
+        totals = {}
+        for doc in self.docs.values():
+            if doc['expires_at'] > cutoff:
+                totals[doc['role']] = totals.get(doc['role'], 0) + 1
+        return [{'_id': role, 'count': count} for role, count in totals.items()]
+
+    def delete_many(self, query):
+        self.docs.clear()
+
+
+@pytest.fixture
+def mongo_backend(monkeypatch):
+    collection = FakeActiveSockets()
+    monkeypatch.setattr(active_counters.MongoCounterBackend, '_collection', staticmethod(lambda: collection))
+    return active_counters.MongoCounterBackend(), collection
+
+
+def test_mongo_backend_counts_live_sockets_per_role(mongo_backend):
+    backend, _ = mongo_backend
+    later = time.monotonic() + 60
+    backend.add('sid-1', 'user', None, later)
+    backend.add('sid-2', 'seller', None, later)
+    backend.touch({'sid-3': ('user', None), 'sid-1': ('user', None)}, later)
+    assert backend.counts(time.monotonic()) == {'users': 2, 'sellers': 1, 'masters': 0, 'outlets': 0}
+
+    assert backend.remove('sid-2') == 'seller'
+    assert backend.remove('sid-2') is None
+    assert backend.counts(time.monotonic())['sellers'] == 0
+
+
+def test_mongo_backend_ignores_expired_sockets(mongo_backend):
+    backend, collection = mongo_backend
+    backend.add('sid-old', 'user', None, time.monotonic() - 1)
+    backend.add('sid-new', 'user', None, time.monotonic() + 60)
+    assert backend.counts(time.monotonic())['users'] == 1
+    # A heartbeat touch revives a socket whose expiry passed
+    backend.touch({'sid-old': ('user', None)}, time.monotonic() + 60)
+    assert backend.counts(time.monotonic())['users'] == 2
+    assert set(collection.docs) == {'sid-old', 'sid-new'}
+
+
+def test_mongo_backend_answers_presence_across_workers(mongo_backend):
+    # Two workers share the collection: each holds one of the seller's sockets
+    worker_a, collection = mongo_backend
+    worker_b = active_counters.MongoCounterBackend()
+    later = time.monotonic() + 60
+    worker_a.add('sid-a', 'seller', 'seller:s1', later)
+    worker_b.add('sid-b', None, 'seller:s1', later)
+
+    worker_a.remove('sid-a')
+    assert worker_a.principal_online('seller:s1', time.monotonic())
+    worker_b.remove('sid-b')
+    assert not worker_a.principal_online('seller:s1', time.monotonic())
+
+    # A socket of a crashed worker stops counting once it expires
+    worker_b.add('sid-c', None, 'seller:s1', time.monotonic() - 1)
+    assert not worker_a.principal_online('seller:s1', time.monotonic())
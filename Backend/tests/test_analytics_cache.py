@@ -0,0 +1,82 @@
+"""
+Analytics result cache tests
+"""
+from app.services.analytics_cache import cached_analytics, invalidate_analytics_cache, mark_analytics_failure
+
+
+def _counting_endpoint():
+    calls = []
+
+    @cached_analytics('test-endpoint')
+    def compute(period='monthly', start_date=None, end_date=None, limit=5):
+        calls.append((period, start_date, end_date, limit))
+        return {'period': period, 'limit': limit}
+
+    return compute, calls
+
+
+def test_repeated_calls_served_from_cache():
+    invalidate_analytics_cache()
+    compute, calls = _counting_endpoint()
+    assert compute('daily') == compute(period='daily')
+    assert len(calls) == 1
+
+
+def test_key_includes_dates_and_extra_args():
+    invalidate_analytics_cache()
+    compute, calls = _counting_endpoint()
+    compute('daily')
+    compute('daily', start_date='2026-01-01', end_date='2026-01-31')
+    compute('daily', limit=10)
+    assert len(calls) == 3
+
+
+def test_invalidate_forces_recompute():
+    invalidate_analytics_cache()
+    compute, calls = _counting_endpoint()
+    compute('weekly')
+    invalidate_analytics_cache()
+    compute('weekly')
+    assert len(calls) == 2
+
+
+def test_failed_results_are_not_cached():
+    invalidate_analytics_cache()
+    calls = []
+    healthy = []
+
+    @cached_analytics('flaky-endpoint')
+    def compute(period='monthly', start_date=None, end_date=None):
+        calls.append(period)
+        try:
+            if not healthy:
+                raise RuntimeError('mongo down')
+            return ['real']
+        except Exception:
+            mark_analytics_failure()
+            return []
+
+    assert compute('daily') == []
+    healthy.append(True)
+    assert compute('daily') == ['real']
+    assert compute('daily') == ['real']
+    assert len(calls) == 2
+
+
+def test_failure_in_a_nested_cached_call_taints_the_caller():
+    invalidate_analytics_cache()
+    outer_calls = []
+
+    @cached_analytics('inner-endpoint')
+    def inner(period='monthly', start_date=None, end_date=None):
+        mark_analytics_failure()
+        return 0
+
+    @cached_analytics('outer-endpoint')
+    def outer(period='monthly', start_date=None, end_date=None):
+        outer_calls.append(period)
+        return {'inner': inner(period)}
+
+    outer('daily')
+    outer('daily')
+    assert len(outer_calls) == 2
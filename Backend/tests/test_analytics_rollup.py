@@ -0,0 +1,308 @@
+"""
+Tests for the analytics_daily rollup buckets and guarded order status transitions
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from app import mongo
+from app.services import analytics_rollup_service, order_service
+from app.services.analytics_rollup_service import AnalyticsRollupService
+from app.services.order_service import OrderService
+
+CREATED_AT = datetime(2026, 3, 14, 10, 0, tzinfo=timezone.utc)
+SELLER_ID = ObjectId()
+
+
+class FakeRollups:
+    """analytics_daily: applies the $inc of upserted UpdateOne operations."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            doc = self.docs.setdefault(op._filter['_id'], {'orders': 0, 'revenue': 0.0})
+            for field, amount in op._doc['$inc'].items():
+                doc[field] += amount
+
+    def bucket(self, key):
+        return self.docs.get(key, {'orders': 0, 'revenue': 0.0})
+
+
+class FakeMarkers:
+    """cache_versions: the rebuild marker document."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find_one(self, query, projection=None):
+        doc = self.docs.get(query['_id'])
+        if doc and all(doc.get(k) == v for k, v in query.items() if k != '_id'):
+            return dict(doc)
+        return None
+
+    def update_one(self, query, update, upsert=False):
+        if query['_id'] in self.docs or upsert:
+            self.docs.setdefault(query['_id'], {'_id': query['_id']}).update(update['$set'])
+
+
+class FakeOrders:
+    """orders collection honouring the status guard; `interfere` runs before the first update."""
+
+    def __init__(self, doc, interfere=None):
+        self.doc = doc
+        self.interfere = interfere
+
+    def find_one(self, query, projection=None):
+        return dict(self.doc) if query.get('_id') == self.doc['_id'] else None
+
+    def update_one(self, query, update):
+        if self.interfere:
+            self.interfere(self.doc)
+            self.interfere = None
+        expected = query.get('status')
+        allowed = expected['$in'] if isinstance(expected, dict) else [expected]
+        matched = query['_id'] == self.doc['_id'] and self.doc.get('status') in allowed
+        if matched:
+            self.doc.update(update.get('$set', {}))
+        return type('Result', (), {'matched_count': int(matched), 'modified_count': int(matched)})()
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getattr__(self, name):
+        return self.collections[name]
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+@pytest.fixture
+def rollups(monkeypatch):
+    fake = FakeRollups()
+    monkeypatch.setattr(mongo, 'db', FakeDB(analytics_daily=fake, cache_versions=FakeMarkers()))
+    monkeypatch.setattr(analytics_rollup_service, 'invalidate_analytics_cache', lambda: None)
+    return fake
+
+
+def _order(**fields):
+    return {
+        '_id': ObjectId(), 'type': 'product', 'created_at': CREATED_AT, 'seller_id': SELLER_ID,
+        'total_amount': 120.0, 'product_snapshot': {'categories': ['Books']}, **fields,
+    }
+
+
+def test_status_change_moves_order_between_day_buckets(rollups):
+    AnalyticsRollupService.record_status_change(_order(), 'pending_seller', 'seller_accepted')
+    assert rollups.bucket('2026-03-14|status|pending_seller')['orders'] == -1
+    assert rollups.bucket('2026-03-14|status|seller_accepted')['orders'] == 1
+    assert '2026-03-14|sales|all' not in rollups.docs
+
+
+def test_days_follow_ist_boundaries(rollups):
+    # 18:30 UTC is midnight IST: the order belongs to the next day
+    AnalyticsRollupService.record_status_change(
+        _order(created_at=datetime(2026, 3, 14, 18, 30, tzinfo=timezone.utc)), 'pending_seller', 'seller_accepted'
+    )
+    AnalyticsRollupService.record_status_change(
+        _order(created_at=datetime(2026, 3, 14, 18, 29, tzinfo=timezone.utc)), 'pending_seller', 'seller_accepted'
+    )
+    assert rollups.bucket('2026-03-15|status|seller_accepted')['orders'] == 1
+    assert rollups.bucket('2026-03-14|status|seller_accepted')['orders'] == 1
+    # A filter for the IST day 2026-03-15 selects exactly that bucket day
+    ist = analytics_rollup_service.IST
+    day_filter = AnalyticsRollupService.day_filter({
+        '$gte': datetime(2026, 3, 15, tzinfo=ist), '$lte': datetime(2026, 3, 15, 23, 59, 59, tzinfo=ist)
+    })
+    assert day_filter == {'$gte': datetime(2026, 3, 15, tzinfo=timezone.utc),
+                          '$lte': datetime(2026, 3, 15, tzinfo=timezone.utc)}
+
+
+def test_completion_counts_revenue_and_reopening_reverses_it(rollups):
+    order = _order()
+    AnalyticsRollupService.record_status_change(order, 'handed_over', 'completed')
+    for key in ('2026-03-14|sales|all', '2026-03-14|category|Books', f'2026-03-14|seller|{SELLER_ID}'):
+        assert rollups.bucket(key) == {'orders': 1, 'revenue': 120.0}
+
+    AnalyticsRollupService.record_status_change(order, 'completed', 'cancelled_master')
+    assert rollups.bucket('2026-03-14|sales|all') == {'orders': 0, 'revenue': 0.0}
+    assert rollups.bucket('2026-03-14|status|completed')['orders'] == 0
+
+
+def test_no_op_transitions_and_service_orders_are_not_counted(rollups):
+    AnalyticsRollupService.record_status_change(_order(), 'completed', 'completed')
+    AnalyticsRollupService.record_status_change(_order(), 'pending_seller', None)
+    AnalyticsRollupService.record_status_change(_order(type='service'), 'pending_seller', 'completed')
+    assert rollups.docs == {}
+
+
+def test_lost_status_race_is_retried_from_the_new_status(monkeypatch, rollups):
+    doc = _order(status='pending_seller', status_history=[])
+    # Another request accepts the order between our read and our write
+    orders = FakeOrders(doc, interfere=lambda d: d.update(status='seller_accepted'))
+    monkeypatch.setattr(mongo, 'db', FakeDB(analytics_daily=rollups, orders=orders, cache_versions=FakeMarkers()))
+    monkeypatch.setattr(order_service, 'invalidate_analytics_cache', lambda: None)
+    monkeypatch.setattr(order_service, '_last_expiry_check', datetime.now(timezone.utc))
+
+    updated = OrderService.update_order_status(str(doc['_id']), 'cancelled', updated_by='master')
+
+    assert updated.status == 'cancelled'
+    # Only the status the write actually replaced is decremented
+    assert '2026-03-14|status|pending_seller' not in rollups.docs
+    assert rollups.bucket('2026-03-14|status|seller_accepted')['orders'] == -1
+    assert rollups.bucket('2026-03-14|status|cancelled')['orders'] == 1
+
+
+def test_status_guard_matches_legacy_pending_orders():
+    oid = ObjectId()
+    assert order_service._status_guard(oid, 'pending_seller') == {
+        '_id': oid, 'status': {'$in': ['pending_seller', None]}
+    }
+    assert order_service._status_guard(oid, 'handed_over') == {'_id': oid, 'status': 'handed_over'}
+
+
+# --- rebuild(): side collections swapped in, concurrent updates journaled and replayed ---
+
+class MemoryCollection:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.docs = {}
+
+    def _matches(self, doc, query):
+        for field, expected in query.items():
+            if isinstance(expected, dict) and '$in' in expected:
+                if doc.get(field) not in expected['$in']:
+                    return False
+            elif doc.get(field) != expected:
+                return False
+        return True
+
+    def find(self, query=None, projection=None):
+        return MemoryCursor([dict(doc) for doc in self.docs.values() if self._matches(doc, query or {})])
+
+    def find_one(self, query, projection=None):
+        return next(iter(self.find(query)), None)
+
+    def insert_one(self, doc):
+        doc.setdefault('_id', ObjectId())
+        self.docs[doc['_id']] = dict(doc)
+
+    def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            self.insert_one(doc)
+
+    def delete_many(self, query):
+        for doc_id in [doc_id for doc_id, doc in self.docs.items() if self._matches(doc, query)]:
+            del self.docs[doc_id]
+
+    def update_one(self, query, update, upsert=False):
+        doc = self.find_one(query)
+        if doc is None and not upsert:
+            return
+        doc = self.docs.setdefault(query['_id'], {'_id': query['_id']})
+        doc.update(update.get('$set', {}))
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        before = self.docs.get(query['_id'])
+        doc = self.docs.setdefault(query['_id'], {'_id': query['_id'], **update.get('$setOnInsert', {})})
+        doc.update(update.get('$set', {}))
+        for field, amount in update.get('$inc', {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        return dict(before) if before else None
+
+    def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            doc = self.docs.setdefault(op._filter['_id'], {'_id': op._filter['_id'], **op._doc['$setOnInsert']})
+            for field, amount in op._doc['$inc'].items():
+                doc[field] = doc.get(field, 0) + amount
+
+    def create_index(self, keys, **options):
+        self.db.collections.setdefault(self.name, self)
+
+    def drop(self):
+        self.db.collections.pop(self.name, None)
+
+    def rename(self, new_name, dropTarget=False):
+        self.db.collections.pop(self.name)
+        self.name = new_name
+        self.db.collections[new_name] = self
+
+
+class MemoryCursor(list):
+    def sort(self, *args):
+        return self
+
+
+class MemoryDB:
+    def __init__(self):
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection(self, name)
+        return self.collections[name]
+
+    __getattr__ = __getitem__
+
+
+class ChangingOrders(MemoryCollection):
+    """orders whose scan runs `during_scan` after yielding the first order (a concurrent request)."""
+
+    during_scan = None
+
+    def find(self, query=None, projection=None):
+        docs = sorted(super().find(query), key=lambda doc: doc['created_at'])
+
+        def scan():
+            for index, doc in enumerate(docs):
+                # Read each order when the cursor reaches it, like a real cursor batch
+                yield dict(self.docs[doc['_id']])
+                if index == 0 and self.during_scan:
+                    self.during_scan()
+
+        cursor = MemoryCursor()
+        cursor.sort = lambda *args: scan()
+        return cursor
+
+
+def test_rebuild_keeps_updates_made_while_it_runs(monkeypatch):
+    db = MemoryDB()
+    orders = ChangingOrders(db, 'orders')
+    db.collections['orders'] = orders
+    monkeypatch.setattr(mongo, 'db', db)
+    monkeypatch.setattr(analytics_rollup_service, 'invalidate_analytics_cache', lambda: None)
+    monkeypatch.setattr(analytics_rollup_service, 'REBUILD_GRACE_SECONDS', 0)
+
+    scanned_first = _order(status='pending_seller', user_id='u1')
+    scanned_later = _order(status='completed', user_id='u2', created_at=CREATED_AT + timedelta(hours=1))
+    orders.insert_many([scanned_first, scanned_later])
+    # Stale live rollups that the rebuild replaces
+    db['analytics_daily'].insert_one({'_id': '2026-03-14|status|pending_seller', 'orders': 99, 'revenue': 0.0})
+    created_during = _order(status='pending_seller', user_id='u1', created_at=CREATED_AT + timedelta(hours=2))
+
+    def concurrent_requests():
+        # Accept an order the scan already counted, cancel one it has not read yet, place a new one
+        orders.docs[scanned_first['_id']]['status'] = 'seller_accepted'
+        AnalyticsRollupService.record_status_change(scanned_first, 'pending_seller', 'seller_accepted')
+        orders.docs[scanned_later['_id']]['status'] = 'cancelled_master'
+        AnalyticsRollupService.record_status_change(scanned_later, 'completed', 'cancelled_master')
+        AnalyticsRollupService.record_new_order(created_during)
+
+    orders.during_scan = concurrent_requests
+    assert AnalyticsRollupService.rebuild() == 2
+
+    buckets = {key: doc['orders'] for key, doc in db['analytics_daily'].docs.items()}
+    assert buckets['2026-03-14|status|pending_seller'] == 1
+    assert buckets['2026-03-14|status|seller_accepted'] == 1
+    assert buckets['2026-03-14|status|cancelled_master'] == 1
+    assert buckets.get('2026-03-14|status|completed', 0) == 0
+    assert buckets.get('2026-03-14|sales|all', 0) == 0
+    assert buckets['2026-03-14|customer|new'] == 2
+    assert db['analytics_customers'].docs['u1']['order_count'] == 2
+    assert db['analytics_rollup_journal'].docs == {}
+    assert 'analytics_daily_rebuild' not in db.collections
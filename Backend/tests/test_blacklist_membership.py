@@ -0,0 +1,30 @@
+"""
+Tests for the in-memory blacklist membership set
+"""
+import pytest
+
+from app.services import blacklist_service
+from app.services.blacklist_service import BlacklistService, _entry_key
+
+
+@pytest.fixture
+def loaded_blacklist(monkeypatch):
+    monkeypatch.setattr(blacklist_service, '_loaded_version', 3)
+    monkeypatch.setattr(blacklist_service, '_blacklisted', {('seller', 'a1'), ('outlet_man', 'b2')})
+
+
+def test_entry_keys_cover_legacy_seller_entries():
+    assert _entry_key({'user_id': 'x', 'user_type': 'outlet_man'}) == ('outlet_man', 'x')
+    assert _entry_key({'seller_id': 'y'}) == ('seller', 'y')
+    assert _entry_key({}) is None
+
+
+def test_membership_is_per_user_type(loaded_blacklist):
+    assert BlacklistService.is_blacklisted('a1')
+    assert BlacklistService.is_blacklisted('b2', 'outlet_man')
+    assert not BlacklistService.is_blacklisted('b2')
+
+
+def test_blacklisted_ids_filter_by_type(loaded_blacklist):
+    assert BlacklistService.get_all_blacklisted_ids('seller') == ['a1']
+    assert sorted(BlacklistService.get_all_blacklisted_ids()) == ['a1', 'b2']
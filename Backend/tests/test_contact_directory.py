@@ -0,0 +1,152 @@
+"""
+Tests for contact normalization and the contact directory cache
+"""
+import pytest
+from bson import ObjectId
+
+from app import mongo
+from app.services.user_service import UserService
+from app.utils.contact_directory import (
+    clear_contact_cache,
+    normalize_email,
+    normalize_phone_number,
+    resolve_by_email,
+    resolve_by_phone,
+)
+
+
+def test_ten_digit_numbers_get_india_prefix():
+    assert normalize_phone_number('98450 12345') == '+919845012345'
+    assert normalize_phone_number('(984) 501-2345') == '+919845012345'
+
+
+def test_international_numbers_keep_country_code():
+    assert normalize_phone_number('+1 415 555 0100') == '+14155550100'
+    assert normalize_phone_number('919845012345') == '+919845012345'
+    assert normalize_phone_number('') is None
+
+
+def test_email_normalization():
+    assert normalize_email('  Buyer@Example.COM ') == 'buyer@example.com'
+    assert normalize_email(None) is None
+
+
+def _matches(doc, query):
+    for field, expected in query.items():
+        if field == '$or':
+            if not any(_matches(doc, clause) for clause in expected):
+                return False
+        elif isinstance(expected, dict) and '$in' in expected:
+            if doc.get(field) not in expected['$in']:
+                return False
+        elif doc.get(field) != expected:
+            return False
+    return True
+
+
+class FakeCollection:
+    def __init__(self, *docs):
+        self.docs = [{'_id': ObjectId(), **doc} for doc in docs]
+        self.queries = []
+
+    def find_one(self, query, projection=None):
+        self.queries.append(query)
+        return next((dict(doc) for doc in self.docs if _matches(doc, query)), None)
+
+    def insert_one(self, doc):
+        doc.setdefault('_id', ObjectId())
+        self.docs.append(dict(doc))
+        return type('Result', (), {'inserted_id': doc['_id']})()
+
+    def update_one(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update['$set'])
+                return type('Result', (), {'matched_count': 1})()
+        return type('Result', (), {'matched_count': 0})()
+
+
+@pytest.fixture
+def directory(monkeypatch):
+    collections = {
+        'users': FakeCollection(),
+        'sellers': FakeCollection(),
+        'outlet_men': FakeCollection(),
+        'master': FakeCollection(),
+    }
+
+    class FakeDB:
+        def __getattr__(self, name):
+            return collections[name]
+
+        def __getitem__(self, name):
+            return collections[name]
+
+    monkeypatch.setattr(mongo, 'db', FakeDB())
+    clear_contact_cache()
+    yield collections
+    clear_contact_cache()
+
+
+def _probes(collections):
+    return sum(len(collection.queries) for collection in collections.values())
+
+
+def test_roles_are_probed_in_precedence_order(directory):
+    directory['sellers'].docs.append({'_id': ObjectId(), 'seller_phone': '+919845012345'})
+    directory['outlet_men'].docs.append({'_id': ObjectId(), 'phone_number': '+919845012345'})
+    doc, role = resolve_by_phone('98450 12345')
+    assert role == 'seller'
+    # Users come first; outlet men are never reached
+    assert len(directory['users'].queries) == 1 and directory['outlet_men'].queries == []
+
+    directory['users'].docs.append({'_id': ObjectId(), 'phone_number': '9845012345'})
+    clear_contact_cache()
+    _, role = resolve_by_phone('9845012345')
+    assert role == 'user'
+
+
+def test_cache_hit_costs_one_id_lookup(directory):
+    directory['sellers'].docs.append({'_id': ObjectId(), 'email': 'shop@college.edu'})
+    first, _ = resolve_by_email('Shop@College.edu')
+    before = _probes(directory)
+
+    doc, role = resolve_by_email('shop@college.edu')
+    assert (doc['_id'], role) == (first['_id'], 'seller')
+    assert _probes(directory) == before + 1
+    assert directory['sellers'].queries[-1] == {'_id': first['_id']}
+
+
+def test_stale_cache_hit_falls_back_to_a_full_lookup(directory):
+    old_owner = {'_id': ObjectId(), 'phone_number': '+919845012345'}
+    directory['users'].docs.append(old_owner)
+    resolve_by_phone('+919845012345')
+
+    # The number moves to a seller without going through the services
+    old_owner['phone_number'] = '+919999999999'
+    directory['sellers'].docs.append({'_id': ObjectId(), 'phone_number': '+919845012345'})
+    doc, role = resolve_by_phone('+919845012345')
+    assert role == 'seller' and doc['phone_number'] == '+919845012345'
+
+    old_owner.clear()
+    directory['sellers'].docs.clear()
+    assert resolve_by_phone('+919845012345') == (None, None)
+
+
+def test_creating_a_user_takes_over_a_cached_contact(directory):
+    directory['sellers'].docs.append({'_id': ObjectId(), 'email': 'both@college.edu'})
+    assert resolve_by_email('both@college.edu')[1] == 'seller'
+
+    UserService.create_user({'username': 'u1', 'email': 'both@college.edu', 'password_hash': 'x'})
+    assert resolve_by_email('both@college.edu')[1] == 'user'
+
+
+def test_updating_a_users_email_invalidates_the_cached_contact(directory):
+    directory['sellers'].docs.append({'_id': ObjectId(), 'email': 'new@college.edu'})
+    user = {'_id': ObjectId(), 'username': 'u1', 'email': 'old@college.edu'}
+    directory['users'].docs.append(user)
+    assert resolve_by_email('new@college.edu')[1] == 'seller'
+
+    UserService.update_user(str(user['_id']), {'email': 'new@college.edu'})
+    doc, role = resolve_by_email('new@college.edu')
+    assert role == 'user' and doc['_id'] == user['_id']
@@ -0,0 +1,113 @@
+"""
+Tests for the pooled SMTP sender against a local SMTP stand-in
+"""
+import socketserver
+import threading
+
+import pytest
+
+from app.utils.email import EmailService, SMTPConnectionPool
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib.sendmail (no TLS, no AUTH)."""
+
+    def _reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self._reply('220 standin ESMTP')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self._reply('250 standin')
+            elif verb == 'MAIL':
+                recipients = []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                address = command.split(':', 1)[1].strip().strip('<>')
+                if address in server.rejected:
+                    self._reply('550 No such user')
+                else:
+                    recipients.append(address)
+                    self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline().rstrip(b'\r\n') != b'.':
+                    pass
+                server.delivered.extend(recipients)
+                self._reply('250 OK')
+                if server.drop_after_each_message:
+                    return
+            elif verb in ('NOOP', 'RSET'):
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Not implemented')
+
+
+@pytest.fixture
+def smtp_standin():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.delivered = []
+    server.rejected = set()
+    server.drop_after_each_message = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _pool(server):
+    return SMTPConnectionPool('127.0.0.1', server.server_address[1], size=2, starttls=False)
+
+
+def _messages(*recipients):
+    return [{'to_email': to, 'subject': 'Order update', 'body_text': 'Hello'} for to in recipients]
+
+
+def test_connection_is_reused_across_sends(smtp_standin):
+    pool = _pool(smtp_standin)
+    for to in ('a@example.com', 'b@example.com', 'c@example.com'):
+        assert EmailService.send_with_pool(pool, 'shop@example.com', _messages(to)) == [
+            (True, 'Email sent successfully')
+        ]
+    assert smtp_standin.delivered == ['a@example.com', 'b@example.com', 'c@example.com']
+    assert pool.connections_opened == 1
+    pool.close()
+
+
+def test_batch_send_reports_each_recipient(smtp_standin):
+    smtp_standin.rejected.add('gone@example.com')
+    pool = _pool(smtp_standin)
+    results = EmailService.send_with_pool(
+        pool, 'shop@example.com', _messages('a@example.com', 'gone@example.com', 'b@example.com')
+    )
+    assert [ok for ok, _ in results] == [True, False, True]
+    assert smtp_standin.delivered == ['a@example.com', 'b@example.com']
+    assert pool.connections_opened == 1
+    pool.close()
+
+
+def test_reconnects_after_server_drops_connection(smtp_standin):
+    smtp_standin.drop_after_each_message = True
+    pool = _pool(smtp_standin)
+    results = EmailService.send_with_pool(
+        pool, 'shop@example.com', _messages('a@example.com', 'b@example.com', 'c@example.com')
+    )
+    assert results == [(True, 'Email sent successfully')] * 3
+    assert smtp_standin.delivered == ['a@example.com', 'b@example.com', 'c@example.com']
+    assert pool.connections_opened == 3
+    pool.close()
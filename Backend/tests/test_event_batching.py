@@ -0,0 +1,38 @@
+"""
+Tests for socket event coalescing
+"""
+from app.sockets.emitter import EventBatch, batch_payload
+
+
+def test_batch_coalesces_per_event_and_item():
+    batch = EventBatch()
+    batch.add('product_updated', {'id': 'p1', 'price': 10})
+    batch.add('product_updated', {'id': 'p2', 'price': 20})
+    batch.add('product_updated', {'id': 'p1', 'price': 11})
+    batch.add('product_deleted', {'id': 'p2'})
+
+    assert len(batch) == 3
+    assert batch.drain() == [
+        ('product_updated', {'id': 'p2', 'price': 20}),
+        ('product_updated', {'id': 'p1', 'price': 11}),
+        ('product_deleted', {'id': 'p2'}),
+    ]
+    assert len(batch) == 0
+
+
+def test_payloads_without_id_are_never_merged():
+    batch = EventBatch()
+    batch.add('service_deleted', {'reason': 'a'})
+    batch.add('service_deleted', {'reason': 'b'})
+    assert len(batch) == 2
+
+
+def test_batch_payload_shape():
+    payload = batch_payload([('product_updated', {'id': 'p1'}), ('product_created', {'id': 'p2'})])
+    assert payload == {
+        'count': 2,
+        'events': [
+            {'event': 'product_updated', 'data': {'id': 'p1'}},
+            {'event': 'product_created', 'data': {'id': 'p2'}},
+        ],
+    }
@@ -0,0 +1,190 @@
+"""
+Tests for the in-memory login token buckets and the failed-login counters
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app import mongo
+from app.services import security_service
+from app.services.security_service import (
+    IP_FAILURE_THRESHOLD,
+    LOGIN_BUCKET_CAPACITY,
+    USER_FAILURE_THRESHOLD,
+    SecurityService,
+    TokenBucketLimiter,
+)
+
+
+def test_burst_up_to_capacity_then_wait():
+    limiter = TokenBucketLimiter(capacity=3, refill_per_second=1)
+    assert [limiter.take('1.2.3.4', now=100.0) for _ in range(3)] == [0, 0, 0]
+    assert limiter.take('1.2.3.4', now=100.0) == 1
+
+
+def test_tokens_refill_over_time():
+    limiter = TokenBucketLimiter(capacity=2, refill_per_second=0.5)
+    limiter.take('ip', now=0.0)
+    limiter.take('ip', now=0.0)
+    assert limiter.take('ip', now=1.0) > 0
+    assert limiter.take('ip', now=3.0) == 0
+
+
+def test_wait_does_not_spend_tokens():
+    limiter = TokenBucketLimiter(capacity=1, refill_per_second=1)
+    assert limiter.wait('ip', now=0.0) == 0
+    assert limiter.wait('ip', now=0.0) == 0
+    limiter.take('ip', now=0.0)
+    assert limiter.wait('ip', now=0.5) == 0.5
+
+
+def test_keys_are_independent_and_bounded():
+    limiter = TokenBucketLimiter(capacity=1, refill_per_second=1, max_keys=2)
+    assert limiter.take('a', now=0.0) == 0
+    assert limiter.take('b', now=0.0) == 0
+    assert limiter.take('a', now=0.0) > 0
+    limiter.take('c', now=0.0)
+    assert len(limiter._buckets) == 2
+
+
+def test_client_ip_ignores_spoofed_forwarded_entries():
+    app = Flask(__name__)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+    @app.route('/ip')
+    def client_ip():
+        return SecurityService.get_client_ip(request)
+
+    client = app.test_client()
+    # The proxy appends the address it saw; anything before that came from the client
+    for spoofed in ('1.1.1.1', '2.2.2.2'):
+        response = client.get('/ip', headers={'X-Forwarded-For': f'{spoofed}, 203.0.113.7'},
+                              environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        assert response.get_data(as_text=True) == '203.0.113.7'
+
+
+def test_client_ip_ignores_forwarded_header_without_trusted_proxies():
+    app = Flask(__name__)
+
+    @app.route('/ip')
+    def client_ip():
+        return SecurityService.get_client_ip(request)
+
+    response = app.test_client().get('/ip', headers={'X-Forwarded-For': '1.1.1.1'},
+                                     environ_base={'REMOTE_ADDR': '203.0.113.7'})
+    assert response.get_data(as_text=True) == '203.0.113.7'
+
+
+# --- Failed-login counters: a small evaluator for the aggregation-pipeline updates ---
+
+def _value(expr, doc):
+    if isinstance(expr, str) and expr.startswith('$'):
+        return doc.get(expr[1:])
+    if isinstance(expr, dict):
+        (op, args), = expr.items()
+        values = [_value(arg, doc) for arg in args]
+        if op == '$add':
+            return sum(values)
+        if op == '$cond':
+            return values[1] if values[0] else values[2]
+        if op == '$ifNull':
+            return values[1] if values[0] is None else values[0]
+        if op == '$and':
+            return all(values)
+        if op == '$eq':
+            return values[0] == values[1]
+        # Comparisons: null sorts before numbers and dates
+        left, right = values
+        if left is None or right is None:
+            return op == '$gt' and right is None and left is not None
+        return left > right if op == '$gt' else left >= right
+    return expr
+
+
+class PipelineCollection:
+    def __init__(self, docs=None):
+        self.docs = docs or []
+
+    def find_one(self, query, projection=None):
+        return next((doc for doc in self.docs if all(doc.get(k) == v for k, v in query.items())), None)
+
+    def update_one(self, query, update, upsert=False):
+        doc = self.find_one(query)
+        if doc is None:
+            if not upsert:
+                return
+            doc = dict(query)
+            self.docs.append(doc)
+        if isinstance(update, list):
+            for stage in update:
+                doc.update({field: _value(expr, doc) for field, expr in stage['$set'].items()})
+        else:
+            doc.update(update['$set'])
+
+
+@pytest.fixture
+def security_db(monkeypatch):
+    collections = {
+        'ip_security': PipelineCollection(),
+        'users': PipelineCollection([{'username': 'u1'}]),
+    }
+
+    class FakeDB:
+        def __getattr__(self, name):
+            return collections[name]
+
+        def __getitem__(self, name):
+            return collections[name]
+
+    monkeypatch.setattr(mongo, 'db', FakeDB())
+    monkeypatch.setattr(security_service, '_login_limiter', TokenBucketLimiter(LOGIN_BUCKET_CAPACITY, 0.5))
+    return collections
+
+
+def _fail(times, ip='203.0.113.7'):
+    for _ in range(times):
+        SecurityService.record_failed_login(ip, 'users', 'username', 'u1')
+
+
+def test_user_is_blocked_at_the_failure_threshold(security_db):
+    _fail(USER_FAILURE_THRESHOLD - 1)
+    user = security_db['users'].docs[0]
+    assert user['failed_login_count'] == USER_FAILURE_THRESHOLD - 1
+    assert not user['blocked_until']
+
+    _fail(1)
+    assert user['failed_login_count'] == 0
+    assert user['blocked_until'] > datetime.now(timezone.utc)
+    assert user['daily_blocks'] == 1
+    allowed, error = SecurityService.check_login_allowed('203.0.113.7', 'users', 'username', 'u1')
+    assert not allowed and error.startswith('BLOCKED_UNTIL:')
+
+
+def test_ip_block_repeats_into_a_permanent_pause(security_db):
+    _fail(IP_FAILURE_THRESHOLD)
+    ip_record = security_db['ip_security'].docs[0]
+    assert ip_record['total_blocks'] == 1 and not ip_record['is_permanently_blocked']
+
+    _fail(IP_FAILURE_THRESHOLD)
+    assert ip_record['is_permanently_blocked'] is True
+
+
+def test_failure_count_starts_over_outside_the_window(security_db):
+    _fail(3)
+    user = security_db['users'].docs[0]
+    user['last_failed_login_at'] = datetime.now(timezone.utc) - timedelta(hours=2)
+    _fail(1)
+    assert user['failed_login_count'] == 1
+
+
+def test_only_failures_spend_login_tokens(security_db):
+    for _ in range(LOGIN_BUCKET_CAPACITY * 2):
+        allowed, _ = SecurityService.check_login_allowed('198.51.100.1', 'users', 'username', 'nobody')
+        assert allowed
+
+    _fail(LOGIN_BUCKET_CAPACITY, ip='198.51.100.1')
+    assert security_service._login_limiter.wait('198.51.100.1') > 0
+    allowed, error = SecurityService.check_login_allowed('198.51.100.1', 'users', 'username', 'nobody')
+    assert not allowed and error.startswith('BLOCKED_UNTIL:')
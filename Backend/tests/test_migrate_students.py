@@ -0,0 +1,53 @@
+"""
+Tests for the streaming reader and checkpoints of the student import
+"""
+import json
+
+import pytest
+
+from migrate_students import iter_json_array, load_checkpoint, save_checkpoint
+
+
+def test_streams_array_across_small_chunks(tmp_path):
+    students = [{'rollNo': 1000 + i, 'dob': '01-01-2005', 'studentName': 'Student ' + 'x' * i} for i in range(50)]
+    path = tmp_path / 'students.json'
+    path.write_text(json.dumps(students, indent=2), encoding='utf-8')
+    assert list(iter_json_array(str(path), chunk_size=7)) == students
+
+
+def test_empty_array(tmp_path):
+    path = tmp_path / 'students.json'
+    path.write_text(' [ ] ', encoding='utf-8')
+    assert list(iter_json_array(str(path))) == []
+
+
+def test_checkpoint_round_trip(tmp_path):
+    checkpoint = str(tmp_path / 'students.json.checkpoint')
+    assert load_checkpoint(checkpoint) == 0
+    save_checkpoint(checkpoint, 1500)
+    assert load_checkpoint(checkpoint) == 1500
+
+
+def test_many_elements_in_one_chunk_are_not_recopied(tmp_path, monkeypatch):
+    students = [{'rollNo': i, 'dob': '01-01-2005'} for i in range(2000)]
+    path = tmp_path / 'students.json'
+    path.write_text(json.dumps(students), encoding='utf-8')
+
+    decode_calls = []
+    real_raw_decode = json.JSONDecoder.raw_decode
+
+    def raw_decode(self, s, idx=0):
+        decode_calls.append(len(s))
+        return real_raw_decode(self, s, idx)
+
+    monkeypatch.setattr(json.JSONDecoder, 'raw_decode', raw_decode)
+    assert list(iter_json_array(str(path))) == students
+    # The whole file fits in one chunk: every element is decoded from that same buffer
+    assert set(decode_calls) == {path.stat().st_size}
+
+
+def test_truncated_array_is_rejected(tmp_path):
+    path = tmp_path / 'students.json'
+    path.write_text('[{"rollNo": 1}, ', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path), chunk_size=4))
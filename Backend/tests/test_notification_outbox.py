@@ -0,0 +1,240 @@
+"""
+Tests for notification outbox claims, retry scheduling and per-channel delivery
+"""
+from datetime import datetime, timedelta, timezone
+
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from firebase_admin import messaging
+
+from app import mongo
+from app.services import notification_outbox_service
+from app.services.notification_outbox_service import (
+    CLAIM_LEASE_SECONDS,
+    OUTBOX_COLLECTION,
+    RETRY_BASE_SECONDS,
+    RETRY_MAX_SECONDS,
+    NotificationOutboxService,
+    retry_delay_seconds,
+)
+from app.utils import email as email_module
+from app.utils import sms
+from app.utils.notifications import render_notification
+from app.utils.sms import SMSService
+
+
+def _matches(doc, query):
+    for field, expected in query.items():
+        if field == '$or':
+            if not any(_matches(doc, clause) for clause in expected):
+                return False
+        elif isinstance(expected, dict) and '$lte' in expected:
+            if doc.get(field) is None or doc[field] > expected['$lte']:
+                return False
+        elif doc.get(field) != expected:
+            return False
+    return True
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.docs = {}
+
+    def insert_one(self, doc):
+        doc['_id'] = ObjectId()
+        self.docs[doc['_id']] = doc
+        return type('Result', (), {'inserted_id': doc['_id']})()
+
+    def find_one(self, query):
+        return next((dict(doc) for doc in self.docs.values() if _matches(doc, query)), None)
+
+    def update_one(self, query, update):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                doc.update(update.get('$set', {}))
+                return
+
+    def find_one_and_update(self, query, update, sort=None, return_document=None):
+        candidates = sorted(
+            (doc for doc in self.docs.values() if _matches(doc, query)),
+            key=lambda doc: doc['next_attempt_at']
+        )
+        if not candidates:
+            return None
+        doc = candidates[0]
+        doc.update(update['$set'])
+        for field, amount in update.get('$inc', {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        return dict(doc)
+
+
+class FakeDB:
+    def __init__(self, outbox):
+        self.outbox = outbox
+
+    def __getitem__(self, name):
+        assert name == OUTBOX_COLLECTION
+        return self.outbox
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    fake = FakeOutbox()
+    monkeypatch.setattr(mongo, 'db', FakeDB(fake))
+    monkeypatch.setattr(notification_outbox_service._wakeup, 'set', lambda: None)
+    return fake
+
+
+@pytest.fixture
+def channels(monkeypatch):
+    """Known user recipient; records emails and socket emits, failures are switchable."""
+    state = {'email_error': None, 'emit_error': None, 'emails': [], 'emits': []}
+    user = {'_id': ObjectId(), 'email': 'buyer@college.edu', 'notifications_enabled': True}
+    monkeypatch.setattr(SMSService, '_find_user_or_seller_by_email', staticmethod(lambda email: (user, 'user')))
+    monkeypatch.setattr(SMSService, '_find_user_or_seller_by_phone', staticmethod(lambda phone: (user, 'user')))
+
+    def send_email(to_email, subject, body_text, body_html=None):
+        state['emails'].append(to_email)
+        return (False, state['email_error']) if state['email_error'] else (True, None)
+
+    def emit(event, payload, to=None):
+        if state['emit_error']:
+            raise RuntimeError(state['emit_error'])
+        state['emits'].append(to)
+
+    monkeypatch.setattr(email_module.EmailService, 'send_email', staticmethod(send_email))
+    monkeypatch.setattr(sms.socketio, 'emit', emit)
+    state['user'] = user
+    return state
+
+
+def _enqueue_and_claim(notification_type='order_accepted', **params):
+    params = params or {'order_number': 'ORD-1', 'product_name': 'Lamp', 'quantity': 1, 'delivery_note': ''}
+    notification = render_notification(notification_type, **params)
+    NotificationOutboxService.enqueue(notification, email='buyer@college.edu')
+    return NotificationOutboxService.claim_next()
+
+
+def _make_due(outbox, job):
+    outbox.docs[job['_id']]['next_attempt_at'] = datetime.now(timezone.utc)
+
+
+def test_retry_delay_doubles_per_attempt():
+    assert retry_delay_seconds(1) == RETRY_BASE_SECONDS
+    assert retry_delay_seconds(2) == RETRY_BASE_SECONDS * 2
+    assert retry_delay_seconds(3) == RETRY_BASE_SECONDS * 4
+
+
+def test_retry_delay_is_capped():
+    assert retry_delay_seconds(50) == RETRY_MAX_SECONDS
+
+
+def test_claim_leases_the_job_until_it_expires(outbox):
+    job = _enqueue_and_claim()
+    assert job['status'] == 'processing' and job['attempts'] == 1
+    assert job['locked_until'] > datetime.now(timezone.utc) + timedelta(seconds=CLAIM_LEASE_SECONDS - 5)
+    assert NotificationOutboxService.claim_next() is None
+
+    # Worker died: the lease runs out and another worker takes over
+    outbox.docs[job['_id']]['locked_until'] = datetime.now(timezone.utc) - timedelta(seconds=1)
+    reclaimed = NotificationOutboxService.claim_next()
+    assert reclaimed['_id'] == job['_id'] and reclaimed['attempts'] == 2
+
+
+def test_delivered_job_is_marked_sent(outbox, channels):
+    job = _enqueue_and_claim()
+    NotificationOutboxService.process(job)
+    stored = outbox.docs[job['_id']]
+    assert stored['status'] == 'sent'
+    assert stored['channels'] == {'email': 'sent', 'push': 'skipped', 'socket': 'sent'}
+    assert stored['finished_at'] is not None
+
+
+def test_opted_out_recipient_is_skipped(outbox, channels):
+    channels['user']['notifications_enabled'] = False
+    job = _enqueue_and_claim('credit_alert', master_username='admin', amount=50, seller_trade_id='T-9')
+    NotificationOutboxService.process(job)
+    stored = outbox.docs[job['_id']]
+    assert stored['status'] == 'skipped'
+    assert stored['last_error'] == 'Notifications not enabled'
+    assert channels['emails'] == [] and channels['emits'] == []
+
+
+def test_failed_email_is_retried_without_repeating_the_socket_emit(outbox, channels):
+    channels['email_error'] = 'SMTP unavailable'
+    job = _enqueue_and_claim()
+    NotificationOutboxService.process(job)
+    stored = outbox.docs[job['_id']]
+    assert stored['status'] == 'pending'
+    assert stored['channels'] == {'email': 'SMTP unavailable', 'push': 'skipped', 'socket': 'sent'}
+
+    channels['email_error'] = None
+    _make_due(outbox, job)
+    NotificationOutboxService.process(NotificationOutboxService.claim_next())
+    assert outbox.docs[job['_id']]['status'] == 'sent'
+    assert len(channels['emails']) == 2
+    assert len(channels['emits']) == 1
+
+
+def test_failed_emit_is_retried_without_resending_the_email(outbox, channels):
+    channels['emit_error'] = 'message queue down'
+    job = _enqueue_and_claim()
+    NotificationOutboxService.process(job)
+    assert outbox.docs[job['_id']]['channels']['socket'] == 'message queue down'
+
+    channels['emit_error'] = None
+    _make_due(outbox, job)
+    NotificationOutboxService.process(NotificationOutboxService.claim_next())
+    assert outbox.docs[job['_id']]['status'] == 'sent'
+    assert len(channels['emails']) == 1
+    assert len(channels['emits']) == 1
+
+
+def test_pushes_of_claimed_jobs_are_sent_together_and_mapped_back(monkeypatch, outbox, channels):
+    recipients = {
+        email: {'_id': ObjectId(), 'email': email, 'fcm_token': f'token-{email}', 'notifications_enabled': True}
+        for email in ('a@college.edu', 'b@college.edu')
+    }
+    monkeypatch.setattr(SMSService, '_find_user_or_seller_by_email',
+                        staticmethod(lambda email: (recipients[email], 'user')))
+    calls = []
+
+    def send_each(messages):
+        calls.append([message.token for message in messages])
+        # FCM rejects b's message this time
+        responses = [
+            SimpleNamespace(success=message.token != 'token-b@college.edu', exception='quota exceeded')
+            for message in messages
+        ]
+        return SimpleNamespace(success_count=1, failure_count=1, responses=responses)
+
+    monkeypatch.setattr(messaging, 'send_each', send_each)
+    params = {'order_number': 'ORD-1', 'product_name': 'Lamp', 'quantity': 1, 'delivery_note': ''}
+    for email in recipients:
+        NotificationOutboxService.enqueue(render_notification('order_accepted', **params), email=email)
+
+    jobs = NotificationOutboxService.claim_batch()
+    NotificationOutboxService.process_batch(jobs)
+    assert calls == [['token-a@college.edu', 'token-b@college.edu']]
+    stored = {doc['payload']['email']: doc for doc in outbox.docs.values()}
+    assert stored['a@college.edu']['status'] == 'sent'
+    assert stored['a@college.edu']['channels']['push'] == 'sent'
+    assert stored['b@college.edu']['status'] == 'pending'
+    assert stored['b@college.edu']['channels'] == {'email': 'sent', 'push': 'quota exceeded', 'socket': 'sent'}
+
+    # The retry only sends b's push
+    _make_due(outbox, stored['b@college.edu'])
+    NotificationOutboxService.process_batch(NotificationOutboxService.claim_batch())
+    assert calls[-1] == ['token-b@college.edu']
+    assert len(channels['emails']) == 2 and len(channels['emits']) == 2
+
+
+def test_job_fails_after_max_attempts(outbox, channels):
+    channels['email_error'] = 'SMTP unavailable'
+    job = {**_enqueue_and_claim(), 'max_attempts': 1}
+    NotificationOutboxService.process(job)
+    stored = outbox.docs[job['_id']]
+    assert stored['status'] == 'failed'
+    assert stored['last_error'] == 'email: SMTP unavailable'
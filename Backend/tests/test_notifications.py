@@ -0,0 +1,49 @@
+"""
+Tests for typed notification templates
+"""
+import pytest
+
+from app.utils.notifications import (
+    NOTIFICATION_TEMPLATES,
+    absolute_url,
+    get_template,
+    render_email_html,
+    render_notification,
+)
+
+
+def test_order_placed_renders_message_and_metadata():
+    notification = render_notification(
+        'order_placed', order_number='ORD-1', product_name='Pen', quantity=2, total='40.00'
+    )
+    assert notification['notification_type'] == 'order_placed'
+    assert notification['title'] == 'New Order'
+    assert notification['message'] == (
+        "New order #ORD-1: Pen (Qty: 2, ₹40.00). Visit BBHCBazaar seller dashboard to accept/reject."
+    )
+
+
+def test_missing_parameters_are_reported():
+    with pytest.raises(ValueError, match='order_number'):
+        render_notification('order_placed', product_name='Pen', quantity=2, total='40.00')
+
+
+def test_unknown_type_is_rejected():
+    with pytest.raises(ValueError):
+        get_template('newsletter')
+
+
+def test_delivery_rules_belong_to_the_type():
+    assert NOTIFICATION_TEMPLATES['otp'].email_only
+    assert NOTIFICATION_TEMPLATES['credit_alert'].respects_opt_out
+    assert not NOTIFICATION_TEMPLATES['order_cancelled'].respects_opt_out
+
+
+def test_email_html_escapes_message():
+    assert '&lt;b&gt;' in render_email_html("Your service '<b>' has been approved")
+
+
+def test_absolute_url():
+    assert absolute_url('/uploads/a.png', 'http://host:9000/') == 'http://host:9000/uploads/a.png'
+    assert absolute_url('https://cdn/a.png', 'http://host/') == 'https://cdn/a.png'
+    assert absolute_url(None, 'http://host/') is None
@@ -0,0 +1,154 @@
+"""
+Tests for the merged product/service order listing (page merge, keyset cursors, count modes)
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from app import mongo
+from app.services import order_service
+from app.services.order_service import ORDER_PAGE_MAX_OFFSET, OrderService
+from app.utils.pagination import decode_cursor, next_cursor_for
+
+START = datetime(2026, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _after(doc, created_at, doc_id):
+    return doc['created_at'] < created_at or (doc['created_at'] == created_at and doc['_id'] < doc_id)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.limit_value = None
+        self.closed = False
+
+    def sort(self, keys):
+        self.docs = sorted(self.docs, key=lambda doc: (doc['created_at'], doc['_id']), reverse=True)
+        return self
+
+    def limit(self, value):
+        self.limit_value = value
+        return self
+
+    def batch_size(self, value):
+        return self
+
+    def close(self):
+        self.closed = True
+
+    def __iter__(self):
+        return iter(self.docs[:self.limit_value])
+
+
+class FakeOrders:
+    def __init__(self, docs):
+        self.docs = docs
+        self.cursors = []
+        self.counts = 0
+
+    def _matches(self, doc, query):
+        if '$and' in query:
+            return all(self._matches(doc, clause) for clause in query['$and'])
+        if '$or' in query:
+            # keyset_filter: strictly after (created_at, _id)
+            created_at = query['$or'][0]['created_at']['$lt']
+            doc_id = query['$or'][1]['_id']['$lt']
+            return _after(doc, created_at, doc_id)
+        return all(doc.get(field) == value for field, value in query.items())
+
+    def find(self, query):
+        cursor = FakeCursor([doc for doc in self.docs if self._matches(doc, query)])
+        self.cursors.append(cursor)
+        return cursor
+
+    def count_documents(self, query):
+        self.counts += 1
+        return sum(1 for doc in self.docs if self._matches(doc, query))
+
+
+def _orders(count, minutes, order_type, **fields):
+    return [
+        {'_id': ObjectId(), 'type': order_type, 'status': 'pending_seller',
+         'created_at': START + timedelta(minutes=minute), **fields}
+        for minute in minutes[:count]
+    ]
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    products = FakeOrders(_orders(5, [0, 2, 4, 6, 8], 'product'))
+    services = FakeOrders(_orders(3, [1, 5, 9], 'service'))
+    monkeypatch.setattr(mongo, 'db', type('FakeDB', (), {'orders': products, 'service_orders': services})())
+    monkeypatch.setattr(order_service, '_last_expiry_check', datetime.now(timezone.utc))
+    monkeypatch.setattr(order_service, '_order_count_cache', {})
+    return products, services
+
+
+def _minutes(orders):
+    return [int((order.created_at - START).total_seconds() // 60) for order in orders]
+
+
+def test_pages_merge_both_collections_newest_first(collections):
+    products, services = collections
+    first, total = OrderService.get_orders(page=1, limit=3)
+    second, _ = OrderService.get_orders(page=2, limit=3)
+    assert total == 8
+    assert _minutes(first) == [9, 8, 6]
+    assert _minutes(second) == [5, 4, 2]
+    # Each collection is asked for at most skip + limit documents and the cursors are closed
+    assert products.cursors[-1].limit_value == 6 and products.cursors[-1].closed
+    assert services.cursors[-1].closed
+
+
+def test_cursor_continues_across_collections(collections):
+    seen = []
+    after = None
+    while True:
+        orders, _ = OrderService.get_orders(limit=3, after=after, count_mode='none')
+        seen.extend(_minutes(orders))
+        cursor = next_cursor_for(orders, 3)
+        if not cursor:
+            break
+        after = decode_cursor(cursor)
+    assert seen == [9, 8, 6, 5, 4, 2, 1, 0]
+
+
+def test_cursor_breaks_created_at_ties_on_id(collections):
+    products, services = collections
+    tied = START + timedelta(minutes=30)
+    products.docs.append({'_id': ObjectId(), 'type': 'product', 'status': 'pending_seller', 'created_at': tied})
+    services.docs.append({'_id': ObjectId(), 'type': 'service', 'status': 'pending_seller', 'created_at': tied})
+
+    first, _ = OrderService.get_orders(limit=1, count_mode='none')
+    rest, _ = OrderService.get_orders(limit=1, after=decode_cursor(next_cursor_for(first, 1)), count_mode='none')
+    assert {first[0]._id, rest[0]._id} == {products.docs[-1]['_id'], services.docs[-1]['_id']}
+
+
+def test_count_modes(collections):
+    products, services = collections
+    assert OrderService.get_orders(limit=2, count_mode='none')[1] is None
+    assert products.counts == 0
+
+    assert OrderService.get_orders(limit=2, count_mode='cached')[1] == 8
+    assert OrderService.get_orders(limit=2, count_mode='cached')[1] == 8
+    assert products.counts == 1
+
+    assert OrderService.get_orders({'type': 'service'}, limit=2)[1] == 3
+
+
+def test_deep_page_numbers_are_rejected_but_cursors_are_not(collections):
+    products, _ = collections
+    last_page = ORDER_PAGE_MAX_OFFSET // 10
+    assert OrderService.get_orders(page=last_page, limit=10)[0] == []
+    with pytest.raises(ValueError):
+        OrderService.get_orders(page=last_page + 1, limit=10)
+    with pytest.raises(ValueError):
+        OrderService.get_orders(page=0, limit=10)
+
+    # A cursor request ignores page and only reads one page from each collection
+    orders, _ = OrderService.get_orders(page=last_page + 1, limit=3, after=(START + timedelta(minutes=7), ObjectId()))
+    assert _minutes(orders) == [6, 5, 4]
+    assert products.cursors[-1].limit_value == 3
+
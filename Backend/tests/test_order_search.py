@@ -0,0 +1,41 @@
+"""
+Order search key tests
+"""
+from app.utils.order_search import build_order_search_keys, build_seller_search_keys, order_search_filter
+
+
+def test_search_keys_cover_snapshots_and_order_number():
+    """Keys are lowercase, accent-free tokens plus compact identifiers"""
+    order_doc = {
+        'order_number': 'ORD-2024-AB1',
+        'product_snapshot': {'name': 'Café Latte'},
+        'seller_snapshot': {'first_name': 'Ravi', 'trade_id': 'TR-77'},
+        'user_snapshot': {'name': 'Anu K'},
+    }
+    keys = build_order_search_keys(order_doc)
+    for expected in ('ord2024ab1', 'ab1', 'cafe', 'latte', 'ravi', 'tr77', 'anu'):
+        assert expected in keys
+    assert keys == sorted(set(keys))
+
+
+def test_search_filter_uses_anchored_prefixes():
+    """Every query token must prefix-match some key"""
+    search_filter = order_search_filter('Caf  RAV')
+    patterns = [pattern.pattern for pattern in search_filter['search_keys']['$all']]
+    assert patterns == ['^caf', '^rav']
+
+
+def test_search_filter_ignores_punctuation_only_queries():
+    assert order_search_filter(' - ') is None
+
+
+def test_seller_keys_hold_only_seller_tokens():
+    """Seller-scoped searches must not match buyer, product or order number tokens"""
+    order_doc = {
+        'order_number': 'ORD-2024-AB1',
+        'product_snapshot': {'name': 'Ravi Special Pen'},
+        'seller_snapshot': {'first_name': 'Meena', 'last_name': 'Rao', 'trade_id': 'TR-77'},
+        'user_snapshot': {'name': 'Ravi Kumar'},
+    }
+    assert build_seller_search_keys(order_doc) == ['77', 'meena', 'rao', 'tr', 'tr77']
+    assert order_search_filter('Ravi', field='seller_search_keys')['seller_search_keys'].pattern == '^ravi'
@@ -0,0 +1,42 @@
+"""
+Keyset pagination cursor tests
+"""
+import pytest
+from datetime import datetime, timezone
+from bson import ObjectId
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_filter, next_cursor_for
+
+
+def test_cursor_round_trip():
+    """Cursor decodes back to the same (created_at, _id) key"""
+    created_at = datetime(2026, 3, 4, 5, 6, 7, 123000, tzinfo=timezone.utc)
+    doc_id = ObjectId()
+    assert decode_cursor(encode_cursor(created_at, doc_id)) == (created_at, doc_id)
+
+
+def test_naive_datetime_treated_as_utc():
+    """PyMongo returns naive UTC datetimes by default"""
+    doc_id = ObjectId()
+    cursor = encode_cursor(datetime(2026, 1, 1, 12, 0, 0), doc_id)
+    assert decode_cursor(cursor)[0] == datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def test_invalid_cursor_rejected():
+    """Malformed cursors raise ValueError"""
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def test_keyset_filter_breaks_ties_on_id():
+    """Documents sharing created_at are ordered by _id"""
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    doc_id = ObjectId()
+    query = keyset_filter((created_at, doc_id))
+    assert {'created_at': created_at, '_id': {'$lt': doc_id}} in query['$or']
+
+
+def test_next_cursor_only_for_full_pages():
+    """No cursor is returned when the page is shorter than the limit"""
+    docs = [{'_id': ObjectId(), 'created_at': datetime(2026, 1, 1)} for _ in range(3)]
+    assert next_cursor_for(docs, 5) is None
+    assert decode_cursor(next_cursor_for(docs, 3))[1] == docs[-1]['_id']
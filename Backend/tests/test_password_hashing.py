@@ -0,0 +1,49 @@
+"""
+Tests for pooled password hashing and work factor detection
+"""
+from app.utils import password_hashing
+from app.utils.password_hashing import (
+    hash_password,
+    hash_rounds,
+    hashing_stats,
+    needs_rehash,
+    verify_password,
+)
+
+
+def test_hash_and_verify_through_pool(monkeypatch):
+    monkeypatch.setenv('BCRYPT_ROUNDS', '4')
+    hashed = hash_password('s3cret')
+    assert hash_rounds(hashed) == 4
+    assert verify_password('s3cret', hashed)
+    assert not verify_password('wrong', hashed)
+    stats = hashing_stats()
+    assert stats['completed'] >= 3
+    assert stats['in_flight'] == 0 and stats['queue_depth'] == 0
+
+
+def test_non_bcrypt_hashes_never_verify():
+    assert hash_rounds('5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8') is None
+    assert not verify_password('password', '5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8')
+
+
+def test_needs_rehash_when_work_factor_changes(monkeypatch):
+    monkeypatch.setenv('BCRYPT_ROUNDS', '12')
+    assert needs_rehash('$2b$10$' + 'a' * 53)
+    assert not needs_rehash('$2b$12$' + 'a' * 53)
+    assert not needs_rehash('not-a-bcrypt-hash')
+    assert password_hashing.bcrypt_rounds() == 12
+
+
+def test_spawned_workers_do_not_boot_the_app(monkeypatch):
+    """spawn re-runs the entry script as __mp_main__; it must not build the app there."""
+    import os
+    import runpy
+    import app as app_package
+
+    def fail():
+        raise AssertionError('create_app() ran in a spawned worker')
+
+    monkeypatch.setattr(app_package, 'create_app', fail)
+    entry = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+    runpy.run_path(entry, run_name='__mp_main__')
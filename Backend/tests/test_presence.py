@@ -0,0 +1,26 @@
+"""
+Socket presence registry tests
+"""
+from app.sockets.presence import register_presence, unregister_presence, reset_presence
+
+
+def test_register_and_unregister():
+    reset_presence()
+    register_presence('sid-1', 'user', 'u1')
+    register_presence('sid-2', 'user', 'u1')
+    assert unregister_presence('sid-1') == ('user', 'u1')
+    assert unregister_presence('sid-2') == ('user', 'u1')
+    assert unregister_presence('sid-1') is None
+
+
+def test_reinit_moves_socket():
+    reset_presence()
+    register_presence('sid-b', 'master', 'm2')
+    # Same socket re-initialized as a different principal
+    register_presence('sid-b', 'seller', 's1')
+    assert unregister_presence('sid-b') == ('seller', 's1')
+
+
+def test_unknown_socket_is_ignored():
+    reset_presence()
+    assert unregister_presence('missing') is None
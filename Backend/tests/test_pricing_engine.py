@@ -0,0 +1,67 @@
+"""
+Materialized pricing field tests (commission, total price and delivery charge precedence)
+"""
+import pytest
+
+from app.services.pricing_engine_service import PricingEngineService
+from app.services.pricing_rules_service import PricingRulesService
+
+RULES = PricingRulesService._build_rules([
+    {'source': 'delivery_settings', 'key': 'global_product_rate', 'rate': 40},
+    {'source': 'delivery_settings', 'key': 'global_service_rate', 'rate': 30},
+    {'source': 'product_category_delivery_rates', 'category': 'Books', 'rate': 15},
+    {'source': 'category_commissions', 'category': 'Books', 'commission_rate': 10},
+    {'source': 'service_category_commissions', 'category': 'Tutoring', 'commission_rate': 5},
+])
+
+
+def test_category_commission_and_rates_apply_without_item_overrides():
+    fields = PricingEngineService.compute_fields(
+        {'selling_price': 200, 'categories': ['Books']}, 'product', RULES
+    )
+    assert fields == {
+        'effective_commission_rate': 10.0,
+        'total_selling_price': 220.0,
+        'effective_delivery_charge': 15.0,
+    }
+
+
+def test_item_values_take_precedence_over_rules():
+    fields = PricingEngineService.compute_fields(
+        {'selling_price': 99.99, 'categories': ['Books'], 'commission_rate': 7.5, 'delivery_charge': 0},
+        'product', RULES
+    )
+    assert fields['effective_commission_rate'] == 7.5
+    assert fields['total_selling_price'] == 107.49
+    # An explicit free delivery is kept, not replaced by the category rate
+    assert fields['effective_delivery_charge'] == 0.0
+
+
+def test_uncategorized_items_fall_back_to_global_delivery_and_no_commission():
+    fields = PricingEngineService.compute_fields({'selling_price': 50, 'categories': []}, 'product', RULES)
+    assert fields == {
+        'effective_commission_rate': 0.0,
+        'total_selling_price': 50,
+        'effective_delivery_charge': 40.0,
+    }
+
+
+def test_services_use_their_own_fields_and_rules():
+    fields = PricingEngineService.compute_fields(
+        {'service_charge': 300, 'categories': ['Tutoring', 'Books']}, 'service', RULES
+    )
+    assert fields == {
+        'effective_commission_rate': 5.0,
+        'total_service_charge': 315.0,
+        'effective_delivery_charge': 30.0,
+    }
+
+
+def test_missing_base_price_has_no_total():
+    fields = PricingEngineService.compute_fields({'categories': ['Books']}, 'product', RULES)
+    assert fields['total_selling_price'] is None
+
+
+def test_unknown_item_type_is_rejected():
+    with pytest.raises(ValueError):
+        PricingEngineService.compute_fields({}, 'bundle', RULES)
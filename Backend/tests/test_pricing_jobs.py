@@ -0,0 +1,146 @@
+"""
+Tests for background pricing jobs (status, heartbeats, stale jobs) and bulk commission batching
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from app import mongo
+from app.services import pricing_job_service
+from app.services.pricing_engine_service import PricingEngineService
+from app.services.pricing_job_service import (
+    PRICING_JOB_STALE_SECONDS,
+    STALE_JOB_ERROR,
+    PricingJobService,
+)
+
+
+class FakeResult:
+    def __init__(self, count):
+        self.matched_count = count
+        self.modified_count = count
+
+
+class FakeJobs:
+    def __init__(self):
+        self.docs = {}
+
+    def insert_one(self, doc):
+        self.docs[doc['_id']] = dict(doc)
+
+    def find_one(self, query):
+        doc = self.docs.get(query['_id'])
+        return dict(doc) if doc else None
+
+    def update_one(self, query, update):
+        doc = self.docs.get(query['_id'])
+        if doc is None or any(doc.get(k) != v for k, v in query.items() if k != '_id'):
+            return FakeResult(0)
+        doc.update(update['$set'])
+        return FakeResult(1)
+
+
+class FakeItems:
+    """products collection: find returns ids, update_many records each batch."""
+
+    def __init__(self, count):
+        self.ids = [ObjectId() for _ in range(count)]
+        self.batches = []
+
+    def find(self, query, projection=None):
+        return [{'_id': item_id} for item_id in self.ids]
+
+    def update_many(self, query, pipeline):
+        batch_ids = query['$and'][1]['_id']['$in']
+        self.batches.append((query['$and'][0], batch_ids, pipeline))
+        return FakeResult(len(batch_ids))
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getattr__(self, name):
+        return self.collections[name]
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    fake = FakeJobs()
+    monkeypatch.setattr(mongo, 'db', FakeDB(pricing_jobs=fake))
+    return fake
+
+
+def _job(jobs, status, heartbeat_age):
+    job_id = ObjectId()
+    heartbeat_at = datetime.now(timezone.utc) - timedelta(seconds=heartbeat_age)
+    jobs.insert_one({
+        '_id': job_id, 'job_type': 'product_commission_all', 'params': {}, 'status': status,
+        'created_at': heartbeat_at, 'heartbeat_at': heartbeat_at,
+    })
+    return job_id
+
+
+def test_job_runs_to_completion_with_progress(monkeypatch, jobs):
+    def runner(params, progress):
+        progress(5, 10, 5)
+        progress(10, 10, 9)
+        return 9
+
+    monkeypatch.setattr(pricing_job_service, '_job_runners', lambda: {'product_commission_all': runner})
+    job_id = _job(jobs, 'queued', 0)
+    PricingJobService._run_job(job_id, 'product_commission_all', {'commission_rate': 5})
+
+    job = PricingJobService.get_job(str(job_id))
+    assert job['status'] == 'completed'
+    assert (job['processed'], job['total'], job['updated_count']) == (10, 10, 9)
+    assert job['started_at'] and job['finished_at'] and job['heartbeat_at']
+
+
+def test_job_records_runner_failure(monkeypatch, jobs):
+    def runner(params, progress):
+        raise RuntimeError('bulk write failed')
+
+    monkeypatch.setattr(pricing_job_service, '_job_runners', lambda: {'product_commission_all': runner})
+    job_id = _job(jobs, 'queued', 0)
+    PricingJobService._run_job(job_id, 'product_commission_all', {})
+    job = PricingJobService.get_job(str(job_id))
+    assert job['status'] == 'failed' and job['error'] == 'bulk write failed'
+
+
+def test_job_without_heartbeat_is_reported_failed(jobs):
+    stale_id = _job(jobs, 'running', PRICING_JOB_STALE_SECONDS + 5)
+    live_id = _job(jobs, 'running', 5)
+
+    stale = PricingJobService.get_job(str(stale_id))
+    assert stale['status'] == 'failed' and stale['error'] == STALE_JOB_ERROR
+    assert jobs.docs[stale_id]['status'] == 'failed'
+    assert PricingJobService.get_job(str(live_id))['status'] == 'running'
+
+
+def test_unknown_job_ids_return_none(jobs):
+    assert PricingJobService.get_job('not-an-id') is None
+    assert PricingJobService.get_job(str(ObjectId())) is None
+
+
+def test_commission_is_applied_in_batches_with_progress(monkeypatch):
+    items = FakeItems(5)
+    monkeypatch.setattr(mongo, 'db', FakeDB(products=items))
+    query = {'selling_price': {'$gt': 0}}
+    progress = []
+
+    updated = PricingEngineService.apply_commission_bulk(
+        'product', query, 10, batch_size=2, progress_callback=lambda *args: progress.append(args)
+    )
+
+    assert updated == 5
+    assert [batch_ids for _, batch_ids, _ in items.batches] == [items.ids[0:2], items.ids[2:4], items.ids[4:5]]
+    # Every batch keeps the original filter so items changed since the snapshot are left alone
+    assert all(batch_query == query for batch_query, _, _ in items.batches)
+    stage = items.batches[0][2][0]['$set']
+    assert stage['commission_rate'] == 10.0 and stage['effective_commission_rate'] == 10.0
+    assert progress == [(0, 5, 0), (2, 5, 2), (4, 5, 4), (5, 5, 5)]
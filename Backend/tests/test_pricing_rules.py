@@ -0,0 +1,98 @@
+"""
+Pricing rules cache tests (TTL, invalidation, rule precedence)
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import pricing_rules_service
+from app.services.pricing_rules_service import PRICING_RULES_TTL_SECONDS, PricingRulesService
+
+RULE_DOCS = [
+    {'source': 'delivery_settings', 'key': 'global_product_rate', 'rate': 40},
+    {'source': 'product_category_delivery_rates', 'category': 'Books', 'rate': 15},
+    {'source': 'product_category_delivery_rates', 'category': 'Stationery', 'rate': 0},
+    {'source': 'service_category_delivery_rates', 'category': 'Tutoring', 'rate': 25},
+    {'source': 'category_commissions', 'category': 'Books', 'commission_rate': 12},
+    {'source': 'service_category_commissions', 'category': 'Tutoring', 'commission_rate': 8},
+    {'source': 'category_commissions', 'commission_rate': 99},
+]
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Counts rule loads and controls the clock."""
+    state = {'loads': 0, 'now': 1000.0, 'docs': RULE_DOCS, 'error': None}
+
+    def load_rule_docs():
+        state['loads'] += 1
+        if state['error']:
+            raise state['error']
+        return state['docs']
+
+    monkeypatch.setattr(PricingRulesService, '_load_rule_docs', staticmethod(load_rule_docs))
+    monkeypatch.setattr(pricing_rules_service, 'time', SimpleNamespace(monotonic=lambda: state['now']))
+    PricingRulesService.invalidate()
+    yield state
+    PricingRulesService.invalidate()
+
+
+def test_rules_are_built_per_source():
+    rules = PricingRulesService._build_rules(RULE_DOCS)
+    assert rules['global_product_rate'] == 40.0
+    assert rules['global_service_rate'] is None
+    assert rules['product_category_delivery_rates'] == {'Books': 15.0, 'Stationery': 0.0}
+    assert rules['service_category_delivery_rates'] == {'Tutoring': 25.0}
+    assert rules['product_category_commissions'] == {'Books': 12}
+    assert rules['service_category_commissions'] == {'Tutoring': 8}
+
+
+def test_rules_are_cached_until_the_ttl_expires(loads):
+    first = PricingRulesService.get_rules()
+    loads['now'] += PRICING_RULES_TTL_SECONDS - 1
+    assert PricingRulesService.get_rules() is first
+    assert loads['loads'] == 1
+
+    loads['now'] += 1
+    PricingRulesService.get_rules()
+    assert loads['loads'] == 2
+
+
+def test_invalidate_forces_a_reload(loads):
+    PricingRulesService.get_rules()
+    loads['docs'] = [{'source': 'delivery_settings', 'key': 'global_product_rate', 'rate': 55}]
+    PricingRulesService.invalidate()
+    assert PricingRulesService.get_rules()['global_product_rate'] == 55.0
+    assert loads['loads'] == 2
+
+
+def test_failed_reload_keeps_serving_the_last_rules(loads):
+    rules = PricingRulesService.get_rules()
+    loads['error'] = RuntimeError('mongo down')
+    loads['now'] += PRICING_RULES_TTL_SECONDS
+    assert PricingRulesService.get_rules() is rules
+
+    PricingRulesService.invalidate()
+    assert PricingRulesService.get_rules()['product_category_delivery_rates'] == {}
+
+
+def test_delivery_charge_prefers_the_first_configured_category():
+    rules = PricingRulesService._build_rules(RULE_DOCS)
+    resolve = PricingRulesService.resolve_delivery_charge
+    assert resolve(['Books', 'Stationery'], 'product', rules) == 15.0
+    # A configured rate of 0 is a rule, not a missing value
+    assert resolve(['Unlisted', 'Stationery', 'Books'], 'product', rules) == 0.0
+    assert resolve(['Unlisted'], 'product', rules) == 40.0
+    assert resolve(None, 'product', rules) == 40.0
+    # No global service rate configured
+    assert resolve(['Unlisted'], 'service', rules) == 0.0
+    assert resolve(['Tutoring'], 'service', rules) == 25.0
+
+
+def test_category_commission_falls_through_to_none():
+    rules = PricingRulesService._build_rules(RULE_DOCS)
+    resolve = PricingRulesService.resolve_category_commission
+    assert resolve(['Unlisted', 'Books'], 'product', rules) == 12
+    assert resolve(['Tutoring'], 'product', rules) is None
+    assert resolve(['Tutoring'], 'service', rules) == 8
+    assert resolve([], 'service', rules) is None
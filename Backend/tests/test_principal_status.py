@@ -0,0 +1,57 @@
+"""
+Tests for the principal status cache used by the JWT user lookup
+"""
+import pytest
+
+from app.utils import principal_status
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+    statuses = {}
+
+    def fake_load(user_type, user_id):
+        calls.append((user_type, user_id))
+        return statuses.get((user_type, user_id), True)
+
+    principal_status.clear_principal_cache()
+    monkeypatch.setattr(principal_status, '_load_status', fake_load)
+    yield calls, statuses
+    principal_status.clear_principal_cache()
+
+
+def test_status_is_served_from_cache(lookups):
+    calls, _ = lookups
+    assert principal_status.is_principal_allowed('user', 'a1')
+    assert principal_status.is_principal_allowed('user', 'a1')
+    assert calls == [('user', 'a1')]
+
+
+def test_invalidation_forces_fresh_lookup(lookups):
+    calls, statuses = lookups
+    assert principal_status.is_principal_allowed('user', 'b2')
+    statuses[('user', 'b2')] = False
+    principal_status.invalidate_principal('user', 'b2')
+    assert not principal_status.is_principal_allowed('user', 'b2')
+    assert len(calls) == 2
+
+
+def test_blacklist_answers_are_not_cached(lookups):
+    # A refresher reload in this process must take effect on the next request
+    calls, statuses = lookups
+    assert principal_status.is_principal_allowed('outlet_man', 'b2')
+    statuses[('outlet_man', 'b2')] = False
+    assert not principal_status.is_principal_allowed('outlet_man', 'b2')
+    assert len(calls) == 2 and principal_status._cache == {}
+
+
+def test_lookup_errors_are_not_cached(monkeypatch):
+    def failing_load(user_type, user_id):
+        raise RuntimeError('db down')
+
+    principal_status.clear_principal_cache()
+    monkeypatch.setattr(principal_status, '_load_status', failing_load)
+    assert not principal_status.is_principal_allowed('user', 'c3')
+    assert principal_status.is_principal_allowed('seller', 'c3')
+    assert principal_status._cache == {}
@@ -0,0 +1,100 @@
+"""
+Tests for FCM dead-token detection, batched sends and token pruning
+"""
+from types import SimpleNamespace
+
+import pytest
+from firebase_admin import exceptions, messaging
+
+from app import mongo
+from app.utils.push import PushService, _chunks, dead_tokens
+
+
+def _ok():
+    return SimpleNamespace(success=True, exception=None)
+
+
+def _failed(error):
+    return SimpleNamespace(success=False, exception=error)
+
+
+def test_only_unregistered_tokens_are_dead():
+    tokens = ['ok', 'gone', 'wrong-sender', 'flaky']
+    responses = [
+        _ok(),
+        _failed(messaging.UnregisteredError('gone')),
+        _failed(messaging.SenderIdMismatchError('mismatch')),
+        _failed(exceptions.UnavailableError('try later')),
+    ]
+    assert dead_tokens(tokens, responses) == ['gone', 'wrong-sender']
+
+
+def test_chunks_respect_fcm_batch_limit():
+    chunks = list(_chunks(list(range(1201))))
+    assert [len(chunk) for chunk in chunks] == [500, 500, 201]
+
+
+# --- Batched sending and token pruning, with messaging.send_each stubbed ---
+
+class FakeUsers:
+    def __init__(self):
+        self.updates = []
+
+    def update_many(self, query, update):
+        self.updates.append((query, update))
+        return SimpleNamespace(modified_count=len(query['fcm_token']['$in']))
+
+
+@pytest.fixture
+def users(monkeypatch):
+    fake = FakeUsers()
+    monkeypatch.setattr(mongo, 'db', SimpleNamespace(users=fake))
+    return fake
+
+
+def _entries(count, prefix='t'):
+    return [(f'{prefix}{index}', f'message-{index}') for index in range(count)]
+
+
+def test_send_batch_sends_500_per_call_and_prunes_dead_tokens(monkeypatch, users):
+    calls = []
+
+    def send_each(messages):
+        calls.append(list(messages))
+        # The first message of every call belongs to an uninstalled app
+        responses = [_failed(messaging.UnregisteredError('gone'))] + [_ok() for _ in messages[1:]]
+        return SimpleNamespace(success_count=len(messages) - 1, failure_count=1, responses=responses)
+
+    monkeypatch.setattr(messaging, 'send_each', send_each)
+    errors = PushService.send_batch(_entries(501))
+    assert [len(call) for call in calls] == [500, 1]
+    assert errors.count(None) == 499
+    assert errors[0] and errors[500] and errors[1] is None
+
+    (query, update), = users.updates
+    assert sorted(query['fcm_token']['$in']) == ['t0', 't500']
+    assert update == {'$set': {'fcm_token': None}}
+
+
+def test_failed_chunk_does_not_stop_the_rest(monkeypatch, users):
+    calls = []
+
+    def send_each(messages):
+        calls.append(len(messages))
+        if len(calls) == 1:
+            raise exceptions.UnavailableError('fcm down')
+        return SimpleNamespace(success_count=len(messages), failure_count=0, responses=[_ok() for _ in messages])
+
+    monkeypatch.setattr(messaging, 'send_each', send_each)
+    errors = PushService.send_batch(_entries(600))
+    assert calls == [500, 100]
+    # Every message of the failed call reports the error; the rest were accepted
+    assert errors[:500] == ['fcm down'] * 500
+    assert errors[500:] == [None] * 100
+    assert users.updates == []
+
+
+def test_prune_tokens_deduplicates(users):
+    assert PushService.prune_tokens([]) == 0
+    assert PushService.prune_tokens(['a', 'a', 'b']) == 2
+    assert sorted(users.updates[0][0]['fcm_token']['$in']) == ['a', 'b']
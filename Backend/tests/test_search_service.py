@@ -0,0 +1,85 @@
+"""
+Tests for catalog search ranking, paging and the result depth bound
+"""
+import pytest
+from bson import ObjectId
+
+from app import mongo
+from app.services.search_service import SEARCH_MAX_RESULTS, SearchService
+
+
+class FakeCatalog:
+    """Answers the search aggregate with pre-ranked ids and serves documents by id."""
+
+    def __init__(self, name_field, scores):
+        self.docs = {}
+        self.ranked = []
+        for score in scores:
+            doc_id = ObjectId()
+            self.docs[doc_id] = {'_id': doc_id, name_field: f'item {score}', 'categories': ['Books']}
+            self.ranked.append({'_id': doc_id, '_score': score})
+        self.ranked.sort(key=lambda row: (row['_score'], row['_id']), reverse=True)
+        self.pipelines = []
+        self.found = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        limit = pipeline[-1]['$facet']['results'][-2]['$limit']
+        yield {
+            'results': self.ranked[:limit],
+            'total': [{'count': len(self.ranked)}],
+            'categories': [{'_id': 'Books', 'count': len(self.ranked)}],
+        }
+
+    def find(self, query):
+        ids = query['_id']['$in']
+        self.found.append(ids)
+        return [self.docs[doc_id] for doc_id in ids if doc_id in self.docs]
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    collections = {
+        'products': FakeCatalog('product_name', [9.0, 7.0, 5.0, 3.0]),
+        'services': FakeCatalog('service_name', [8.0, 6.0]),
+    }
+
+    class FakeDB:
+        def __getitem__(self, name):
+            return collections[name]
+
+    monkeypatch.setattr(mongo, 'db', FakeDB())
+    return collections
+
+
+def test_results_merge_across_collections_by_score(catalog):
+    result = SearchService.search('item', page=1, limit=4)
+    assert [(item_type, score) for item_type, _, score in result['items']] == [
+        ('product', 9.0), ('service', 8.0), ('product', 7.0), ('service', 6.0)
+    ]
+    assert result['total'] == 6
+    assert result['facets']['types'] == {'product': 4, 'service': 2}
+
+
+def test_ranking_carries_ids_and_only_the_page_is_loaded(catalog):
+    result = SearchService.search('item', item_type='product', page=2, limit=2)
+    assert [score for _, _, score in result['items']] == [5.0, 3.0]
+
+    products = catalog['products']
+    assert products.pipelines[0][-1]['$facet']['results'][-1] == {'$project': {'_score': 1}}
+    assert products.found == [[row['_id'] for row in products.ranked[2:4]]]
+
+
+def test_documents_deleted_after_ranking_are_dropped(catalog):
+    products = catalog['products']
+    del products.docs[products.ranked[0]['_id']]
+    result = SearchService.search('item', item_type='product', page=1, limit=2)
+    assert [score for _, _, score in result['items']] == [7.0]
+
+
+def test_pages_beyond_the_result_bound_are_rejected(catalog):
+    limit = 20
+    last_page = SEARCH_MAX_RESULTS // limit
+    SearchService.search('item', page=last_page, limit=limit)
+    with pytest.raises(ValueError):
+        SearchService.search('item', page=last_page + 1, limit=limit)
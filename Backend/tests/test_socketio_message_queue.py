@@ -0,0 +1,46 @@
+"""
+Tests for the local Socket.IO message-queue stand-in
+"""
+import pickle
+
+from app.sockets.message_queue import LocalPubSubManager, socketio_queue_options
+
+
+def test_publish_reaches_every_worker_on_channel():
+    worker_a = LocalPubSubManager(channel='test-fanout')
+    worker_b = LocalPubSubManager(channel='test-fanout')
+    other = LocalPubSubManager(channel='test-other')
+    try:
+        message = {'method': 'emit', 'event': 'new_order', 'data': {'id': 1}, 'room': ['role:master']}
+        worker_a._publish(message)
+
+        assert pickle.loads(next(worker_b._listen())) == message
+        # The publisher hears its own message too; PubSubManager drops it by host_id
+        assert pickle.loads(next(worker_a._listen())) == message
+        assert other._inbox.empty()
+    finally:
+        for manager in (worker_a, worker_b, other):
+            manager.close()
+
+
+def test_write_only_manager_does_not_subscribe():
+    publisher = LocalPubSubManager(channel='test-write-only', write_only=True)
+    listener = LocalPubSubManager(channel='test-write-only')
+    try:
+        publisher._publish({'method': 'emit'})
+        assert publisher._inbox.empty()
+        assert pickle.loads(next(listener._listen())) == {'method': 'emit'}
+    finally:
+        listener.close()
+
+
+def test_queue_options():
+    assert socketio_queue_options(None, 'bbhc') == {}
+    assert socketio_queue_options('redis://localhost:6379/0', 'bbhc') == {
+        'message_queue': 'redis://localhost:6379/0',
+        'channel': 'bbhc',
+    }
+    options = socketio_queue_options('local://', 'test-options')
+    assert isinstance(options['client_manager'], LocalPubSubManager)
+    assert options['client_manager'].channel == 'test-options'
+    options['client_manager'].close()
@@ -0,0 +1,8 @@
+"""
+WSGI entry point for production workers (gunicorn wsgi:app).
+Started once per worker process by serve.py.
+"""
+from app import create_app, start_background_workers
+
+app, socketio = create_app()
+start_background_workers(app)
@@ -54,6 +54,9 @@ function OrdersList() {
   const [totalPages, setTotalPages] = useState(1)
   const [totalOrders, setTotalOrders] = useState(0)
   const ordersPerPage = 10
+  // Cursor that fetches each page (page 1 starts from the newest order); pages are
+  // only reached one step at a time, so the previous page always recorded the next cursor
+  const pageCursorsRef = useRef({ 1: null })
   const [selectedOrder, setSelectedOrder] = useState(null)
   const [showDetailModal, setShowDetailModal] = useState(false)
   const [showCancelModal, setShowCancelModal] = useState(false)
@@ -78,6 +81,7 @@ function OrdersList() {
 
   // Reset page to 1 when filters change
   useEffect(() => {
+    pageCursorsRef.current = { 1: null }
     setCurrentPage(1)
   }, [dateFilter, debouncedSearchQuery])
 
@@ -89,17 +93,21 @@ function OrdersList() {
   const fetchOrders = async (page = 1) => {
     try {
       dispatch(setMastersLoading({ field: 'orders', loading: true }))
+      // Continue by cursor when we have one; page numbers cost the backend O(offset)
+      const cursor = pageCursorsRef.current[page]
       const response = await getOrders(
         { 
           page, 
           limit: ordersPerPage,
           date: dateFilter,
-          search: debouncedSearchQuery
+          search: debouncedSearchQuery,
+          ...(cursor ? { cursor } : {})
         }, 
         { forceRefresh: true }
       )
-      // getOrders returns { orders, total, page, limit, totalPages }
+      // getOrders returns { orders, total, page, limit, totalPages, nextCursor }
       const apiOrders = response.orders || []
+      pageCursorsRef.current[page + 1] = response.nextCursor
       dispatch(setMastersData({ field: 'orders', data: apiOrders }))
       setTotalPages(response.totalPages || 1)
       setTotalOrders(response.total || 0)
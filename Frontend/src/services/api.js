@@ -1978,7 +1978,9 @@ export const getOrders = async (params = {}, options = {}) => {
       total: response.total || response.orders?.length || 0,
       page: response.page || queryParams.page,
       limit: response.limit || queryParams.limit,
-      totalPages: response.totalPages || Math.ceil((response.total || response.orders?.length || 0) / queryParams.limit)
+      totalPages: response.totalPages || Math.ceil((response.total || response.orders?.length || 0) / queryParams.limit),
+      // Pass as `cursor` to fetch the following page without an offset
+      nextCursor: response.next_cursor || null
     }
     
     // Cache only the first page with default limit and no active filters
@@ -21,6 +21,16 @@ const SOCKET_URL = getSocketUrl()
 let socketInstance = null
 let currentAuth = { token: null, role: null }
 
+const BATCH_EVENT_NAMES = ['products_batch_updated', 'services_batch_updated']
+
+const dispatchBatch = (socket, batch) => {
+  const events = Array.isArray(batch?.events) ? batch.events : []
+  events.forEach(({ event, data }) => {
+    if (!event) return
+    socket.listeners(event).forEach((listener) => listener(data))
+  })
+}
+
 /**
  * Initialize Socket.IO connection
  * @param {string} token - JWT access token
@@ -63,6 +73,12 @@ export const initSocket = (token = null, role = 'user') => {
     socketInstance.emit('init_session', { token, role })
   })
 
+  // Bursts of product/service events arrive as one batch frame:
+  // { count, events: [{ event, data }] }. Replay each entry to the regular listeners.
+  BATCH_EVENT_NAMES.forEach((batchEvent) => {
+    socketInstance.on(batchEvent, (batch) => dispatchBatch(socketInstance, batch))
+  })
+
   socketInstance.on('disconnect', (reason) => {
     console.log(`[Socket] Disconnected. Reason: ${reason}`)
   })